@@ -0,0 +1,167 @@
+"""
+Benchmarks for the Claus scoring hot path.
+
+Writes machine-readable results and optionally compares them against a baseline run:
+
+    PYTHONPATH=. python benchmarks/bench_claus.py --output baseline.json
+    PYTHONPATH=. python benchmarks/bench_claus.py --output current.json --compare baseline.json --threshold 0.1
+
+Each benchmark reports the best time per operation over several repeats, in seconds. The comparison exits with
+status 1 if any benchmark is slower than the baseline by more than the threshold fraction.
+"""
+from __future__ import division, print_function
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+from cohorts import random_cohort
+from risk_models.claus import compiled
+from risk_models.claus.claus import calculate_risk, collect_family_indices, get_lifetime_risk, score_family_indices
+from risk_models.claus.claus_tables import CLAUS_TABLES, CLAUS_TABLE_NAMES, CLAUS_TABLE_RELATIVES
+from risk_models.claus.records import RELATIVE_FIELDS
+from risk_models.claus.threshold_index import threshold_index
+
+FAMILY_SHAPES = {
+    'empty': {},
+    'one_first_degree': {'mother_onset_age': 44},
+    'large_family': {
+        'mother_onset_age': 52,
+        'full_sister_onset_ages': [38, 61],
+        'maternal_aunt_onset_ages': [44, 55, 67, 72, 48],
+        'paternal_aunt_onset_ages': [39, 58, 63, 70],
+        'maternal_grandmother_onset_ages': [66],
+        'paternal_grandmother_onset_ages': [71],
+        'maternal_half_sister_onset_ages': [41, 35, 50],
+        'paternal_half_sister_onset_ages': [47, 53, 29, 60],
+    },
+}
+
+COHORT_SIZE = 10000
+
+# (fast path, generic path) benchmark pairs whose speedup is printed.
+SPEEDUPS = (
+    ('compiled.calculate_risk.large_family', 'calculate_risk.large_family'),
+    ('cohort.compiled', 'cohort.scalar'),
+    ('cohort.score_family_indices.compiled', 'cohort.score_family_indices.generic'),
+)
+
+
+def run_benchmarks(repeat=5):
+    results = {}
+
+    for shape, relatives in sorted(FAMILY_SHAPES.items()):
+        results['calculate_risk.' + shape] = _time(lambda: calculate_risk(47, **relatives), repeat)
+        results['compiled.calculate_risk.' + shape] = _time(lambda: compiled.calculate_risk(47, **relatives), repeat)
+
+    for name, table, relatives in zip(CLAUS_TABLE_NAMES, CLAUS_TABLES, CLAUS_TABLE_RELATIVES):
+        relative_indices = (2,) if relatives == 1 else (2, 3)
+        results['get_lifetime_risk.' + name] = _time(lambda: get_lifetime_risk(table, 47, *relative_indices), repeat)
+
+    cohort = random_cohort(COHORT_SIZE)
+    results['cohort.scalar'] = _time(lambda: [calculate_risk(**record) for record in cohort], repeat, COHORT_SIZE)
+    results['cohort.compiled'] = _time(
+        lambda: [compiled.calculate_risk(**record) for record in cohort], repeat, COHORT_SIZE)
+
+    # Table selection and lookup alone, on relatives binned in advance.
+    binned = [(record['patient_age'], collect_family_indices(**_relatives(record))) for record in cohort]
+    results['cohort.score_family_indices.generic'] = _time(
+        lambda: [score_family_indices(*case) for case in binned], repeat, COHORT_SIZE)
+    results['cohort.score_family_indices.compiled'] = _time(
+        lambda: [compiled.score_family_indices(*case) for case in binned], repeat, COHORT_SIZE)
+
+    # Eligibility at a 20% threshold, from the risk and from the reverse threshold index.
+    index = threshold_index(0.2)
+    results['cohort.eligibility.score'] = _time(
+        lambda: [(score_family_indices(*case) or 0) >= 0.2 for case in binned], repeat, COHORT_SIZE)
+    results['cohort.eligibility.threshold_index'] = _time(
+        lambda: [index.at_or_above(*case) for case in binned], repeat, COHORT_SIZE)
+
+    try:
+        from risk_models.claus.batch import calculate_risk_batch
+    except ImportError:
+        pass
+    else:
+        columns = _columns(cohort)
+        results['cohort.batch'] = _time(lambda: calculate_risk_batch(**columns), repeat, COHORT_SIZE)
+        results['cohort.batch.provenance'] = _time(
+            lambda: calculate_risk_batch(provenance=True, **columns), repeat, COHORT_SIZE)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns (name, baseline seconds, current seconds) for every benchmark slower than baseline by over threshold.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['seconds'], result['seconds']
+        if after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def _time(function, repeat, operations=1):
+    timer = timeit.Timer(function)
+    # Like Timer.autorange, which Python 2 lacks: run enough loops for one run to take at least 0.2 seconds.
+    number = 1
+    while timer.timeit(number) < 0.2:
+        number *= 2
+    seconds = min(timer.repeat(repeat, number)) / number / operations
+    return {'seconds': seconds, 'operations_per_second': 1 / seconds}
+
+
+def _relatives(record):
+    return dict((field, value) for field, value in record.items() if field != 'patient_age')
+
+
+def _columns(cohort):
+    columns = {'patient_ages': [record['patient_age'] for record in cohort]}
+    columns['mother_onset_ages'] = [record.get('mother_onset_age') for record in cohort]
+    for field in RELATIVE_FIELDS:
+        columns[field] = [record.get(field) for record in cohort]
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for the Claus scoring hot path.')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results of a baseline run')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed slowdown over the baseline, as a fraction (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+    for name, result in sorted(results.items()):
+        print('{:<45} {:>12.3f} us {:>14,.0f} ops/s'.format(
+            name, result['seconds'] * 1e6, result['operations_per_second']))
+    for fast, generic in SPEEDUPS:
+        print('{} is {:.2f}x as fast as {}'.format(fast, results[generic]['seconds'] / results[fast]['seconds'], generic))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'benchmarks': results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['benchmarks']
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print('REGRESSION {}: {:.3f} us -> {:.3f} us'.format(name, before * 1e6, after * 1e6))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Import-time benchmark for the risk_models.claus package.
+
+Runs `python -X importtime` in fresh interpreters and reports the cumulative import time of each target module,
+so cold-start regressions are caught:
+
+    PYTHONPATH=. python benchmarks/bench_import.py --output baseline.json
+    PYTHONPATH=. python benchmarks/bench_import.py --output current.json --compare baseline.json --threshold 0.2
+
+Each target reports the best cumulative import time over several fresh processes, in seconds, after one warm-up
+import that writes bytecode to a temporary cache. It also lists heavy optional dependencies that the import
+pulled in; any such module is reported as a regression. The comparison exits with status 1 if any target is
+slower than the baseline by more than the threshold fraction.
+"""
+from __future__ import division, print_function
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+TARGETS = (
+    'risk_models.claus',
+    'risk_models.claus.claus',
+    'risk_models.claus.cli',
+)
+
+# Optional dependencies that importing a target must not load.
+HEAVY_MODULES = ('numpy', 'pyarrow')
+
+
+def measure_import(module, repeat, environment):
+    """
+    Returns (best cumulative seconds, heavy modules imported) for importing `module` in a fresh interpreter.
+    """
+    best = None
+    heavy = set()
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+            stderr=subprocess.STDOUT, env=environment
+        ).decode('utf-8')
+        for line in output.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            if name == module:
+                seconds = int(cumulative) / 1e6
+                best = seconds if best is None else min(best, seconds)
+            if name.split('.')[0] in HEAVY_MODULES:
+                heavy.add(name.split('.')[0])
+    return best, sorted(heavy)
+
+
+def run_benchmarks(repeat=10):
+    cache = tempfile.mkdtemp()
+    environment = dict(os.environ, PYTHONPYCACHEPREFIX=cache)
+    environment.pop('PYTHONDONTWRITEBYTECODE', None)
+    try:
+        results = {}
+        for module in TARGETS:
+            subprocess.check_call([sys.executable, '-c', 'import ' + module], env=environment)
+            seconds, heavy = measure_import(module, repeat, environment)
+            results['import.' + module] = {'seconds': seconds, 'heavy_modules': heavy}
+        return results
+    finally:
+        shutil.rmtree(cache)
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns (name, baseline seconds, current seconds) for every target slower than baseline by over threshold.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['seconds'], result['seconds']
+        if after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time benchmark for risk_models.claus.')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results of a baseline run')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown over the baseline, as a fraction (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+    failed = False
+    for name, result in sorted(results.items()):
+        print('{:<40} {:>10.2f} ms'.format(name, result['seconds'] * 1e3))
+        if result['heavy_modules']:
+            print('HEAVY IMPORT {}: {}'.format(name, ', '.join(result['heavy_modules'])))
+            failed = True
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'benchmarks': results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['benchmarks']
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print('REGRESSION {}: {:.2f} ms -> {:.2f} ms'.format(name, before * 1e3, after * 1e3))
+        failed = failed or bool(regressions)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Throughput of multi-process cohort scoring from 1 worker up to one worker per CPU.
+
+    PYTHONPATH=. python benchmarks/bench_parallel.py --records 500000
+"""
+from __future__ import division, print_function
+
+import argparse
+import time
+from multiprocessing import cpu_count
+
+from cohorts import random_cohort
+from risk_models.claus.parallel import DEFAULT_CHUNK_SIZE, _score_chunk, score_records_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--max-workers', type=int, default=cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    cohort = random_cohort(args.records)
+
+    start = time.time()
+    expected = _score_chunk(cohort)
+    baseline = time.time() - start
+    print('{:>8} {:>14} {:>8}'.format('workers', 'records/s', 'speedup'))
+    print('{:>8} {:>14,.0f} {:>8.2f}'.format('serial', args.records / baseline, 1))
+
+    for workers in range(1, args.max_workers + 1):
+        start = time.time()
+        risks = list(score_records_parallel(cohort, workers, args.chunk_size))
+        elapsed = time.time() - start
+        assert risks == expected
+        print('{:>8} {:>14,.0f} {:>8.2f}'.format(workers, args.records / elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
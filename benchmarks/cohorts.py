@@ -0,0 +1,24 @@
+"""
+Synthetic cohorts for benchmarks. Records are `calculate_risk` keyword argument dicts.
+"""
+import random
+
+from risk_models.claus.records import RELATIVE_FIELDS
+
+
+def random_cohort(size, seed=0, max_relatives=3):
+    """
+    Returns `size` random records, with relatives of every relationship and some out-of-range onset ages.
+    """
+    rng = random.Random(seed)
+    return [random_record(rng, max_relatives) for _ in range(size)]
+
+
+def random_record(rng, max_relatives=3):
+    record = {'patient_age': rng.randint(20, 79)}
+    if rng.random() < 0.3:
+        record['mother_onset_age'] = rng.randint(15, 90)
+    for field in RELATIVE_FIELDS:
+        if rng.random() < 0.2:
+            record[field] = [rng.randint(15, 90) for _ in range(rng.randint(1, max_relatives))]
+    return record
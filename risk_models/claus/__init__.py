@@ -0,0 +1,71 @@
+"""
+Claus breast cancer risk model.
+
+Importing this package is cheap: the public names below are loaded from their modules on first access, so
+optional dependencies (NumPy for batch scoring, pyarrow for columnar files) are only imported when used.
+Python 3.7+ serves them through the module __getattr__ (PEP 562); older versions through a module subclass.
+"""
+import importlib
+import sys
+import types
+
+_LAZY_ATTRIBUTES = {
+    'calculate_risk': 'risk_models.claus.claus',
+    'get_lifetime_risk': 'risk_models.claus.claus',
+    'FamilyIndices': 'risk_models.claus.claus',
+    'collect_family_indices': 'risk_models.claus.claus',
+    'score_family_indices': 'risk_models.claus.claus',
+    'calculate_risk_with_provenance': 'risk_models.claus.provenance',
+    'FamilyHistory': 'risk_models.claus.family_history',
+    'calculate_risk_for': 'risk_models.claus.family_history',
+    'ClausRiskCache': 'risk_models.claus.cache',
+    'risk_trajectory': 'risk_models.claus.trajectory',
+    'IncrementalClausScorer': 'risk_models.claus.incremental',
+    'AnswerStore': 'risk_models.claus.answer_store',
+    'calculate_risk_batch': 'risk_models.claus.batch',
+    'score_parquet': 'risk_models.claus.columnar',
+    'score_arrow_ipc': 'risk_models.claus.columnar',
+}
+# Modules that need an optional dependency. dir() lists their names only once they are imported, so that tools
+# which get every listed attribute (such as unittest discovery) neither import nor require NumPy or pyarrow.
+_OPTIONAL_MODULES = ('risk_models.claus.batch', 'risk_models.claus.columnar')
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(
+        name for name, module_name in _LAZY_ATTRIBUTES.items()
+        if module_name not in _OPTIONAL_MODULES or module_name in sys.modules))
+
+
+class _LazyModule(types.ModuleType):
+    # Before Python 3.7, a module __getattr__ is ignored, so the package module's class provides it.
+
+    def __getattr__(self, name):
+        value = __getattr__(name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return __dir__()
+
+
+if sys.version_info < (3, 7):
+    _module = sys.modules[__name__]
+    try:
+        _module.__class__ = _LazyModule
+    except TypeError:
+        # Python 2 cannot change a module's class, so the package is replaced in sys.modules by an equivalent
+        # module. It keeps a reference to the original, whose globals Python 2 clears when it is collected.
+        _lazy_module = _LazyModule(__name__, __doc__)
+        _lazy_module.__dict__.update(_module.__dict__)
+        _lazy_module._original_module = _module
+        sys.modules[__name__] = _lazy_module
@@ -0,0 +1,283 @@
+"""
+Streaming summaries of cohort risk distributions.
+
+`RiskAggregator` consumes scored or unscored records one at a time and keeps, for each patient age band, a
+histogram over the possible risks (`calculate_risk` rounds to thousandths, so there are 1001 of them), a count
+of patients no Claus table applies to, and exact counts at or above clinical thresholds. Memory does not depend
+on cohort size, and aggregators built from separate shards merge losslessly:
+
+    aggregator = RiskAggregator(thresholds=(0.2,))
+    aggregator.update(records)
+    aggregator.merge(RiskAggregator.from_dict(json.load(f)))
+    aggregator.quantile(0.95, band='40-49'), aggregator.at_or_above(0.2)
+
+Summaries written by `claus-risk --summary` are merged and reported with:
+
+    python -m risk_models.claus.aggregation shard-1.json shard-2.json -o cohort.json
+"""
+from __future__ import division, print_function
+
+import argparse
+import json
+import math
+import sys
+from collections import OrderedDict
+
+from risk_models.claus.claus import VALID_MIN_AGE, VALID_MAX_AGE, calculate_risk
+from risk_models.claus.records import PATIENT_AGE_FIELD, parse_record
+
+FORMAT_VERSION = 1
+RISK_FIELD = 'risk'
+# Lifetime risk of 20% or more is the usual threshold for high-risk screening.
+DEFAULT_THRESHOLDS = (0.2,)
+AGE_BANDS = tuple('{}-{}'.format(age, age + 9) for age in range(VALID_MIN_AGE, VALID_MAX_AGE + 1, 10))
+# Risks are counted in thousandths.
+RISK_RESOLUTION = 1000
+
+
+class RiskAggregator(object):
+    """
+    Fixed-size, mergeable summary of risks by patient age band. Patients with no applicable Claus table (a risk
+    of None) are counted separately and left out of histograms, quantiles and means.
+    """
+
+    def __init__(self, thresholds=DEFAULT_THRESHOLDS):
+        self.thresholds = tuple(sorted(set(float(threshold) for threshold in thresholds)))
+        self._histograms = [[0] * (RISK_RESOLUTION + 1) for _ in AGE_BANDS]
+        self._no_risk = [0] * len(AGE_BANDS)
+        self._at_or_above = [[0] * len(self.thresholds) for _ in AGE_BANDS]
+
+    def add(self, patient_age, risk):
+        """
+        Counts one patient. Raises ValueError for ages outside the valid range and risks that `calculate_risk`
+        cannot return.
+        """
+        band = _band_index(patient_age)
+        if risk is None:
+            self._no_risk[band] += 1
+            return
+        self._histograms[band][_risk_millis(risk)] += 1
+        counters = self._at_or_above[band]
+        for position, threshold in enumerate(self.thresholds):
+            if risk >= threshold:
+                counters[position] += 1
+
+    def add_record(self, record):
+        """
+        Counts one record, using its `risk` field if it has one (as written by `claus-risk`) and scoring it
+        otherwise. Raises ValueError for malformed records.
+        """
+        arguments = parse_record(record)
+        if RISK_FIELD in record:
+            risk = record[RISK_FIELD]
+            if risk == '':
+                risk = None
+            elif risk is not None:
+                try:
+                    risk = float(risk)
+                except (TypeError, ValueError):
+                    raise ValueError('{} must be a number, got {!r}'.format(RISK_FIELD, risk))
+        else:
+            risk = calculate_risk(**arguments)
+        self.add(arguments[PATIENT_AGE_FIELD], risk)
+
+    def update(self, records):
+        for record in records:
+            self.add_record(record)
+        return self
+
+    def merge(self, other):
+        """
+        Adds the counts of another aggregator with the same thresholds into this one, and returns this one.
+        """
+        if other.thresholds != self.thresholds:
+            raise ValueError('cannot merge aggregators with thresholds {} and {}'.format(
+                self.thresholds, other.thresholds))
+        for band in range(len(AGE_BANDS)):
+            self._no_risk[band] += other._no_risk[band]
+            _add_counts(self._histograms[band], other._histograms[band])
+            _add_counts(self._at_or_above[band], other._at_or_above[band])
+        return self
+
+    def count(self, band=None):
+        """
+        Number of patients with a risk, in one age band (such as '40-49') or in all of them.
+        """
+        return sum(self._histogram(band))
+
+    def no_risk_count(self, band=None):
+        return sum(self._no_risk[index] for index in _band_indices(band))
+
+    def at_or_above(self, threshold, band=None):
+        """
+        Exact number of patients whose risk is at least one of the aggregator's thresholds.
+        """
+        try:
+            position = self.thresholds.index(float(threshold))
+        except ValueError:
+            raise ValueError('{} is not one of the thresholds {}'.format(threshold, self.thresholds))
+        return sum(self._at_or_above[index][position] for index in _band_indices(band))
+
+    def histogram(self, band=None):
+        """
+        Returns an OrderedDict of {risk: number of patients} for the risks that occur, in increasing order.
+        """
+        return OrderedDict(
+            (millis / RISK_RESOLUTION, count) for millis, count in enumerate(self._histogram(band)) if count)
+
+    def mean(self, band=None):
+        histogram = self._histogram(band)
+        count = sum(histogram)
+        if not count:
+            return None
+        return sum(millis * count for millis, count in enumerate(histogram)) / count / RISK_RESOLUTION
+
+    def quantile(self, quantile, band=None):
+        """
+        Returns the smallest risk with at least `quantile` of the patients at or below it, or None if there are
+        none. Computed exactly from the histogram.
+        """
+        if not 0 <= quantile <= 1:
+            raise ValueError('quantile must be between 0 and 1, got {}'.format(quantile))
+        histogram = self._histogram(band)
+        count = sum(histogram)
+        if not count:
+            return None
+        target = max(1, int(math.ceil(quantile * count)))
+        seen = 0
+        for millis, millis_count in enumerate(histogram):
+            seen += millis_count
+            if seen >= target:
+                return millis / RISK_RESOLUTION
+
+    def to_dict(self):
+        """
+        Returns a JSON-serializable form of the summary, read back with `from_dict`.
+        """
+        bands = OrderedDict()
+        for index, band in enumerate(AGE_BANDS):
+            bands[band] = OrderedDict([
+                ('histogram', [[millis, count] for millis, count in enumerate(self._histograms[index]) if count]),
+                ('no_risk', self._no_risk[index]),
+                ('at_or_above', list(self._at_or_above[index])),
+            ])
+        return OrderedDict([
+            ('format_version', FORMAT_VERSION),
+            ('thresholds', list(self.thresholds)),
+            ('bands', bands),
+        ])
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Reads a summary written by `to_dict`. Raises ValueError if it is malformed.
+        """
+        try:
+            if data['format_version'] != FORMAT_VERSION:
+                raise ValueError('unsupported summary format version {!r}'.format(data['format_version']))
+            aggregator = cls(data['thresholds'])
+            if list(aggregator.thresholds) != [float(threshold) for threshold in data['thresholds']]:
+                raise ValueError('summary thresholds must be distinct and sorted')
+            for index, band in enumerate(AGE_BANDS):
+                summary = data['bands'][band]
+                for millis, count in summary['histogram']:
+                    if isinstance(millis, bool) or not isinstance(millis, int) or not 0 <= millis <= RISK_RESOLUTION:
+                        raise ValueError('histogram risks must be thousandths between 0 and {}, got {!r}'.format(
+                            RISK_RESOLUTION, millis))
+                    aggregator._histograms[index][millis] += _count(count)
+                aggregator._no_risk[index] = _count(summary['no_risk'])
+                if len(summary['at_or_above']) != len(aggregator.thresholds):
+                    raise ValueError('{} has {} threshold counts, expected {}'.format(
+                        band, len(summary['at_or_above']), len(aggregator.thresholds)))
+                aggregator._at_or_above[index] = [_count(count) for count in summary['at_or_above']]
+        except (KeyError, IndexError, TypeError) as e:
+            raise ValueError('malformed summary: {!r}'.format(e))
+        return aggregator
+
+    def _histogram(self, band):
+        if band is not None:
+            return self._histograms[_band_indices(band)[0]]
+        totals = [0] * (RISK_RESOLUTION + 1)
+        for histogram in self._histograms:
+            _add_counts(totals, histogram)
+        return totals
+
+
+def format_report(aggregator, quantiles=(0.5, 0.9, 0.99)):
+    """
+    Returns a text table of counts, means, quantiles and threshold counts for each age band and overall.
+    """
+    columns = ['band', 'patients', 'no risk', 'mean'] + ['p{:g}'.format(quantile * 100) for quantile in quantiles]
+    columns += ['>={:g}'.format(threshold) for threshold in aggregator.thresholds]
+    rows = []
+    for band in AGE_BANDS + (None,):
+        mean = aggregator.mean(band)
+        row = [band or 'all', aggregator.count(band), aggregator.no_risk_count(band),
+               '-' if mean is None else '{:.4f}'.format(mean)]
+        row += [_format_risk(aggregator.quantile(quantile, band)) for quantile in quantiles]
+        row += [aggregator.at_or_above(threshold, band) for threshold in aggregator.thresholds]
+        rows.append(row)
+    widths = [max(len(str(value)) for value in column) for column in zip(columns, *rows)]
+    return '\n'.join(
+        '  '.join(str(value).rjust(width) for value, width in zip(row, widths)) for row in [columns] + rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Merge and report Claus risk summaries.')
+    parser.add_argument('summaries', nargs='+', help='summary JSON files written by claus-risk --summary')
+    parser.add_argument('-o', '--output', help='write the merged summary to this file')
+    args = parser.parse_args(argv)
+
+    merged = None
+    for path in args.summaries:
+        with open(path) as f:
+            aggregator = RiskAggregator.from_dict(json.load(f))
+        merged = aggregator if merged is None else merged.merge(aggregator)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(merged.to_dict(), f)
+    print(format_report(merged))
+    return 0
+
+
+def _band_index(patient_age):
+    if not VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE:
+        raise ValueError('patient age must be between {} and {}, got {}'.format(
+            VALID_MIN_AGE, VALID_MAX_AGE, patient_age))
+    return (patient_age - VALID_MIN_AGE) // 10
+
+
+def _band_indices(band):
+    if band is None:
+        return range(len(AGE_BANDS))
+    try:
+        return [AGE_BANDS.index(band)]
+    except ValueError:
+        raise ValueError('age band must be one of {}, got {!r}'.format(', '.join(AGE_BANDS), band))
+
+
+def _risk_millis(risk):
+    millis = int(round(risk * RISK_RESOLUTION))
+    if not 0 <= millis <= RISK_RESOLUTION or abs(millis - risk * RISK_RESOLUTION) > 1e-6:
+        raise ValueError('risk must be a multiple of 0.001 between 0 and 1, got {!r}'.format(risk))
+    return millis
+
+
+def _add_counts(totals, counts):
+    for index, count in enumerate(counts):
+        totals[index] += count
+
+
+def _count(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError('counts must be non-negative integers, got {!r}'.format(value))
+    return value
+
+
+def _format_risk(risk):
+    return '-' if risk is None else '{:.3f}'.format(risk)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Precomputed, memory-mappable answers to `calculate_risk` over its whole reduced input domain.
+
+The risk depends only on the patient age and the FamilyIndices signature, and it is the maximum of two
+independent parts:
+
+* first degree / mother: the one and two first degree tables and the mother + aunt tables, which depend on the
+  two smallest first degree bins, the mother bin and the smallest maternal and paternal aunt bins;
+* second degree: the one second degree, same side and different side tables, which depend on the two smallest
+  maternal and paternal second degree bins.
+
+The answer file stores each part as a dense array of uint16 risks in thousandths (0xFFFF where no table
+applies): 60 x 28 x 7 x 7 x 7 first degree entries and 60 x 28 x 28 second degree entries, about 1.2MB. Storing
+the full cross product instead would take around 450 million entries. A lookup computes one index per part and
+reads each with a single unpack from the mmap, so many processes can share one page-cached copy.
+
+Build a file with `python -m risk_models.claus.answer_store PATH`.
+"""
+from __future__ import division
+
+import mmap
+import struct
+import sys
+from array import array
+
+from risk_models.claus.claus import (
+    FamilyIndices,
+    PATIENT_AGE_COUNT,
+    RELATIVE_BIN_COUNT,
+    VALID_MIN_AGE,
+    VALID_MAX_AGE,
+    collect_family_indices,
+    score_family_indices,
+)
+from risk_models.claus.packed_tables import table_fingerprint
+
+MAGIC = b'CLAUSANS'
+FORMAT_VERSION = 1
+# Magic, format version, table fingerprint (sha256), first degree entry count, second degree entry count.
+HEADER = struct.Struct('<8sI32sII')
+NO_RISK = 0xFFFF
+_UINT16 = struct.Struct('<H')
+
+# Codes for the smallest bin of a category (0 when missing, else bin + 1).
+SINGLE_CODES = RELATIVE_BIN_COUNT + 1
+# Codes for the two smallest bins of a category: 0 when missing, 1-6 for one relative, then every sorted pair.
+_PAIRS = [(None, None)] + [(first, None) for first in range(RELATIVE_BIN_COUNT)] + [
+    (first, second) for first in range(RELATIVE_BIN_COUNT) for second in range(first, RELATIVE_BIN_COUNT)]
+_PAIR_CODES = dict((pair, code) for code, pair in enumerate(_PAIRS))
+PAIR_CODES = len(_PAIRS)
+
+FIRST_DEGREE_ENTRIES = PATIENT_AGE_COUNT * PAIR_CODES * SINGLE_CODES ** 3
+SECOND_DEGREE_ENTRIES = PATIENT_AGE_COUNT * PAIR_CODES * PAIR_CODES
+
+
+def write_answer_store(path):
+    """
+    Enumerates the reduced input domain and writes the answer file to `path`.
+    """
+    first_degree = array('H', [NO_RISK]) * FIRST_DEGREE_ENTRIES
+    second_degree = array('H', [NO_RISK]) * SECOND_DEGREE_ENTRIES
+    singles = [None] + list(range(RELATIVE_BIN_COUNT))
+
+    for patient_age in range(VALID_MIN_AGE, VALID_MAX_AGE + 1):
+        # The first degree tables and each mother + aunt table depend on disjoint fields, so score them
+        # separately and combine with max.
+        first_degree_scores = [
+            _score(patient_age, first_degree_1=first_degree_1, first_degree_2=first_degree_2)
+            for first_degree_1, first_degree_2 in _PAIRS
+        ]
+        mother_aunt_scores = [
+            [(_score(patient_age, mother=mother, maternal_aunt_1=aunt),
+              _score(patient_age, mother=mother, paternal_aunt_1=aunt))
+             for aunt in singles]
+            for mother in singles
+        ]
+        # Entries are laid out in the same nested order as these loops, starting at the all-missing entry.
+        index = _first_degree_index(patient_age, _family_indices())
+        for first_degree_score in first_degree_scores:
+            for aunt_scores in mother_aunt_scores:
+                for maternal_aunt_score, _ in aunt_scores:
+                    for _, paternal_aunt_score in aunt_scores:
+                        risk = max(first_degree_score, maternal_aunt_score, paternal_aunt_score)
+                        first_degree[index] = NO_RISK if risk < 0 else risk
+                        index += 1
+
+        for maternal_second_degree in _PAIRS:
+            for paternal_second_degree in _PAIRS:
+                present = [bin_index for bin_index in (maternal_second_degree[0], paternal_second_degree[0])
+                           if bin_index is not None]
+                family_indices = _family_indices(
+                    second_degree_1=min(present) if present else None,
+                    maternal_second_degree_1=maternal_second_degree[0],
+                    maternal_second_degree_2=maternal_second_degree[1],
+                    paternal_second_degree_1=paternal_second_degree[0],
+                    paternal_second_degree_2=paternal_second_degree[1],
+                )
+                risk = score_family_indices(patient_age, family_indices)
+                second_degree[_second_degree_index(patient_age, family_indices)] = (
+                    NO_RISK if risk is None else _encode(risk))
+
+    if sys.byteorder != 'little':
+        first_degree.byteswap()
+        second_degree.byteswap()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, bytes(bytearray.fromhex(table_fingerprint())),
+                            FIRST_DEGREE_ENTRIES, SECOND_DEGREE_ENTRIES))
+        first_degree.tofile(f)
+        second_degree.tofile(f)
+
+
+class AnswerStore(object):
+    """
+    Read-only view of an answer file. Raises ValueError if the file is malformed or was built from
+    different tables.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, fingerprint, first_degree_entries, second_degree_entries = HEADER.unpack_from(self._map)
+        except struct.error:
+            self.close()
+            raise ValueError('{} is not a claus answer file'.format(path))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError('{} is not a version {} claus answer file'.format(path, FORMAT_VERSION))
+        if fingerprint != bytes(bytearray.fromhex(table_fingerprint())):
+            self.close()
+            raise ValueError('{} was built from different claus tables'.format(path))
+        if ((first_degree_entries, second_degree_entries) != (FIRST_DEGREE_ENTRIES, SECOND_DEGREE_ENTRIES) or
+                len(self._map) != HEADER.size + 2 * (FIRST_DEGREE_ENTRIES + SECOND_DEGREE_ENTRIES)):
+            self.close()
+            raise ValueError('{} is truncated or has an unexpected layout'.format(path))
+        self._second_degree_start = HEADER.size + 2 * FIRST_DEGREE_ENTRIES
+
+    def calculate_risk(self, patient_age, **relatives):
+        """
+        Same arguments and result as `calculate_risk`, for patient ages in the valid range.
+        """
+        return self.score(patient_age, collect_family_indices(**relatives))
+
+    def score(self, patient_age, family_indices):
+        """
+        Same result as `score_family_indices`, for patient ages in the valid range.
+        """
+        if not VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE:
+            raise ValueError('patient age must be between {} and {}, got {}'.format(
+                VALID_MIN_AGE, VALID_MAX_AGE, patient_age))
+        first_degree = _UINT16.unpack_from(
+            self._map, HEADER.size + 2 * _first_degree_index(patient_age, family_indices))[0]
+        second_degree = _UINT16.unpack_from(
+            self._map, self._second_degree_start + 2 * _second_degree_index(patient_age, family_indices))[0]
+        if first_degree == NO_RISK:
+            return None if second_degree == NO_RISK else second_degree / 1000
+        if second_degree == NO_RISK:
+            return first_degree / 1000
+        return max(first_degree, second_degree) / 1000
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _first_degree_index(patient_age, family_indices):
+    index = (patient_age - VALID_MIN_AGE) * PAIR_CODES + _PAIR_CODES[family_indices[0:2]]
+    for position in (3, 4, 5):  # mother, maternal_aunt_1, paternal_aunt_1
+        bin_index = family_indices[position]
+        index = index * SINGLE_CODES + (0 if bin_index is None else bin_index + 1)
+    return index
+
+
+def _second_degree_index(patient_age, family_indices):
+    return (((patient_age - VALID_MIN_AGE) * PAIR_CODES + _PAIR_CODES[family_indices[6:8]]) * PAIR_CODES +
+            _PAIR_CODES[family_indices[8:10]])
+
+
+def _family_indices(**fields):
+    return FamilyIndices(**dict((field, fields.get(field)) for field in FamilyIndices._fields))
+
+
+def _score(patient_age, **fields):
+    # Encoded risk of a partial signature, or -1 where no table applies.
+    risk = score_family_indices(patient_age, _family_indices(**fields))
+    return -1 if risk is None else _encode(risk)
+
+
+def _encode(risk):
+    # Risks are rounded to thousandths, so this is exact.
+    return int(round(risk * 1000))
+
+
+if __name__ == '__main__':
+    write_answer_store(sys.argv[1])
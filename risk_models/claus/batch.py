@@ -0,0 +1,347 @@
+"""
+Vectorized Claus risk scoring over whole cohorts.
+
+This module requires NumPy, which is an optional dependency:
+
+    pip install clrriskmodels[batch]
+
+Every relationship argument of `calculate_risk_batch` accepts either a padded 2-D array (one row per
+patient, padded with any value outside the valid onset age range, such as 0 or NaN) or a ragged
+sequence of per-patient onset age lists (None for no relatives).
+"""
+from __future__ import division
+
+import numpy as np
+
+from risk_models.claus.claus import TABLE_CRITERIA, VALID_MIN_AGE, VALID_MAX_AGE
+from risk_models.claus.family_history import RELATIONSHIPS
+from risk_models.claus.packed_tables import PACKED_TABLES, TABLE_OFFSETS
+from risk_models.claus.provenance import MISSING, PROVENANCE_FIELDS
+from risk_models.claus.claus_tables import (
+    CLAUS_TABLES,
+    CLAUS_TABLE_RELATIVES,
+    ONE_FIRST_DEG_TABLE,
+    ONE_SECOND_DEG_TABLE,
+    TWO_FIRST_DEG_TABLE,
+    MOTHER_MATERNAL_AUNT,
+    MOTHER_PATERNAL_AUNT,
+    TABLE_SIZE,
+    TWO_SEC_DEG_DIFF_SIDE_TABLE,
+    TWO_SEC_DEG_SAME_SIDE_TABLE,
+)
+
+# Bin index used for "no relative in this category". One past the last relative bin.
+NO_INDEX = TABLE_SIZE
+# One byte per provenance field (see `risk_models.claus.provenance`).
+PROVENANCE_DTYPE = np.dtype([(field, np.uint8) for field in PROVENANCE_FIELDS])
+
+
+def _table_array(table):
+    """
+    Returns a read-only ndarray view of a table's slice of the packed table buffer.
+    """
+    table_id = CLAUS_TABLES.index(table)
+    shape = (TABLE_SIZE,) * (CLAUS_TABLE_RELATIVES[table_id] + 1)
+    packed = np.frombuffer(PACKED_TABLES, dtype=np.float64)
+    view = packed[TABLE_OFFSETS[table_id]:TABLE_OFFSETS[table_id] + TABLE_SIZE ** len(shape)].reshape(shape)
+    view.setflags(write=False)
+    return view
+
+
+_ONE_FIRST_DEG = _table_array(ONE_FIRST_DEG_TABLE)
+_ONE_SECOND_DEG = _table_array(ONE_SECOND_DEG_TABLE)
+_TWO_FIRST_DEG = _table_array(TWO_FIRST_DEG_TABLE)
+_MOTHER_MATERNAL_AUNT = _table_array(MOTHER_MATERNAL_AUNT)
+_MOTHER_PATERNAL_AUNT = _table_array(MOTHER_PATERNAL_AUNT)
+_TWO_SEC_DEG_DIFF_SIDE = _table_array(TWO_SEC_DEG_DIFF_SIDE_TABLE)
+_TWO_SEC_DEG_SAME_SIDE = _table_array(TWO_SEC_DEG_SAME_SIDE_TABLE)
+# Position in CLAUS_TABLES of each TABLE_CRITERIA table.
+_CRITERIA_TABLE_IDS = np.array([CLAUS_TABLES.index(table) for table, _ in TABLE_CRITERIA], dtype=np.uint8)
+
+
+def calculate_risk_batch(
+        patient_ages,
+        mother_onset_ages=None,
+        daughter_onset_ages=None,
+        full_sister_onset_ages=None,
+        maternal_aunt_onset_ages=None,
+        paternal_aunt_onset_ages=None,
+        maternal_grandmother_onset_ages=None,
+        paternal_grandmother_onset_ages=None,
+        maternal_half_sister_onset_ages=None,
+        paternal_half_sister_onset_ages=None,
+        provenance=False):
+    """
+    Vectorized equivalent of `calculate_risk` for a cohort of patients.
+
+    `patient_ages` is a 1-D sequence of current ages, `mother_onset_ages` a 1-D sequence with one entry
+    per patient (None, 0 or NaN for no mother diagnosis), and the remaining arguments are padded or ragged
+    per-patient onset age lists. Returns a float64 array of risks, with NaN wherever `calculate_risk`
+    returns None. With `provenance`, returns the risks and a PROVENANCE_DTYPE array of their provenance.
+    """
+    patient_ages = _as_patient_ages(patient_ages)
+    bins = bin_cohort(
+        len(patient_ages),
+        mother_onset_ages=mother_onset_ages,
+        daughter_onset_ages=daughter_onset_ages,
+        full_sister_onset_ages=full_sister_onset_ages,
+        maternal_aunt_onset_ages=maternal_aunt_onset_ages,
+        paternal_aunt_onset_ages=paternal_aunt_onset_ages,
+        maternal_grandmother_onset_ages=maternal_grandmother_onset_ages,
+        paternal_grandmother_onset_ages=paternal_grandmother_onset_ages,
+        maternal_half_sister_onset_ages=maternal_half_sister_onset_ages,
+        paternal_half_sister_onset_ages=paternal_half_sister_onset_ages,
+    )
+    return score_bins(patient_ages, bins, provenance)
+
+
+def bin_cohort(
+        size,
+        mother_onset_ages=None,
+        daughter_onset_ages=None,
+        full_sister_onset_ages=None,
+        maternal_aunt_onset_ages=None,
+        paternal_aunt_onset_ages=None,
+        maternal_grandmother_onset_ages=None,
+        paternal_grandmother_onset_ages=None,
+        maternal_half_sister_onset_ages=None,
+        paternal_half_sister_onset_ages=None):
+    """
+    Maps a cohort's onset ages to the smallest relative bin indices `calculate_risk` consults.
+
+    Returns a dict of int arrays of length `size`, holding NO_INDEX where a category has too few relatives.
+    """
+    return bin_relative_coordinates(
+        size,
+        mother=_mother_to_coo(size, mother_onset_ages),
+        daughter=_relatives_to_coo(size, daughter_onset_ages),
+        full_sister=_relatives_to_coo(size, full_sister_onset_ages),
+        maternal_aunt=_relatives_to_coo(size, maternal_aunt_onset_ages),
+        paternal_aunt=_relatives_to_coo(size, paternal_aunt_onset_ages),
+        maternal_grandmother=_relatives_to_coo(size, maternal_grandmother_onset_ages),
+        paternal_grandmother=_relatives_to_coo(size, paternal_grandmother_onset_ages),
+        maternal_half_sister=_relatives_to_coo(size, maternal_half_sister_onset_ages),
+        paternal_half_sister=_relatives_to_coo(size, paternal_half_sister_onset_ages),
+    )
+
+
+def bin_relative_coordinates(size, **relatives):
+    """
+    Like `bin_cohort`, for relatives given as (rows, onset ages) array pairs keyed by relationship ('mother',
+    'daughter', 'full_sister', ...). Each pair lists one diagnosed relative per element: the patient row it
+    belongs to and its onset age. Missing relationships have no relatives.
+    """
+    coordinates = {}
+    for relationship in ('mother',) + RELATIONSHIPS:
+        if relationship in relatives:
+            rows, ages = relatives.pop(relationship)
+            coordinates[relationship] = _valid_coo(np.asarray(rows, dtype=np.int64), np.asarray(ages, dtype=np.float64))
+        else:
+            coordinates[relationship] = _empty_coo()
+    if relatives:
+        raise TypeError('unknown relationships: {}'.format(', '.join(sorted(relatives))))
+
+    mother = coordinates['mother']
+    daughters = coordinates['daughter']
+    full_sisters = coordinates['full_sister']
+    maternal_aunts = coordinates['maternal_aunt']
+    paternal_aunts = coordinates['paternal_aunt']
+    maternal_grandmothers = coordinates['maternal_grandmother']
+    paternal_grandmothers = coordinates['paternal_grandmother']
+    maternal_half_sisters = coordinates['maternal_half_sister']
+    paternal_half_sisters = coordinates['paternal_half_sister']
+
+    first_degree = _smallest_two_bins(size, full_sisters, daughters, mother)
+    second_degree = _smallest_two_bins(
+        size,
+        maternal_aunts,
+        paternal_aunts,
+        maternal_grandmothers,
+        paternal_grandmothers,
+        maternal_half_sisters,
+        paternal_half_sisters
+    )
+    maternal_second_degree = _smallest_two_bins(size, maternal_aunts, maternal_grandmothers, maternal_half_sisters)
+    paternal_second_degree = _smallest_two_bins(size, paternal_aunts, paternal_grandmothers, paternal_half_sisters)
+
+    return {
+        'first_degree_1': first_degree[0],
+        'first_degree_2': first_degree[1],
+        'second_degree_1': second_degree[0],
+        'mother': _smallest_two_bins(size, mother)[0],
+        'maternal_aunt_1': _smallest_two_bins(size, maternal_aunts)[0],
+        'paternal_aunt_1': _smallest_two_bins(size, paternal_aunts)[0],
+        'maternal_second_degree_1': maternal_second_degree[0],
+        'maternal_second_degree_2': maternal_second_degree[1],
+        'paternal_second_degree_1': paternal_second_degree[0],
+        'paternal_second_degree_2': paternal_second_degree[1],
+    }
+
+
+def score_bins(patient_ages, bins, provenance=False):
+    """
+    Scores binned relatives (as returned by `bin_cohort`) for the given patient ages.
+
+    Mirrors the table selection in `calculate_risk`: each applicable table contributes a score and the
+    maximum wins. Patients with no applicable table get NaN. With `provenance`, also returns a
+    PROVENANCE_DTYPE array recording the winning criteria of each patient.
+    """
+    patient_ages = _as_patient_ages(patient_ages)
+    lower_bin, over_bin = np.divmod(patient_ages - 29, 10)
+
+    first_degree_1 = bins['first_degree_1']
+    first_degree_2 = bins['first_degree_2']
+    mother = bins['mother']
+    maternal_second_degree_1 = bins['maternal_second_degree_1']
+    maternal_second_degree_2 = bins['maternal_second_degree_2']
+    paternal_second_degree_1 = bins['paternal_second_degree_1']
+    paternal_second_degree_2 = bins['paternal_second_degree_2']
+
+    risk_scores = [
+        _table_risk(_ONE_FIRST_DEG, lower_bin, over_bin, first_degree_1),
+        _table_risk(_ONE_SECOND_DEG, lower_bin, over_bin, bins['second_degree_1']),
+        _table_risk(_TWO_FIRST_DEG, lower_bin, over_bin, first_degree_1, first_degree_2),
+        _table_risk(_MOTHER_MATERNAL_AUNT, lower_bin, over_bin, mother, bins['maternal_aunt_1']),
+        _table_risk(_MOTHER_PATERNAL_AUNT, lower_bin, over_bin, mother, bins['paternal_aunt_1']),
+        _table_risk(_TWO_SEC_DEG_SAME_SIDE, lower_bin, over_bin, maternal_second_degree_1, maternal_second_degree_2),
+        _table_risk(_TWO_SEC_DEG_SAME_SIDE, lower_bin, over_bin, paternal_second_degree_1, paternal_second_degree_2),
+        _table_risk(_TWO_SEC_DEG_DIFF_SIDE, lower_bin, over_bin, maternal_second_degree_1, paternal_second_degree_1),
+    ]
+
+    if provenance:
+        return _score_provenance(risk_scores, bins, lower_bin, over_bin)
+
+    # Rounding is monotonic, so rounding the maximum matches taking the maximum of rounded scores.
+    return np.round(np.fmax.reduce(risk_scores), 3)
+
+
+def _score_provenance(risk_scores, bins, lower_bin, over_bin):
+    """
+    Returns the risks and provenance of per-criteria scores in TABLE_CRITERIA order. The first criteria with the
+    maximal rounded score wins, as `max` picks in the scalar path.
+    """
+    rounded = np.round(np.stack(risk_scores), 3)
+    unscored = np.isnan(rounded)
+    winner = np.argmax(np.where(unscored, -np.inf, rounded), axis=0)
+    patients = np.arange(rounded.shape[1])
+    risks = rounded[winner, patients]
+    scored = ~unscored.all(axis=0)
+
+    relative1_indices = np.stack([bins[fields[0]] for _, fields in TABLE_CRITERIA])
+    relative2_indices = np.stack([
+        bins[fields[1]] if len(fields) == 2 else np.full(len(patients), MISSING, dtype=np.int64)
+        for _, fields in TABLE_CRITERIA
+    ])
+    provenance = np.full(len(patients), MISSING, dtype=PROVENANCE_DTYPE)
+    provenance['criteria'][scored] = winner[scored]
+    provenance['table'][scored] = _CRITERIA_TABLE_IDS[winner[scored]]
+    provenance['relative1_index'][scored] = relative1_indices[winner, patients][scored]
+    provenance['relative2_index'][scored] = relative2_indices[winner, patients][scored]
+    provenance['age_bin'][scored] = (lower_bin % TABLE_SIZE)[scored]
+    provenance['age_offset'][scored] = over_bin[scored]
+    return risks, provenance
+
+
+def _table_risk(table, lower_bin, over_bin, relative1_index, relative2_index=None):
+    """
+    Vectorized `get_lifetime_risk`, returning NaN where any relative index is NO_INDEX.
+
+    Uses the same operation order as the scalar path so that results agree exactly.
+    """
+    LIFETIME_AGE_INDEX = 5
+    applicable = relative1_index != NO_INDEX
+    relative_indices = (np.minimum(relative1_index, NO_INDEX - 1),)
+    if relative2_index is not None:
+        applicable &= relative2_index != NO_INDEX
+        relative_indices += (np.minimum(relative2_index, NO_INDEX - 1),)
+
+    lifetime_risk = table[(LIFETIME_AGE_INDEX,) + relative_indices]
+    # A lower bin of -1 (ages 20-28) wraps to the last row, as tuple indexing does in the scalar path.
+    current_age_risk = table[(lower_bin,) + relative_indices]
+    upper_bin_risk = table[(np.minimum(lower_bin + 1, LIFETIME_AGE_INDEX),) + relative_indices]
+    current_age_risk = np.where(
+        over_bin != 0,
+        current_age_risk + (upper_bin_risk - current_age_risk) * over_bin / 10,
+        current_age_risk
+    )
+
+    risk = (lifetime_risk - current_age_risk) / (1 - current_age_risk)
+    return np.where(applicable, risk, np.nan)
+
+
+def _as_patient_ages(patient_ages):
+    patient_ages = np.asarray(patient_ages)
+    if patient_ages.ndim != 1:
+        raise ValueError('patient_ages must be one-dimensional')
+    if patient_ages.dtype.kind not in 'iu':
+        # Converting straight to int64 would truncate fractional ages.
+        ages = patient_ages.astype(np.float64)
+        if not np.all(np.isfinite(ages) & (ages == np.floor(ages))):
+            raise ValueError('patient ages must be integers')
+    patient_ages = patient_ages.astype(np.int64)
+    if patient_ages.size and (patient_ages.min() < VALID_MIN_AGE or patient_ages.max() > VALID_MAX_AGE):
+        raise ValueError('patient ages must be between {} and {}'.format(VALID_MIN_AGE, VALID_MAX_AGE))
+    return patient_ages
+
+
+def _mother_to_coo(size, mother_onset_ages):
+    if mother_onset_ages is None:
+        return _empty_coo()
+    ages = np.asarray(mother_onset_ages, dtype=np.float64)
+    if ages.shape != (size,):
+        raise ValueError('mother_onset_ages must have one entry per patient')
+    return np.arange(size), ages
+
+
+def _relatives_to_coo(size, onset_ages):
+    """
+    Converts padded or ragged per-patient onset ages into (rows, onset ages) pairs.
+    """
+    if onset_ages is None:
+        return _empty_coo()
+
+    if isinstance(onset_ages, np.ndarray) and onset_ages.dtype != object:
+        ages = onset_ages.astype(np.float64)
+        if ages.ndim != 2 or ages.shape[0] != size:
+            raise ValueError('padded onset ages must be a 2-D array with one row per patient')
+        return np.repeat(np.arange(size), ages.shape[1]), ages.ravel()
+
+    if len(onset_ages) != size:
+        raise ValueError('ragged onset ages must have one entry per patient')
+    lengths = np.array([len(ages) if ages else 0 for ages in onset_ages], dtype=np.int64)
+    flat_ages = [age for ages in onset_ages if ages for age in ages]
+    return np.repeat(np.arange(size), lengths), np.array(flat_ages, dtype=np.float64)
+
+
+def _valid_coo(rows, ages):
+    # NaN padding compares false against both bounds and is dropped along with out-of-range ages.
+    valid = (ages >= VALID_MIN_AGE) & (ages <= VALID_MAX_AGE)
+    bins = (ages[valid].astype(np.int64) - 20) // 10
+    return rows[valid].astype(np.int64), bins
+
+
+def _empty_coo():
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+
+def _smallest_two_bins(size, *groups):
+    """
+    Returns the smallest and second smallest bin per patient across all (rows, bins) groups.
+    """
+    rows = np.concatenate([group[0] for group in groups])
+    bins = np.concatenate([group[1] for group in groups])
+
+    # Sorting a combined key orders entries by patient, then by bin.
+    keys = np.sort(rows * 8 + bins)
+    rows, bins = keys >> 3, keys & 7
+
+    counts = np.bincount(rows, minlength=size)
+    starts = np.cumsum(counts) - counts
+
+    smallest = np.full(size, NO_INDEX, dtype=np.int64)
+    second_smallest = np.full(size, NO_INDEX, dtype=np.int64)
+    has_one = counts >= 1
+    smallest[has_one] = bins[starts[has_one]]
+    has_two = counts >= 2
+    second_smallest[has_two] = bins[starts[has_two] + 1]
+    return smallest, second_smallest
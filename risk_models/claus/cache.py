@@ -0,0 +1,57 @@
+from collections import OrderedDict, namedtuple
+
+from risk_models.claus.claus import collect_family_indices, score_family_indices
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class ClausRiskCache(object):
+    """
+    Bounded LRU cache of claus risk scores.
+
+    Scores are keyed by the patient age and the FamilyIndices signature of the family history, so families
+    that bin the same way share one entry regardless of how many relatives they list.
+    """
+
+    def __init__(self, maxsize=65536):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def calculate_risk(self, patient_age, **relatives):
+        """
+        Same arguments and result as `calculate_risk`, served from the cache when the signature was seen.
+        """
+        return self.score(patient_age, collect_family_indices(**relatives))
+
+    def score(self, patient_age, family_indices):
+        """
+        Same result as `score_family_indices`, served from the cache when the signature was seen.
+        """
+        signature = (patient_age, family_indices)
+        entries = self._entries
+        try:
+            risk = entries.pop(signature)
+        except KeyError:
+            self._misses += 1
+            risk = score_family_indices(patient_age, family_indices)
+            if len(entries) >= self.maxsize:
+                entries.popitem(last=False)
+        else:
+            self._hits += 1
+        entries[signature] = risk
+        return risk
+
+    def cache_info(self):
+        return CacheInfo(self._hits, self._misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        """
+        Drops all cached scores and resets the hit/miss statistics.
+        """
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
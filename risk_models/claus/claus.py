@@ -1,11 +1,19 @@
 from __future__ import division
 
+try:
+    from time import perf_counter as default_timer
+except ImportError:
+    from timeit import default_timer
+
 from risk_models.claus.claus_tables import (
+    CLAUS_TABLES,
+    CLAUS_TABLE_RELATIVES,
     ONE_FIRST_DEG_TABLE,
     ONE_SECOND_DEG_TABLE,
     TWO_FIRST_DEG_TABLE,
     MOTHER_MATERNAL_AUNT,
     MOTHER_PATERNAL_AUNT,
+    TABLE_SIZE,
     TWO_SEC_DEG_DIFF_SIDE_TABLE,
     TWO_SEC_DEG_SAME_SIDE_TABLE,
 )
@@ -13,6 +21,73 @@ from risk_models.claus.claus_tables import (
 VALID_MIN_AGE = 20
 VALID_MAX_AGE = 79
 
+# Number of relative onset age bins (20-29, 30-39, ..., 70-79) in each table dimension.
+RELATIVE_BIN_COUNT = TABLE_SIZE
+PATIENT_AGE_COUNT = VALID_MAX_AGE - VALID_MIN_AGE + 1
+
+# Registered instrumentation collectors (see `risk_models.claus.instrumentation`, which imports and fills this
+# list). calculate_risk checks it before doing any instrumentation work.
+collectors = []
+
+
+class FamilyIndices(tuple):
+    """
+    The smallest relative bin indices consulted by the Claus tables, or None where a category has too few
+    relatives. Behaves like a namedtuple, which would import collections on the scoring import path.
+    """
+    __slots__ = ()
+    _fields = (
+        'first_degree_1',
+        'first_degree_2',
+        'second_degree_1',
+        'mother',
+        'maternal_aunt_1',
+        'paternal_aunt_1',
+        'maternal_second_degree_1',
+        'maternal_second_degree_2',
+        'paternal_second_degree_1',
+        'paternal_second_degree_2',
+    )
+
+    def __new__(cls, first_degree_1, first_degree_2, second_degree_1, mother, maternal_aunt_1, paternal_aunt_1,
+                maternal_second_degree_1, maternal_second_degree_2, paternal_second_degree_1, paternal_second_degree_2):
+        return tuple.__new__(cls, (
+            first_degree_1, first_degree_2, second_degree_1, mother, maternal_aunt_1, paternal_aunt_1,
+            maternal_second_degree_1, maternal_second_degree_2, paternal_second_degree_1, paternal_second_degree_2))
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    def __repr__(self):
+        return 'FamilyIndices({})'.format(
+            ', '.join('{}={!r}'.format(field, value) for field, value in zip(self._fields, self)))
+
+
+def _field_property(position):
+    return property(lambda family_indices: family_indices[position])
+
+
+for _position, _field in enumerate(FamilyIndices._fields):
+    setattr(FamilyIndices, _field, _field_property(_position))
+del _position, _field
+
+# The claus table criteria, in the order they are consulted: each table and the FamilyIndices fields holding
+# its relative indices. A criteria applies when all of its fields are set. `applicable_tables` evaluates the
+# same criteria with explicit branches.
+TABLE_CRITERIA = (
+    (ONE_FIRST_DEG_TABLE, ('first_degree_1',)),
+    (ONE_SECOND_DEG_TABLE, ('second_degree_1',)),
+    (TWO_FIRST_DEG_TABLE, ('first_degree_1', 'first_degree_2')),
+    (MOTHER_MATERNAL_AUNT, ('mother', 'maternal_aunt_1')),
+    (MOTHER_PATERNAL_AUNT, ('mother', 'paternal_aunt_1')),
+    (TWO_SEC_DEG_SAME_SIDE_TABLE, ('maternal_second_degree_1', 'maternal_second_degree_2')),
+    (TWO_SEC_DEG_SAME_SIDE_TABLE, ('paternal_second_degree_1', 'paternal_second_degree_2')),
+    (TWO_SEC_DEG_DIFF_SIDE_TABLE, ('maternal_second_degree_1', 'paternal_second_degree_1')),
+)
+
+_TABLE_IDS = dict((id(table), table_id) for table_id, table in enumerate(CLAUS_TABLES))
+_risk_lattice = None
+
 
 def calculate_risk(
         patient_age,
@@ -29,6 +104,97 @@ def calculate_risk(
     Calculates the lifteime claus risk score based on age of relatives' breast cancer onset and
     the patient's current cancer-free age.
     """
+    if not collectors:
+        if not (mother_onset_age or daughter_onset_ages or full_sister_onset_ages or maternal_aunt_onset_ages or
+                paternal_aunt_onset_ages or maternal_grandmother_onset_ages or paternal_grandmother_onset_ages or
+                maternal_half_sister_onset_ages or paternal_half_sister_onset_ages):
+            return None
+        return score_family_indices(patient_age, _family_indices(
+            mother_onset_age,
+            daughter_onset_ages,
+            full_sister_onset_ages,
+            maternal_aunt_onset_ages,
+            paternal_aunt_onset_ages,
+            maternal_grandmother_onset_ages,
+            paternal_grandmother_onset_ages,
+            maternal_half_sister_onset_ages,
+            paternal_half_sister_onset_ages,
+        ))
+
+    started = default_timer()
+    family_indices = _family_indices(
+        mother_onset_age,
+        daughter_onset_ages,
+        full_sister_onset_ages,
+        maternal_aunt_onset_ages,
+        paternal_aunt_onset_ages,
+        maternal_grandmother_onset_ages,
+        paternal_grandmother_onset_ages,
+        maternal_half_sister_onset_ages,
+        paternal_half_sister_onset_ages,
+    )
+
+    collected = default_timer()
+    tables = applicable_tables(family_indices)
+    risk_scores = [get_lifetime_risk(table, patient_age, relative1_index, relative2_index)
+                   for table, relative1_index, relative2_index in tables]
+    evaluated = default_timer()
+    # Only reached with collectors registered, so instrumentation is already imported.
+    from risk_models.claus import instrumentation
+
+    instrumentation.report(collected - started, evaluated - collected, tables, risk_scores, _count_invalid_ages(
+        [mother_onset_age] if mother_onset_age else None,
+        daughter_onset_ages,
+        full_sister_onset_ages,
+        maternal_aunt_onset_ages,
+        paternal_aunt_onset_ages,
+        maternal_grandmother_onset_ages,
+        paternal_grandmother_onset_ages,
+        maternal_half_sister_onset_ages,
+        paternal_half_sister_onset_ages
+    ))
+    return max(risk_scores) if risk_scores else None
+
+
+def collect_family_indices(
+        mother_onset_age=None,
+        daughter_onset_ages=None,
+        full_sister_onset_ages=None,
+        maternal_aunt_onset_ages=None,
+        paternal_aunt_onset_ages=None,
+        maternal_grandmother_onset_ages=None,
+        paternal_grandmother_onset_ages=None,
+        maternal_half_sister_onset_ages=None,
+        paternal_half_sister_onset_ages=None):
+    """
+    Bins relatives' onset ages and keeps only the smallest bin indices that the Claus tables consult.
+
+    Two family histories with equal FamilyIndices have the same risk at every patient age.
+    """
+    return FamilyIndices(*_family_indices(
+        mother_onset_age,
+        daughter_onset_ages,
+        full_sister_onset_ages,
+        maternal_aunt_onset_ages,
+        paternal_aunt_onset_ages,
+        maternal_grandmother_onset_ages,
+        paternal_grandmother_onset_ages,
+        maternal_half_sister_onset_ages,
+        paternal_half_sister_onset_ages,
+    ))
+
+
+def _family_indices(
+        mother_onset_age,
+        daughter_onset_ages,
+        full_sister_onset_ages,
+        maternal_aunt_onset_ages,
+        paternal_aunt_onset_ages,
+        maternal_grandmother_onset_ages,
+        paternal_grandmother_onset_ages,
+        maternal_half_sister_onset_ages,
+        paternal_half_sister_onset_ages):
+    # The fields of FamilyIndices as a plain tuple, which `calculate_risk` scores without building the namedtuple.
     first_degree_ages = [full_sister_onset_ages, daughter_onset_ages]
     if mother_onset_age:
         first_degree_ages.append([mother_onset_age])
@@ -61,37 +227,72 @@ def calculate_risk(
     if mother_onset_age and VALID_MIN_AGE <= mother_onset_age <= VALID_MAX_AGE:
         mother_index = _bin_age_to_index(mother_onset_age)
 
+    return (
+        first_degree_indices[0] if first_degree_indices else None,
+        first_degree_indices[1] if len(first_degree_indices) > 1 else None,
+        second_degree_indices[0] if second_degree_indices else None,
+        mother_index,
+        maternal_aunt_indices[0] if maternal_aunt_indices else None,
+        paternal_aunt_indices[0] if paternal_aunt_indices else None,
+        maternal_second_degree_indices[0] if maternal_second_degree_indices else None,
+        maternal_second_degree_indices[1] if len(maternal_second_degree_indices) > 1 else None,
+        paternal_second_degree_indices[0] if paternal_second_degree_indices else None,
+        paternal_second_degree_indices[1] if len(paternal_second_degree_indices) > 1 else None,
+    )
+
+
+def score_family_indices(patient_age, family_indices):
+    """
+    Calculates the lifetime claus risk score from binned relatives, as returned by `collect_family_indices`.
+    """
     # List of scores that match a claus table criteria. We consider lifetime risk to be the maximum value
-    risk_scores = []
+    risk_scores = [
+        get_lifetime_risk(table, patient_age, relative1_index, relative2_index)
+        for table, relative1_index, relative2_index in applicable_tables(family_indices)
+    ]
+
+    if len(risk_scores) == 0:
+        return None
+
+    return max(risk_scores)
 
-    if len(first_degree_indices) >= 1:
-        risk_scores.append(get_lifetime_risk(ONE_FIRST_DEG_TABLE, patient_age, first_degree_indices[0]))
 
-    if len(second_degree_indices) >= 1:
-        risk_scores.append(get_lifetime_risk(ONE_SECOND_DEG_TABLE, patient_age, second_degree_indices[0]))
+def applicable_tables(family_indices):
+    """
+    Returns (table, relative1_index, relative2_index) for every claus table criteria the binned relatives match,
+    in a fixed order. relative2_index is None for single relative tables.
+    """
+    (first_degree_1, first_degree_2, second_degree_1, mother, maternal_aunt_1, paternal_aunt_1,
+     maternal_second_degree_1, maternal_second_degree_2,
+     paternal_second_degree_1, paternal_second_degree_2) = family_indices
 
-    if len(first_degree_indices) >= 2:
-        risk_scores.append(get_lifetime_risk(TWO_FIRST_DEG_TABLE, patient_age, first_degree_indices[0], first_degree_indices[1]))
+    tables = []
 
-    if mother_index is not None:
-        if len(maternal_aunt_indices) >= 1:
-            risk_scores.append(get_lifetime_risk(MOTHER_MATERNAL_AUNT, patient_age, mother_index, maternal_aunt_indices[0]))
-        if len(paternal_aunt_indices) >= 1:
-            risk_scores.append(get_lifetime_risk(MOTHER_PATERNAL_AUNT, patient_age, mother_index, paternal_aunt_indices[0]))
+    if first_degree_1 is not None:
+        tables.append((ONE_FIRST_DEG_TABLE, first_degree_1, None))
 
-    if len(maternal_second_degree_indices) >= 2:
-        risk_scores.append(get_lifetime_risk(TWO_SEC_DEG_SAME_SIDE_TABLE, patient_age, maternal_second_degree_indices[0], maternal_second_degree_indices[1]))
+    if second_degree_1 is not None:
+        tables.append((ONE_SECOND_DEG_TABLE, second_degree_1, None))
 
-    if len(paternal_second_degree_indices) >= 2:
-        risk_scores.append(get_lifetime_risk(TWO_SEC_DEG_SAME_SIDE_TABLE, patient_age, paternal_second_degree_indices[0], paternal_second_degree_indices[1]))
+    if first_degree_2 is not None:
+        tables.append((TWO_FIRST_DEG_TABLE, first_degree_1, first_degree_2))
 
-    if len(maternal_second_degree_indices) >= 1 and len(paternal_second_degree_indices) >= 1:
-        risk_scores.append(get_lifetime_risk(TWO_SEC_DEG_DIFF_SIDE_TABLE, patient_age, maternal_second_degree_indices[0], paternal_second_degree_indices[0]))
+    if mother is not None:
+        if maternal_aunt_1 is not None:
+            tables.append((MOTHER_MATERNAL_AUNT, mother, maternal_aunt_1))
+        if paternal_aunt_1 is not None:
+            tables.append((MOTHER_PATERNAL_AUNT, mother, paternal_aunt_1))
 
-    if len(risk_scores) == 0:
-        return None
+    if maternal_second_degree_2 is not None:
+        tables.append((TWO_SEC_DEG_SAME_SIDE_TABLE, maternal_second_degree_1, maternal_second_degree_2))
 
-    return max(risk_scores)
+    if paternal_second_degree_2 is not None:
+        tables.append((TWO_SEC_DEG_SAME_SIDE_TABLE, paternal_second_degree_1, paternal_second_degree_2))
+
+    if maternal_second_degree_1 is not None and paternal_second_degree_1 is not None:
+        tables.append((TWO_SEC_DEG_DIFF_SIDE_TABLE, maternal_second_degree_1, paternal_second_degree_1))
+
+    return tables
 
 
 def get_lifetime_risk(table, patient_age, relative1_index, relative2_index=None):
@@ -106,26 +307,78 @@ def get_lifetime_risk(table, patient_age, relative1_index, relative2_index=None)
 
     EX: for age 33. We look up risk at 29 and 39. then estimate assuming risk at age 33 assuming linear change
     between those 10 years.
+
+    Results for the Claus tables over valid patient ages are served from the precomputed risk lattice.
     """
-    LIFETIME_AGE_INDEX = 5
-    lifetime_risk = _lookup_claus_table(table, LIFETIME_AGE_INDEX, relative1_index, relative2_index)
+    table_id = _TABLE_IDS.get(id(table))
+    if (table_id is not None and
+            VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE and
+            0 <= relative1_index < RELATIVE_BIN_COUNT and
+            CLAUS_TABLE_RELATIVES[table_id] == (1 if relative2_index is None else 2) and
+            (relative2_index is None or 0 <= relative2_index < RELATIVE_BIN_COUNT)):
+        return get_risk_lattice()[_lattice_offset(table_id, patient_age, relative1_index, relative2_index)]
+
+    # Off-lattice inputs are rare; the packed tables are imported only when one comes up.
+    from risk_models.claus.packed_tables import compute_lifetime_risk
+
+    return compute_lifetime_risk(table, patient_age, relative1_index, relative2_index)
 
-    # Get lower age bin index on table as well number years over that lower bin
-    patient_age_lower_bin_index, patient_age_over_bin = divmod(patient_age - 29, 10)
 
-    current_age_risk = _lookup_claus_table(table, patient_age_lower_bin_index, relative1_index, relative2_index)
+def build_risk_lattice():
+    """
+    Precomputes `get_lifetime_risk` for every table, relative index pair and valid patient age into one
+    contiguous array, indexed by `_lattice_offset`. Patient age is the innermost dimension, so the risks
+    of one table cell across all ages are adjacent.
+    """
+    global _risk_lattice
+    from risk_models.claus.packed_tables import compute_risk_lattice
 
-    if patient_age_over_bin:
-        patient_age_upper_bin_risk = _lookup_claus_table(table, patient_age_lower_bin_index + 1, relative1_index, relative2_index)
-        current_age_risk += (patient_age_upper_bin_risk - current_age_risk) * patient_age_over_bin / 10
+    _risk_lattice = compute_risk_lattice()
+    return _risk_lattice
 
-    return round((lifetime_risk - current_age_risk) / (1 - current_age_risk), 3)
 
+def get_risk_lattice():
+    """
+    Returns the precomputed risk lattice, building it on first use.
+    """
+    return _risk_lattice or build_risk_lattice()
 
-def _lookup_claus_table(table, patient_index, relative1_index, relative2_index=None):
-    if relative2_index is None:
-        return table[patient_index][relative1_index]
-    return table[patient_index][relative1_index][relative2_index]
+
+def verify_risk_lattice():
+    """
+    Checks every lattice entry against the lifetime risk formula. Returns the number of entries checked,
+    or raises ValueError on the first mismatch.
+    """
+    from risk_models.claus.packed_tables import compute_lifetime_risk
+
+    lattice = get_risk_lattice()
+    checked = 0
+    for table_id, table, relative1_index, relative2_index in _iter_table_cells():
+        for patient_age in range(VALID_MIN_AGE, VALID_MAX_AGE + 1):
+            expected = compute_lifetime_risk(table, patient_age, relative1_index, relative2_index)
+            actual = lattice[_lattice_offset(table_id, patient_age, relative1_index, relative2_index)]
+            if actual != expected:
+                raise ValueError('Risk lattice mismatch for table {}, age {}, relatives ({}, {}): {} != {}'.format(
+                    table_id, patient_age, relative1_index, relative2_index, actual, expected))
+            checked += 1
+    return checked
+
+
+def _iter_table_cells():
+    for table_id, table in enumerate(CLAUS_TABLES):
+        for relative1_index in range(RELATIVE_BIN_COUNT):
+            if CLAUS_TABLE_RELATIVES[table_id] == 1:
+                yield table_id, table, relative1_index, None
+                continue
+            for relative2_index in range(RELATIVE_BIN_COUNT):
+                yield table_id, table, relative1_index, relative2_index
+
+
+def _lattice_offset(table_id, patient_age, relative1_index, relative2_index=None):
+    # Single relative tables only use the relative2_index = 0 slice.
+    relative_offset = relative1_index * RELATIVE_BIN_COUNT + (relative2_index or 0)
+    return ((table_id * RELATIVE_BIN_COUNT * RELATIVE_BIN_COUNT + relative_offset) * PATIENT_AGE_COUNT +
+            patient_age - VALID_MIN_AGE)
 
 
 def collect_and_map_ages_to_indices(*age_groups):
@@ -142,5 +395,15 @@ def map_ages_to_indices(ages):
     return []
 
 
+def _count_invalid_ages(*age_groups):
+    return sum(1 for ages in age_groups if ages for age in ages if not VALID_MIN_AGE <= age <= VALID_MAX_AGE)
+
+
+def _nth(indices, position):
+    if len(indices) > position:
+        return indices[position]
+    return None
+
+
 def _bin_age_to_index(age):
     return (age - 20) // 10
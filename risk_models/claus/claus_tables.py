@@ -227,3 +227,31 @@ TWO_SEC_DEG_SAME_SIDE_TABLE = (((.010, .009, .009, .008, .007, .006),
                                 (.231, .200, .184, .158, .135, .117),
                                 (.211, .186, .159, .135, .116, .103),
                                 (.189, .162, .137, .117, .103, .094)))
+
+# Every table in a fixed order. Positions in this tuple identify tables in precomputed representations.
+CLAUS_TABLES = (
+    ONE_FIRST_DEG_TABLE,
+    ONE_SECOND_DEG_TABLE,
+    TWO_FIRST_DEG_TABLE,
+    MOTHER_MATERNAL_AUNT,
+    MOTHER_PATERNAL_AUNT,
+    TWO_SEC_DEG_DIFF_SIDE_TABLE,
+    TWO_SEC_DEG_SAME_SIDE_TABLE,
+)
+
+CLAUS_TABLE_NAMES = (
+    'ONE_FIRST_DEG_TABLE',
+    'ONE_SECOND_DEG_TABLE',
+    'TWO_FIRST_DEG_TABLE',
+    'MOTHER_MATERNAL_AUNT',
+    'MOTHER_PATERNAL_AUNT',
+    'TWO_SEC_DEG_DIFF_SIDE_TABLE',
+    'TWO_SEC_DEG_SAME_SIDE_TABLE',
+)
+
+# Number of relative indices each table in CLAUS_TABLES takes.
+CLAUS_TABLE_RELATIVES = (1, 1, 2, 2, 2, 2, 2)
+
+# Number of patient age rows, and of onset age bins per relative, in every table.
+TABLE_SIZE = 6
+
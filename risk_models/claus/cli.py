@@ -0,0 +1,241 @@
+"""
+Command line scorer for cohorts of family histories.
+
+Reads records from CSV or JSON Lines (see `risk_models.claus.records` for the record layout), scores them
+in fixed-size chunks and streams each record back out, in input order, with an added `risk` field.
+Malformed records, including ones that are not valid UTF-8, are reported to an error sidecar (or stderr) and do
+not stop the run.
+"""
+import argparse
+import codecs
+import csv
+import io
+import itertools
+import json
+import re
+import sys
+
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.records import parse_record
+
+RISK_FIELD = 'risk'
+FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 10000
+
+# Input that is not valid UTF-8 is decoded with each undecodable byte mapped to a lone surrogate, so that the
+# records holding it can be reported as malformed instead of aborting the run.
+_UNDECODABLE = re.compile(u'[\udc80-\udcff]')
+try:
+    codecs.lookup_error('surrogateescape')
+except LookupError:
+    # Python 2 has no surrogateescape error handler.
+    def _escape_undecodable(error):
+        undecodable = bytearray(error.object[error.start:error.end])
+        return u''.join(unichr(0xdc00 + byte) for byte in undecodable), error.end
+
+    _DECODE_ERRORS = 'risk_models.claus.surrogateescape'
+    codecs.register_error(_DECODE_ERRORS, _escape_undecodable)
+else:
+    _DECODE_ERRORS = 'surrogateescape'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='claus-risk', description='Score family histories with the Claus model.')
+    parser.add_argument('input', nargs='?', default='-', help='input file, or - for stdin (default)')
+    parser.add_argument('-o', '--output', default='-', help='output file, or - for stdout (default)')
+    parser.add_argument('-f', '--format', choices=FORMATS,
+                        help='input and output format (default: from the input file extension, else jsonl)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='number of records scored at a time (default: %(default)s)')
+    parser.add_argument('--errors', metavar='PATH',
+                        help='write malformed records to this JSON Lines file instead of stderr')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes; 0 for one per CPU (default: %(default)s)')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='persistent result cache; only records not scored in earlier runs are scored')
+    parser.add_argument('--cache-size', type=int, default=1000000,
+                        help='maximum number of cached results (default: %(default)s)')
+    parser.add_argument('--summary', metavar='PATH',
+                        help='write a mergeable JSON summary of the risk distribution by age band to this file')
+    parser.add_argument('--threshold', type=float, action='append',
+                        help='risk threshold counted in the summary; repeatable (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
+    if args.workers < 0:
+        parser.error('--workers must not be negative')
+    if args.cache_size < 1:
+        parser.error('--cache-size must be at least 1')
+    record_format = args.format or _infer_format(args.input)
+
+    aggregator = None
+    if args.summary:
+        from risk_models.claus.aggregation import DEFAULT_THRESHOLDS, RiskAggregator
+
+        aggregator = RiskAggregator(args.threshold or DEFAULT_THRESHOLDS)
+
+    # multiprocessing is imported only when needed, to keep single-process startup fast.
+    scorer = None
+    workers = args.workers
+    if workers == 0:
+        from multiprocessing import cpu_count
+
+        workers = cpu_count()
+    if workers > 1:
+        from risk_models.claus.parallel import ParallelScorer
+
+        # Split each chunk read from the input evenly across the workers.
+        scorer = ParallelScorer(workers, max(1, args.chunk_size // workers))
+    score_chunk = scorer and scorer.score_chunk
+
+    cache = cache_info = None
+    try:
+        if args.cache:
+            from risk_models.claus.result_cache import PersistentRiskCache
+
+            cache = PersistentRiskCache(args.cache, args.cache_size, score_batch=score_chunk)
+            score_chunk = cache.score_records
+        with _open(args.input, 'r', sys.stdin) as input_stream, \
+                _open(args.output, 'w', sys.stdout) as output_stream, \
+                _open(args.errors or '-', 'w', sys.stderr) as error_stream:
+            scored, failed = score_stream(input_stream, output_stream, record_format, args.chunk_size, error_stream,
+                                          score_chunk=score_chunk, aggregator=aggregator)
+            if cache is not None:
+                cache_info = cache.cache_info()
+    finally:
+        if cache is not None:
+            cache.close()
+        if scorer is not None:
+            scorer.close()
+
+    if aggregator is not None:
+        with open(args.summary, 'w') as f:
+            json.dump(aggregator.to_dict(), f)
+    sys.stderr.write('Scored {} records, {} malformed\n'.format(scored, failed))
+    if cache_info is not None:
+        sys.stderr.write('{} served from cache, {} scored\n'.format(cache_info.hits, cache_info.misses))
+    return 0
+
+
+def score_stream(input_stream, output_stream, record_format, chunk_size=DEFAULT_CHUNK_SIZE, error_stream=None,
+                 score_chunk=None, aggregator=None):
+    """
+    Scores every record read from `input_stream`, writing results to `output_stream` chunk by chunk.
+
+    `score_chunk` maps a list of `calculate_risk` keyword argument dicts to a list of risks, and defaults to
+    scoring them one at a time. Every risk is also added to `aggregator`, a `RiskAggregator`, if given.
+    Returns the number of scored and malformed records.
+    """
+    score_chunk = score_chunk or _score_chunk
+    output_stream = _text_writer(output_stream)
+    error_stream = error_stream and _text_writer(error_stream)
+    if record_format == 'csv':
+        reader = csv.DictReader(input_stream)
+        rows = ((reader.line_num, row) for row in reader)
+        if reader.fieldnames:
+            writer = csv.DictWriter(output_stream, fieldnames=reader.fieldnames + [RISK_FIELD], lineterminator='\n')
+            writer.writeheader()
+    else:
+        rows = ((line_number, line) for line_number, line in enumerate(input_stream, 1) if line.strip())
+
+    scored = failed = 0
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        records = []
+        arguments = []
+        for line_number, row in chunk:
+            try:
+                record = _load_csv(row) if record_format == 'csv' else _load_json(row)
+                arguments.append(parse_record(record))
+            except ValueError as e:
+                failed += 1
+                _write_error(error_stream, line_number, row, e)
+            else:
+                records.append(record)
+
+        for record, record_arguments, risk in zip(records, arguments, score_chunk(arguments)):
+            record[RISK_FIELD] = risk
+            if aggregator is not None:
+                aggregator.add(record_arguments['patient_age'], risk)
+            if record_format == 'csv':
+                writer.writerow(record)
+            else:
+                output_stream.write(json.dumps(record) + '\n')
+        scored += len(records)
+        output_stream.flush()
+
+    return scored, failed
+
+
+def _score_chunk(arguments):
+    return [calculate_risk(**record_arguments) for record_arguments in arguments]
+
+
+def _load_csv(row):
+    # csv.DictReader collects surplus values under a None key.
+    if None in row:
+        raise ValueError('row has more fields than the header')
+    # Missing trailing fields are None.
+    _check_decodable(u''.join(value for value in row.values() if value))
+    return row
+
+
+def _load_json(line):
+    _check_decodable(line)
+    # json.JSONDecodeError is a ValueError subclass.
+    return json.loads(line)
+
+
+def _check_decodable(text):
+    if _UNDECODABLE.search(text):
+        raise ValueError('record is not valid UTF-8')
+
+
+def _write_error(error_stream, line_number, row, error):
+    if error_stream is None:
+        return
+    error_stream.write(json.dumps({'line': line_number, 'error': str(error), 'record': row}) + '\n')
+
+
+class _Python2TextWriter(object):
+    """
+    Decodes the str that Python 2's csv and json modules produce before writing to an io text stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        if isinstance(text, bytes):
+            text = text.decode('utf-8')
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _text_writer(stream):
+    return _Python2TextWriter(stream) if sys.version_info[0] == 2 else stream
+
+
+def _infer_format(path):
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+def _open(path, mode, standard_stream):
+    errors = _DECODE_ERRORS if mode == 'r' else None
+    if path == '-':
+        # Keep the standard stream open when the with block exits.
+        return io.open(standard_stream.fileno(), mode, encoding='utf-8', errors=errors, newline='',
+                       closefd=False)
+    return io.open(path, mode, encoding='utf-8', errors=errors, newline='')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
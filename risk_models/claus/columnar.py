@@ -0,0 +1,118 @@
+"""
+Claus risk scoring of Parquet and Arrow IPC files, one record batch at a time.
+
+This module requires pyarrow and NumPy, which are optional dependencies:
+
+    pip install clrriskmodels[arrow]
+
+Input columns follow the record field names in `risk_models.claus.records`: an integer `patient_age`
+column, an optional integer `mother_onset_age` column and optional list<integer> columns for the other
+relationships (`daughter_onset_ages`, ...). Missing columns and null values mean no diagnosed relatives.
+Rows with a null or out-of-range patient age get a null risk.
+
+Each record batch is scored without converting rows to Python objects: list columns are flattened into
+(row, onset age) coordinates and binned with the NumPy batch scorer. Output files hold the input columns
+plus a float64 risk column, and are written batch by batch so memory use is bounded by the batch size.
+"""
+from __future__ import division
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from risk_models.claus.batch import bin_relative_coordinates, score_bins
+from risk_models.claus.claus import VALID_MIN_AGE, VALID_MAX_AGE
+from risk_models.claus.records import MOTHER_FIELD, PATIENT_AGE_FIELD, RELATIVE_FIELDS
+
+RISK_COLUMN = 'risk'
+DEFAULT_BATCH_SIZE = 65536
+
+# Relative record fields end in '_onset_ages'; bin_relative_coordinates takes the relationship name.
+_RELATIONSHIPS = dict((field, field[:-len('_onset_ages')]) for field in RELATIVE_FIELDS)
+
+
+def score_record_batch(batch, risk_column=RISK_COLUMN):
+    """
+    Returns `batch` with a float64 risk column appended (null where `calculate_risk` returns None).
+    """
+    return batch.append_column(pa.field(risk_column, pa.float64()), score_columns(batch))
+
+
+def score_columns(batch):
+    """
+    Scores the rows of a RecordBatch or Table and returns the risks as a float64 Arrow array.
+    """
+    size = batch.num_rows
+    names = batch.schema.names
+    if PATIENT_AGE_FIELD not in names:
+        raise ValueError('missing {} column'.format(PATIENT_AGE_FIELD))
+
+    patient_ages = _column_values(batch.column(names.index(PATIENT_AGE_FIELD)))
+    scored = (patient_ages >= VALID_MIN_AGE) & (patient_ages <= VALID_MAX_AGE)
+
+    relatives = {}
+    if MOTHER_FIELD in names:
+        relatives['mother'] = (np.arange(size), _column_values(batch.column(names.index(MOTHER_FIELD))))
+    for field, relationship in _RELATIONSHIPS.items():
+        if field in names:
+            relatives[relationship] = _list_coordinates(batch.column(names.index(field)), field)
+
+    bins = bin_relative_coordinates(size, **relatives)
+    # Unscored rows are binned and scored as age 20 patients, then masked out.
+    risks = score_bins(np.where(scored, patient_ages, VALID_MIN_AGE).astype(np.int64), bins)
+    return pa.array(risks, type=pa.float64(), mask=~scored | np.isnan(risks))
+
+
+def score_parquet(input_path, output_path, batch_size=DEFAULT_BATCH_SIZE, risk_column=RISK_COLUMN):
+    """
+    Scores a Parquet file into a new Parquet file and returns the number of rows written.
+    """
+    input_file = pq.ParquetFile(input_path)
+    schema = _output_schema(input_file.schema_arrow, risk_column)
+    rows = 0
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for batch in input_file.iter_batches(batch_size=batch_size):
+            writer.write_batch(score_record_batch(batch, risk_column))
+            rows += batch.num_rows
+    return rows
+
+
+def score_arrow_ipc(input_path, output_path, risk_column=RISK_COLUMN):
+    """
+    Scores an Arrow IPC (Feather v2) file into a new Arrow IPC file and returns the number of rows written.
+
+    The input is memory-mapped, so each record batch is read only as it is scored.
+    """
+    with pa.memory_map(input_path) as source:
+        reader = pa.ipc.open_file(source)
+        schema = _output_schema(reader.schema, risk_column)
+        rows = 0
+        with pa.OSFile(output_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                for index in range(reader.num_record_batches):
+                    batch = reader.get_batch(index)
+                    writer.write_batch(score_record_batch(batch, risk_column))
+                    rows += batch.num_rows
+    return rows
+
+
+def _output_schema(schema, risk_column):
+    if risk_column in schema.names:
+        raise ValueError('input already has a {} column'.format(risk_column))
+    return schema.append(pa.field(risk_column, pa.float64()))
+
+
+def _column_values(column):
+    # Nulls become NaN, which falls outside every valid age range.
+    return np.asarray(pc.cast(column, pa.float64()).to_numpy(zero_copy_only=False), dtype=np.float64)
+
+
+def _list_coordinates(column, field):
+    """
+    Flattens a list column into (rows, onset ages) arrays, one element per listed onset age.
+    """
+    if not (pa.types.is_list(column.type) or pa.types.is_large_list(column.type)):
+        raise ValueError('{} must be a list column, got {}'.format(field, column.type))
+    rows = pc.list_parent_indices(column).to_numpy(zero_copy_only=False)
+    return rows, _column_values(pc.list_flatten(column))
@@ -0,0 +1,148 @@
+"""
+Claus scoring specialized per family presence pattern.
+
+Which Claus tables apply depends only on which FamilyIndices fields are set. `score_family_indices` computes that
+presence bitmask and dispatches to a routine generated from TABLE_CRITERIA for exactly that pattern: it reads each
+applicable table's risk straight from the risk lattice and takes their max, with no criteria branches and no
+intermediate list. Each routine is generated the first time its pattern is seen.
+
+    from risk_models.claus.compiled import calculate_risk
+    calculate_risk(45, mother_onset_age=44, maternal_aunt_onset_ages=[51])
+
+Results are identical to `risk_models.claus.claus.calculate_risk`.
+"""
+from risk_models.claus import claus
+from risk_models.claus.claus import (
+    PATIENT_AGE_COUNT,
+    RELATIVE_BIN_COUNT,
+    TABLE_CRITERIA,
+    VALID_MIN_AGE,
+    VALID_MAX_AGE,
+    FamilyIndices,
+    _TABLE_IDS,
+    _family_indices,
+    get_risk_lattice,
+)
+
+PATTERN_COUNT = 1 << len(FamilyIndices._fields)
+
+_routines = [None] * PATTERN_COUNT
+
+
+def calculate_risk(
+        patient_age,
+        mother_onset_age=None,
+        daughter_onset_ages=None,
+        full_sister_onset_ages=None,
+        maternal_aunt_onset_ages=None,
+        paternal_aunt_onset_ages=None,
+        maternal_grandmother_onset_ages=None,
+        paternal_grandmother_onset_ages=None,
+        maternal_half_sister_onset_ages=None,
+        paternal_half_sister_onset_ages=None):
+    """
+    Same arguments and result as `risk_models.claus.claus.calculate_risk`.
+    """
+    if claus.collectors:
+        return claus.calculate_risk(
+            patient_age,
+            mother_onset_age=mother_onset_age,
+            daughter_onset_ages=daughter_onset_ages,
+            full_sister_onset_ages=full_sister_onset_ages,
+            maternal_aunt_onset_ages=maternal_aunt_onset_ages,
+            paternal_aunt_onset_ages=paternal_aunt_onset_ages,
+            maternal_grandmother_onset_ages=maternal_grandmother_onset_ages,
+            paternal_grandmother_onset_ages=paternal_grandmother_onset_ages,
+            maternal_half_sister_onset_ages=maternal_half_sister_onset_ages,
+            paternal_half_sister_onset_ages=paternal_half_sister_onset_ages,
+        )
+    if not (mother_onset_age or daughter_onset_ages or full_sister_onset_ages or maternal_aunt_onset_ages or
+            paternal_aunt_onset_ages or maternal_grandmother_onset_ages or paternal_grandmother_onset_ages or
+            maternal_half_sister_onset_ages or paternal_half_sister_onset_ages):
+        return None
+    return score_family_indices(patient_age, _family_indices(
+        mother_onset_age,
+        daughter_onset_ages,
+        full_sister_onset_ages,
+        maternal_aunt_onset_ages,
+        paternal_aunt_onset_ages,
+        maternal_grandmother_onset_ages,
+        paternal_grandmother_onset_ages,
+        maternal_half_sister_onset_ages,
+        paternal_half_sister_onset_ages,
+    ))
+
+
+def score_family_indices(patient_age, family_indices):
+    """
+    Same result as `risk_models.claus.claus.score_family_indices`, through the routine for the indices' presence
+    pattern. Patient ages outside the risk lattice take the generic path.
+    """
+    if not VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE:
+        return claus.score_family_indices(patient_age, family_indices)
+    mask = presence_mask(family_indices)
+    routine = _routines[mask] or compile_pattern(mask)
+    return routine(patient_age - VALID_MIN_AGE, family_indices, get_risk_lattice())
+
+
+def presence_mask(family_indices):
+    """
+    Returns the bitmask of set FamilyIndices fields, bit i standing for field i.
+    """
+    (first_degree_1, first_degree_2, second_degree_1, mother, maternal_aunt_1, paternal_aunt_1,
+     maternal_second_degree_1, maternal_second_degree_2,
+     paternal_second_degree_1, paternal_second_degree_2) = family_indices
+    return ((first_degree_1 is not None) |
+            (first_degree_2 is not None) << 1 |
+            (second_degree_1 is not None) << 2 |
+            (mother is not None) << 3 |
+            (maternal_aunt_1 is not None) << 4 |
+            (paternal_aunt_1 is not None) << 5 |
+            (maternal_second_degree_1 is not None) << 6 |
+            (maternal_second_degree_2 is not None) << 7 |
+            (paternal_second_degree_1 is not None) << 8 |
+            (paternal_second_degree_2 is not None) << 9)
+
+
+def compile_pattern(mask):
+    """
+    Generates, caches and returns the routine for a presence pattern. The routine takes the patient age offset from
+    VALID_MIN_AGE, the FamilyIndices and the risk lattice.
+    """
+    if not 0 <= mask < PATTERN_COUNT:
+        raise ValueError('presence mask must be between 0 and {}, got {}'.format(PATTERN_COUNT - 1, mask))
+    namespace = {}
+    exec(compile(pattern_source(mask), '<claus pattern {}>'.format(mask), 'exec'), namespace)
+    routine = _routines[mask] = namespace['score']
+    return routine
+
+
+def pattern_source(mask):
+    """
+    Returns the Python source of the routine for a presence pattern: one lattice read per applicable table criteria,
+    at offsets folded from the table id and relative index strides.
+    """
+    reads = []
+    used = set()
+    for table, fields in TABLE_CRITERIA:
+        positions = [FamilyIndices._fields.index(field) for field in fields]
+        if not all(mask >> position & 1 for position in positions):
+            continue
+        base = _TABLE_IDS[id(table)] * RELATIVE_BIN_COUNT * RELATIVE_BIN_COUNT * PATIENT_AGE_COUNT
+        terms = ['{} + age'.format(base), '{} * {}'.format(fields[0], RELATIVE_BIN_COUNT * PATIENT_AGE_COUNT)]
+        if len(fields) == 2:
+            terms.append('{} * {}'.format(fields[1], PATIENT_AGE_COUNT))
+        reads.append('lattice[{}]'.format(' + '.join(terms)))
+        used.update(fields)
+
+    lines = ['def score(age, family_indices, lattice):']
+    if not reads:
+        lines.append('    return None')
+    else:
+        for field in sorted(used, key=FamilyIndices._fields.index):
+            lines.append('    {} = family_indices[{}]'.format(field, FamilyIndices._fields.index(field)))
+        if len(reads) == 1:
+            lines.append('    return {}'.format(reads[0]))
+        else:
+            lines.append('    return max(\n        {},\n    )'.format(',\n        '.join(reads)))
+    return '\n'.join(lines) + '\n'
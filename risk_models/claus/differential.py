@@ -0,0 +1,407 @@
+"""
+Differential testing of `calculate_risk` fast paths against a reference implementation.
+
+Random family histories cover the whole input space: patient ages at and between bin edges, onset ages inside and
+outside the valid range, None and empty relative lists and large families. Each history is scored by
+`reference_calculate_risk`, a direct transcription of the original tuple-table algorithm, and by every registered
+fast path. Any disagreement is shrunk to a minimal reproducer.
+
+    python -m risk_models.claus.differential --cases 1000000
+
+Fast paths score a list of (patient age, relatives) cases at a time, so vectorized implementations are checked at
+full speed. Register new ones with `register_fast_path`. Use `--workers` to check chunks of cases in parallel.
+"""
+from __future__ import division, print_function
+
+import argparse
+import random
+import sys
+from collections import OrderedDict, namedtuple
+from multiprocessing import Pool
+
+from risk_models.claus.claus import VALID_MIN_AGE, VALID_MAX_AGE, calculate_risk
+from risk_models.claus.claus_tables import (
+    ONE_FIRST_DEG_TABLE,
+    ONE_SECOND_DEG_TABLE,
+    TWO_FIRST_DEG_TABLE,
+    MOTHER_MATERNAL_AUNT,
+    MOTHER_PATERNAL_AUNT,
+    TWO_SEC_DEG_DIFF_SIDE_TABLE,
+    TWO_SEC_DEG_SAME_SIDE_TABLE,
+)
+from risk_models.claus.records import MOTHER_FIELD, RELATIVE_FIELDS
+
+DEFAULT_CASES = 100000
+DEFAULT_CHUNK_SIZE = 10000
+
+# Patient ages on either side of every bin edge.
+EDGE_PATIENT_AGES = (20, 21, 28, 29, 30, 38, 39, 40, 49, 50, 59, 60, 69, 70, 78, 79)
+EDGE_ONSET_AGES = (20, 29, 30, 39, 40, 49, 50, 59, 60, 69, 70, 79)
+INVALID_ONSET_AGES = (-1, 0, 1, 15, 19, 80, 81, 99, 150)
+
+# A fast path result that differs from the reference: the fast path name, the (shrunk) inputs, the reference
+# risk and the fast path's risk (or the exception it raised).
+Mismatch = namedtuple('Mismatch', ['fast_path', 'patient_age', 'relatives', 'expected', 'actual'])
+# How many cases were checked, and the first mismatch found for each failing fast path.
+DifferentialReport = namedtuple('DifferentialReport', ['cases', 'mismatches'])
+
+_fast_paths = OrderedDict()
+_builtins_registered = False
+
+
+def register_fast_path(name, score_cases):
+    """
+    Registers a fast path. `score_cases` maps a list of (patient age, relatives keyword arguments) cases to their
+    risks.
+    """
+    _fast_paths[name] = score_cases
+
+
+def unregister_fast_path(name):
+    del _fast_paths[name]
+
+
+def fast_paths():
+    """
+    Returns the registered fast paths, registering the built-in ones on first use. Fast paths registered before
+    that come after the built-ins and replace any built-in of the same name.
+    """
+    global _builtins_registered
+    if not _builtins_registered:
+        _builtins_registered = True
+        custom = list(_fast_paths.items())
+        _fast_paths.clear()
+        _register_builtin_fast_paths()
+        _fast_paths.update(custom)
+    return OrderedDict(_fast_paths)
+
+
+def reference_calculate_risk(
+        patient_age,
+        mother_onset_age=None,
+        daughter_onset_ages=None,
+        full_sister_onset_ages=None,
+        maternal_aunt_onset_ages=None,
+        paternal_aunt_onset_ages=None,
+        maternal_grandmother_onset_ages=None,
+        paternal_grandmother_onset_ages=None,
+        maternal_half_sister_onset_ages=None,
+        paternal_half_sister_onset_ages=None):
+    """
+    The original `calculate_risk`: bins every relative list on each call and reads the table tuples directly.
+    """
+    first_degree_ages = [full_sister_onset_ages, daughter_onset_ages]
+    if mother_onset_age:
+        first_degree_ages.append([mother_onset_age])
+    first_degree_indices = _reference_indices(*first_degree_ages)
+    second_degree_indices = _reference_indices(
+        maternal_aunt_onset_ages,
+        paternal_aunt_onset_ages,
+        maternal_grandmother_onset_ages,
+        paternal_grandmother_onset_ages,
+        maternal_half_sister_onset_ages,
+        paternal_half_sister_onset_ages
+    )
+    maternal_aunt_indices = _reference_indices(maternal_aunt_onset_ages)
+    paternal_aunt_indices = _reference_indices(paternal_aunt_onset_ages)
+    maternal_second_degree_indices = _reference_indices(
+        maternal_aunt_onset_ages, maternal_grandmother_onset_ages, maternal_half_sister_onset_ages)
+    paternal_second_degree_indices = _reference_indices(
+        paternal_aunt_onset_ages, paternal_grandmother_onset_ages, paternal_half_sister_onset_ages)
+    mother_index = None
+    if mother_onset_age and VALID_MIN_AGE <= mother_onset_age <= VALID_MAX_AGE:
+        mother_index = (mother_onset_age - 20) // 10
+
+    risk_scores = []
+    if len(first_degree_indices) >= 1:
+        risk_scores.append(_reference_lifetime_risk(ONE_FIRST_DEG_TABLE, patient_age, first_degree_indices[0]))
+    if len(second_degree_indices) >= 1:
+        risk_scores.append(_reference_lifetime_risk(ONE_SECOND_DEG_TABLE, patient_age, second_degree_indices[0]))
+    if len(first_degree_indices) >= 2:
+        risk_scores.append(_reference_lifetime_risk(
+            TWO_FIRST_DEG_TABLE, patient_age, first_degree_indices[0], first_degree_indices[1]))
+    if mother_index is not None:
+        if len(maternal_aunt_indices) >= 1:
+            risk_scores.append(_reference_lifetime_risk(
+                MOTHER_MATERNAL_AUNT, patient_age, mother_index, maternal_aunt_indices[0]))
+        if len(paternal_aunt_indices) >= 1:
+            risk_scores.append(_reference_lifetime_risk(
+                MOTHER_PATERNAL_AUNT, patient_age, mother_index, paternal_aunt_indices[0]))
+    if len(maternal_second_degree_indices) >= 2:
+        risk_scores.append(_reference_lifetime_risk(
+            TWO_SEC_DEG_SAME_SIDE_TABLE, patient_age, maternal_second_degree_indices[0],
+            maternal_second_degree_indices[1]))
+    if len(paternal_second_degree_indices) >= 2:
+        risk_scores.append(_reference_lifetime_risk(
+            TWO_SEC_DEG_SAME_SIDE_TABLE, patient_age, paternal_second_degree_indices[0],
+            paternal_second_degree_indices[1]))
+    if len(maternal_second_degree_indices) >= 1 and len(paternal_second_degree_indices) >= 1:
+        risk_scores.append(_reference_lifetime_risk(
+            TWO_SEC_DEG_DIFF_SIDE_TABLE, patient_age, maternal_second_degree_indices[0],
+            paternal_second_degree_indices[0]))
+
+    if len(risk_scores) == 0:
+        return None
+    return max(risk_scores)
+
+
+def random_case(rng):
+    """
+    Returns a random (patient age, relatives keyword arguments) case.
+    """
+    patient_age = rng.choice(EDGE_PATIENT_AGES) if rng.random() < 0.3 else rng.randint(VALID_MIN_AGE, VALID_MAX_AGE)
+    relatives = {}
+    roll = rng.random()
+    if roll < 0.4:
+        relatives[MOTHER_FIELD] = _random_onset_age(rng)
+    elif roll < 0.5:
+        relatives[MOTHER_FIELD] = None
+
+    for field in RELATIVE_FIELDS:
+        roll = rng.random()
+        if roll < 0.45:
+            continue
+        if roll < 0.55:
+            relatives[field] = None
+        elif roll < 0.6:
+            relatives[field] = []
+        else:
+            count = rng.randint(5, 25) if rng.random() < 0.05 else rng.randint(1, 3)
+            relatives[field] = [_random_onset_age(rng) for _ in range(count)]
+    return patient_age, relatives
+
+
+def run_differential(cases=DEFAULT_CASES, seed=0, paths=None, chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+    """
+    Checks `cases` random histories against every fast path in `paths` (default: all registered) and returns a
+    DifferentialReport with one shrunk Mismatch per failing fast path.
+
+    Cases are generated in chunks of `chunk_size`, each from its own seed, so results do not depend on `workers`.
+    With more than one worker, chunks are checked in worker processes against the registered fast paths.
+    """
+    chunks = [(seed, index, min(chunk_size, cases - start)) for index, start in enumerate(range(0, cases, chunk_size))]
+    if workers > 1:
+        if paths is not None:
+            raise ValueError('worker processes can only check registered fast paths')
+        pool = Pool(workers)
+        try:
+            results = pool.map(_check_chunk, chunks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        paths = fast_paths() if paths is None else paths
+        results = [_check_chunk(chunk, paths) for chunk in chunks]
+
+    mismatches = OrderedDict()
+    for chunk_mismatches in results:
+        for mismatch in chunk_mismatches:
+            mismatches.setdefault(mismatch.fast_path, mismatch)
+    return DifferentialReport(sum(size for _, _, size in chunks), list(mismatches.values()))
+
+
+def shrink(name, score_cases, patient_age, relatives):
+    """
+    Greedily simplifies a failing case while the fast path still disagrees with the reference, and returns the
+    smallest Mismatch found.
+    """
+    def mismatch(case):
+        expected = reference_calculate_risk(case[0], **case[1])
+        actual = _score(score_cases, [case])[0]
+        return None if actual == expected else Mismatch(name, case[0], case[1], expected, actual)
+
+    case = (patient_age, dict(relatives))
+    smallest = mismatch(case)
+    if smallest is None:
+        raise ValueError('{} agrees with the reference on this case'.format(name))
+    improved = True
+    while improved:
+        improved = False
+        for candidate in _simplifications(case):
+            found = mismatch(candidate)
+            if found is not None:
+                case, smallest, improved = candidate, found, True
+                break
+    return smallest
+
+
+def format_mismatch(mismatch):
+    arguments = [str(mismatch.patient_age)] + [
+        '{}={!r}'.format(field, value) for field, value in sorted(mismatch.relatives.items())]
+    return '{}: calculate_risk({}) should be {!r}, got {!r}'.format(
+        mismatch.fast_path, ', '.join(arguments), mismatch.expected, mismatch.actual)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Differential test of Claus fast paths against the reference.')
+    parser.add_argument('--cases', type=int, default=DEFAULT_CASES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes (default: %(default)s)')
+    parser.add_argument('--answer-store', metavar='PATH', help='also check this answer file (see answer_store)')
+    args = parser.parse_args(argv)
+
+    if args.answer_store:
+        register_answer_store(args.answer_store)
+    report = run_differential(args.cases, args.seed, chunk_size=args.chunk_size, workers=args.workers)
+    print('Checked {} cases against {}'.format(report.cases, ', '.join(fast_paths())))
+    for mismatch in report.mismatches:
+        print('MISMATCH ' + format_mismatch(mismatch))
+    return 1 if report.mismatches else 0
+
+
+def register_answer_store(path):
+    """
+    Registers an answer file as a fast path (see `risk_models.claus.answer_store`).
+    """
+    from risk_models.claus.answer_store import AnswerStore
+
+    store = AnswerStore(path)
+    register_fast_path('answer_store', _scalar(store.calculate_risk))
+
+
+def _register_builtin_fast_paths():
+    from risk_models.claus import compiled
+    from risk_models.claus.cache import ClausRiskCache
+    from risk_models.claus.family_history import FamilyHistory, calculate_risk_for
+    from risk_models.claus.incremental import IncrementalClausScorer
+    from risk_models.claus.provenance import calculate_risk_with_provenance
+    from risk_models.claus.result_cache import PersistentRiskCache
+
+    register_fast_path('calculate_risk', _scalar(calculate_risk))
+    register_fast_path('family_history', _scalar(
+        lambda patient_age, **relatives: calculate_risk_for(FamilyHistory(**relatives), patient_age)))
+    register_fast_path('cache', _scalar(ClausRiskCache().calculate_risk))
+    register_fast_path('compiled', _scalar(compiled.calculate_risk))
+    register_fast_path('provenance', _scalar(
+        lambda patient_age, **relatives: calculate_risk_with_provenance(patient_age, **relatives).risk))
+
+    def incremental(patient_age, **relatives):
+        scorer = IncrementalClausScorer(patient_age)
+        for field, onset_ages in relatives.items():
+            scorer.update('mother' if field == MOTHER_FIELD else field[:-len('_onset_ages')], onset_ages)
+        return scorer.risk
+    register_fast_path('incremental', _scalar(incremental))
+
+    def result_cache(cases):
+        # A fresh in-memory cache per call, so worker processes never share a connection.
+        with PersistentRiskCache(':memory:') as cache:
+            return cache.score_records([dict(relatives, patient_age=patient_age) for patient_age, relatives in cases])
+    register_fast_path('result_cache', result_cache)
+
+    try:
+        from risk_models.claus.batch import calculate_risk_batch
+    except ImportError:
+        pass
+    else:
+        def batch(cases, provenance=False):
+            columns = dict((field, [relatives.get(field) for _, relatives in cases]) for field in RELATIVE_FIELDS)
+            mother_onset_ages = [relatives.get(MOTHER_FIELD) for _, relatives in cases]
+            risks = calculate_risk_batch(
+                [patient_age for patient_age, _ in cases],
+                mother_onset_ages=[float('nan') if age is None else age for age in mother_onset_ages],
+                provenance=provenance,
+                **columns)
+            if provenance:
+                risks = risks[0]
+            return [None if risk != risk else float(risk) for risk in risks]
+        register_fast_path('batch', batch)
+        register_fast_path('batch_provenance', lambda cases: batch(cases, provenance=True))
+
+
+def _check_chunk(chunk, paths=None):
+    # Returns a shrunk Mismatch for each fast path that fails on this chunk.
+    seed, index, size = chunk
+    paths = fast_paths() if paths is None else paths
+    rng = random.Random('{}:{}'.format(seed, index))
+    cases = [random_case(rng) for _ in range(size)]
+    expected = [reference_calculate_risk(patient_age, **relatives) for patient_age, relatives in cases]
+    mismatches = []
+    for name, score_cases in paths.items():
+        for case, expected_risk, actual in zip(cases, expected, _score(score_cases, cases)):
+            if actual != expected_risk:
+                mismatches.append(shrink(name, score_cases, *case))
+                break
+    return mismatches
+
+
+def _scalar(function):
+    return lambda cases: [function(patient_age, **relatives) for patient_age, relatives in cases]
+
+
+def _score(score_cases, cases):
+    # A fast path that raises is reported with the exception as its result, case by case.
+    try:
+        return score_cases(cases)
+    except Exception:
+        results = []
+        for case in cases:
+            try:
+                results.extend(score_cases([case]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+def _simplifications(case):
+    # Candidate cases, each one step simpler than `case`: fewer relatives first, then simpler ages.
+    patient_age, relatives = case
+    for field in sorted(relatives):
+        yield patient_age, dict((key, value) for key, value in relatives.items() if key != field)
+    for field, onset_ages in sorted(relatives.items()):
+        if isinstance(onset_ages, list):
+            for position in range(len(onset_ages)):
+                yield patient_age, dict(relatives, **{field: onset_ages[:position] + onset_ages[position + 1:]})
+    for field, value in sorted(relatives.items()):
+        if isinstance(value, list):
+            for position, onset_age in enumerate(value):
+                for simpler in _simpler_ages(onset_age):
+                    yield patient_age, dict(relatives, **{field: value[:position] + [simpler] + value[position + 1:]})
+        elif value is not None:
+            for simpler in _simpler_ages(value):
+                yield patient_age, dict(relatives, **{field: simpler})
+    for simpler in _simpler_ages(patient_age):
+        if VALID_MIN_AGE <= simpler <= VALID_MAX_AGE:
+            yield simpler, relatives
+
+
+def _simpler_ages(age):
+    # The start of the age's decade, then the valid minimum.
+    simpler = []
+    if VALID_MIN_AGE <= age <= VALID_MAX_AGE and age % 10:
+        simpler.append(age - age % 10)
+    if age != VALID_MIN_AGE:
+        simpler.append(VALID_MIN_AGE)
+    return simpler
+
+
+def _reference_indices(*age_groups):
+    ages = [age for group in age_groups if group for age in group]
+    return sorted((age - 20) // 10 for age in ages if VALID_MIN_AGE <= age <= VALID_MAX_AGE)
+
+
+def _reference_lifetime_risk(table, patient_age, relative1_index, relative2_index=None):
+    def lookup(patient_index):
+        if relative2_index is None:
+            return table[patient_index][relative1_index]
+        return table[patient_index][relative1_index][relative2_index]
+
+    lifetime_risk = lookup(5)
+    lower_bin_index, over_bin = divmod(patient_age - 29, 10)
+    current_age_risk = lookup(lower_bin_index)
+    if over_bin:
+        current_age_risk += (lookup(lower_bin_index + 1) - current_age_risk) * over_bin / 10
+    return round((lifetime_risk - current_age_risk) / (1 - current_age_risk), 3)
+
+
+def _random_onset_age(rng):
+    roll = rng.random()
+    if roll < 0.2:
+        return rng.choice(INVALID_ONSET_AGES)
+    if roll < 0.4:
+        return rng.choice(EDGE_ONSET_AGES)
+    return rng.randint(VALID_MIN_AGE, VALID_MAX_AGE)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
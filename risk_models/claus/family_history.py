@@ -0,0 +1,176 @@
+import numbers
+
+from risk_models.claus.claus import (
+    FamilyIndices,
+    VALID_MIN_AGE,
+    VALID_MAX_AGE,
+    _bin_age_to_index,
+    _nth,
+    map_ages_to_indices,
+    score_family_indices,
+)
+
+RELATIONSHIPS = (
+    'daughter',
+    'full_sister',
+    'maternal_aunt',
+    'paternal_aunt',
+    'maternal_grandmother',
+    'paternal_grandmother',
+    'maternal_half_sister',
+    'paternal_half_sister',
+)
+FIRST_DEGREE_RELATIONSHIPS = ('full_sister', 'daughter')
+SECOND_DEGREE_RELATIONSHIPS = RELATIONSHIPS[2:]
+MATERNAL_SECOND_DEGREE_RELATIONSHIPS = ('maternal_aunt', 'maternal_grandmother', 'maternal_half_sister')
+PATERNAL_SECOND_DEGREE_RELATIONSHIPS = ('paternal_aunt', 'paternal_grandmother', 'paternal_half_sister')
+
+
+class FamilyHistory(object):
+    """
+    Immutable family history whose onset ages are validated and binned once, on construction.
+
+    Takes the same relative arguments as `calculate_risk`. Onset ages outside the valid range are kept but,
+    as in `calculate_risk`, do not contribute to the risk. Attributes cannot be reassigned, and `onset_ages` and
+    `relative_indices` are read-only mappings of tuples, so results keyed on `family_indices` never go stale.
+    """
+    __slots__ = ('mother_onset_age', 'onset_ages', 'mother_index', 'relative_indices', 'family_indices')
+
+    def __init__(
+            self,
+            mother_onset_age=None,
+            daughter_onset_ages=None,
+            full_sister_onset_ages=None,
+            maternal_aunt_onset_ages=None,
+            paternal_aunt_onset_ages=None,
+            maternal_grandmother_onset_ages=None,
+            paternal_grandmother_onset_ages=None,
+            maternal_half_sister_onset_ages=None,
+            paternal_half_sister_onset_ages=None):
+        onset_ages = (
+            daughter_onset_ages,
+            full_sister_onset_ages,
+            maternal_aunt_onset_ages,
+            paternal_aunt_onset_ages,
+            maternal_grandmother_onset_ages,
+            paternal_grandmother_onset_ages,
+            maternal_half_sister_onset_ages,
+            paternal_half_sister_onset_ages,
+        )
+        if mother_onset_age is not None:
+            _validate_age(mother_onset_age, 'mother')
+        for relationship, ages in zip(RELATIONSHIPS, onset_ages):
+            for age in ages or ():
+                _validate_age(age, relationship)
+
+        # Per relationship, the onset ages as given and the sorted bin indices of the valid ones.
+        onset_ages = _ReadOnlyDict(
+            (relationship, tuple(ages or ())) for relationship, ages in zip(RELATIONSHIPS, onset_ages))
+        relative_indices = _ReadOnlyDict(
+            (relationship, tuple(map_ages_to_indices(ages))) for relationship, ages in onset_ages.items())
+
+        mother_index = None
+        if mother_onset_age and VALID_MIN_AGE <= mother_onset_age <= VALID_MAX_AGE:
+            mother_index = _bin_age_to_index(mother_onset_age)
+
+        object.__setattr__(self, 'mother_onset_age', mother_onset_age)
+        object.__setattr__(self, 'onset_ages', onset_ages)
+        object.__setattr__(self, 'mother_index', mother_index)
+        object.__setattr__(self, 'relative_indices', relative_indices)
+        object.__setattr__(self, 'family_indices', combine_relative_indices(mother_index, relative_indices))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('FamilyHistory is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('FamilyHistory is immutable')
+
+    def __reduce__(self):
+        # Positional arguments follow RELATIONSHIPS after the mother's onset age.
+        return FamilyHistory, (self.mother_onset_age,) + tuple(
+            self.onset_ages[relationship] for relationship in RELATIONSHIPS)
+
+    def as_kwargs(self):
+        """
+        Returns the family history as `calculate_risk` keyword arguments.
+        """
+        kwargs = dict((relationship + '_onset_ages', list(ages)) for relationship, ages in self.onset_ages.items())
+        kwargs['mother_onset_age'] = self.mother_onset_age
+        return kwargs
+
+    def __eq__(self, other):
+        if not isinstance(other, FamilyHistory):
+            return NotImplemented
+        return self.mother_onset_age == other.mother_onset_age and self.onset_ages == other.onset_ages
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash((self.mother_onset_age, tuple(self.onset_ages[relationship] for relationship in RELATIONSHIPS)))
+
+    def __repr__(self):
+        arguments = ['mother_onset_age={!r}'.format(self.mother_onset_age)] if self.mother_onset_age else []
+        arguments.extend('{}_onset_ages={!r}'.format(relationship, list(self.onset_ages[relationship]))
+                         for relationship in RELATIONSHIPS if self.onset_ages[relationship])
+        return 'FamilyHistory({})'.format(', '.join(arguments))
+
+
+def calculate_risk_for(history, patient_age):
+    """
+    Same result as `calculate_risk` for a FamilyHistory, without binning its onset ages again.
+    """
+    return score_family_indices(patient_age, history.family_indices)
+
+
+def combine_relative_indices(mother_index, relative_indices):
+    """
+    Builds FamilyIndices from the mother's bin index and each relationship's sorted bin indices.
+    """
+    first_degree = _merge(relative_indices, FIRST_DEGREE_RELATIONSHIPS)
+    if mother_index is not None:
+        first_degree = sorted(first_degree + [mother_index])[:2]
+    maternal_second_degree = _merge(relative_indices, MATERNAL_SECOND_DEGREE_RELATIONSHIPS)
+    paternal_second_degree = _merge(relative_indices, PATERNAL_SECOND_DEGREE_RELATIONSHIPS)
+    second_degree = sorted(maternal_second_degree[:1] + paternal_second_degree[:1])
+    maternal_aunt = relative_indices['maternal_aunt']
+    paternal_aunt = relative_indices['paternal_aunt']
+
+    return FamilyIndices(
+        _nth(first_degree, 0),
+        _nth(first_degree, 1),
+        _nth(second_degree, 0),
+        mother_index,
+        _nth(maternal_aunt, 0),
+        _nth(paternal_aunt, 0),
+        _nth(maternal_second_degree, 0),
+        _nth(maternal_second_degree, 1),
+        _nth(paternal_second_degree, 0),
+        _nth(paternal_second_degree, 1),
+    )
+
+
+class _ReadOnlyDict(dict):
+    """
+    A dict whose items cannot be changed after construction.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('{} is read-only'.format(type(self).__name__))
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+    __ior__ = _read_only
+
+    def __reduce__(self):
+        return _ReadOnlyDict, (dict(self),)
+
+
+def _merge(relative_indices, relationships):
+    # Only the two smallest bins of any category are consulted, so two per relationship are enough.
+    return sorted(index for relationship in relationships for index in relative_indices[relationship][:2])[:2]
+
+
+def _validate_age(age, relationship):
+    if isinstance(age, bool) or not isinstance(age, numbers.Integral):
+        raise ValueError('{} onset age must be an integer, got {!r}'.format(relationship, age))
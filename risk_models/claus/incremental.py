@@ -0,0 +1,107 @@
+from collections import namedtuple
+
+from risk_models.claus.claus import (
+    FamilyIndices,
+    TABLE_CRITERIA,
+    VALID_MIN_AGE,
+    VALID_MAX_AGE,
+    _bin_age_to_index,
+    get_lifetime_risk,
+    map_ages_to_indices,
+)
+from risk_models.claus.family_history import RELATIONSHIPS, _validate_age, combine_relative_indices
+
+MOTHER = 'mother'
+
+RiskUpdate = namedtuple('RiskUpdate', ['risk', 'changed'])
+
+
+class IncrementalClausScorer(object):
+    """
+    Keeps the claus risk of one patient current as relatives' diagnoses are added or updated.
+
+    Holds each relationship's sorted bin indices and the score of every table criteria. An update re-evaluates
+    only the criteria whose relative indices changed. For example, a new aunt diagnosis can only affect the
+    second degree, same side, different side and mother + aunt tables.
+    """
+
+    def __init__(self, patient_age, history=None):
+        if not VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE:
+            raise ValueError('patient age must be between {} and {}, got {}'.format(
+                VALID_MIN_AGE, VALID_MAX_AGE, patient_age))
+        self.patient_age = patient_age
+        self.mother_onset_age = None
+        self.onset_ages = dict((relationship, ()) for relationship in RELATIONSHIPS)
+        self._mother_index = None
+        self._relative_indices = dict((relationship, ()) for relationship in RELATIONSHIPS)
+        self._family_indices = FamilyIndices(*([None] * len(FamilyIndices._fields)))
+        self._table_scores = [None] * len(TABLE_CRITERIA)
+        self.risk = None
+
+        if history is not None:
+            self.mother_onset_age = history.mother_onset_age
+            self.onset_ages = dict(history.onset_ages)
+            self._mother_index = history.mother_index
+            self._relative_indices = dict(history.relative_indices)
+            self._rescore(history.family_indices)
+
+    def update(self, relationship, onset_ages):
+        """
+        Replaces the onset ages of one relationship ('mother' takes a single age or None) and returns a
+        RiskUpdate with the new risk and whether it changed.
+        """
+        if relationship == MOTHER:
+            if onset_ages is not None:
+                _validate_age(onset_ages, MOTHER)
+            self.mother_onset_age = onset_ages
+            self._mother_index = None
+            if onset_ages and VALID_MIN_AGE <= onset_ages <= VALID_MAX_AGE:
+                self._mother_index = _bin_age_to_index(onset_ages)
+        elif relationship in self.onset_ages:
+            onset_ages = tuple(onset_ages or ())
+            for age in onset_ages:
+                _validate_age(age, relationship)
+            self.onset_ages[relationship] = onset_ages
+            self._relative_indices[relationship] = tuple(map_ages_to_indices(onset_ages))
+        else:
+            raise ValueError('unknown relationship {!r}'.format(relationship))
+
+        previous_risk = self.risk
+        self._rescore(combine_relative_indices(self._mother_index, self._relative_indices))
+        return RiskUpdate(self.risk, self.risk != previous_risk)
+
+    def add_relative(self, relationship, onset_age):
+        """
+        Adds one diagnosed relative ('mother' sets the mother's onset age) and returns a RiskUpdate.
+        """
+        if relationship == MOTHER:
+            return self.update(MOTHER, onset_age)
+        if relationship not in self.onset_ages:
+            raise ValueError('unknown relationship {!r}'.format(relationship))
+        return self.update(relationship, self.onset_ages[relationship] + (onset_age,))
+
+    @property
+    def table_scores(self):
+        """
+        Score of every criteria in TABLE_CRITERIA order, None where a criteria does not apply.
+        """
+        return list(self._table_scores)
+
+    def _rescore(self, family_indices):
+        changed_fields = set(
+            field for field, old, new in zip(FamilyIndices._fields, self._family_indices, family_indices)
+            if old != new
+        )
+        self._family_indices = family_indices
+
+        for position, (table, fields) in enumerate(TABLE_CRITERIA):
+            if changed_fields.isdisjoint(fields):
+                continue
+            relative_indices = [getattr(family_indices, field) for field in fields]
+            if None in relative_indices:
+                self._table_scores[position] = None
+            else:
+                self._table_scores[position] = get_lifetime_risk(table, self.patient_age, *relative_indices)
+
+        risk_scores = [score for score in self._table_scores if score is not None]
+        self.risk = max(risk_scores) if risk_scores else None
@@ -0,0 +1,119 @@
+"""
+Optional instrumentation of `calculate_risk`.
+
+Register a collector (any callable taking a ScoreEvent) to receive one event per `calculate_risk` call. With no
+collectors registered, `calculate_risk` skips all instrumentation work.
+
+    collector = InMemoryCollector()
+    with collecting(collector):
+        calculate_risk(...)
+    print(prometheus_text(collector))
+"""
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+# Registered collectors. calculate_risk checks this list before doing any instrumentation work; it lives in
+# risk_models.claus.claus so that scoring does not import this module.
+from risk_models.claus.claus import collectors
+from risk_models.claus.claus_tables import CLAUS_TABLES, CLAUS_TABLE_NAMES
+
+COLLECT_PHASE = 'collect_indices'
+EVALUATE_PHASE = 'evaluate_tables'
+
+# One calculate_risk call: seconds spent collecting indices and evaluating tables, the names of the tables
+# consulted, the name of the winning table (None if no table applied) and how many onset ages were dropped
+# for being outside the valid age range.
+ScoreEvent = namedtuple('ScoreEvent', [
+    'collect_seconds',
+    'evaluate_seconds',
+    'tables_consulted',
+    'winning_table',
+    'dropped_ages',
+])
+
+_TABLE_NAMES = dict((id(table), name) for table, name in zip(CLAUS_TABLES, CLAUS_TABLE_NAMES))
+
+
+def register(collector):
+    collectors.append(collector)
+
+
+def unregister(collector):
+    collectors.remove(collector)
+
+
+@contextmanager
+def collecting(collector):
+    """
+    Registers `collector` for the duration of a with block.
+    """
+    register(collector)
+    try:
+        yield collector
+    finally:
+        unregister(collector)
+
+
+def report(collect_seconds, evaluate_seconds, tables, risk_scores, dropped_ages):
+    """
+    Sends a ScoreEvent to every collector. `tables` are the (table, relative1_index, relative2_index) entries
+    evaluated, in order, and `risk_scores` their scores.
+    """
+    names = [_TABLE_NAMES[id(table)] for table, _, _ in tables]
+    winning_table = names[risk_scores.index(max(risk_scores))] if risk_scores else None
+    event = ScoreEvent(collect_seconds, evaluate_seconds, names, winning_table, dropped_ages)
+    for collector in list(collectors):
+        collector(event)
+
+
+class InMemoryCollector(object):
+    """
+    Accumulates counters and phase timings from ScoreEvents.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.tables_consulted = Counter()
+        self.tables_won = Counter()
+        self.dropped_ages = 0
+        self.phase_seconds = Counter()
+
+    def __call__(self, event):
+        self.calls += 1
+        self.tables_consulted.update(event.tables_consulted)
+        if event.winning_table is not None:
+            self.tables_won[event.winning_table] += 1
+        self.dropped_ages += event.dropped_ages
+        self.phase_seconds[COLLECT_PHASE] += event.collect_seconds
+        self.phase_seconds[EVALUATE_PHASE] += event.evaluate_seconds
+
+
+def prometheus_text(collector):
+    """
+    Renders an InMemoryCollector in the Prometheus text exposition format.
+    """
+    lines = [
+        '# HELP claus_calculate_risk_total Number of calculate_risk calls.',
+        '# TYPE claus_calculate_risk_total counter',
+        'claus_calculate_risk_total {}'.format(collector.calls),
+        '# HELP claus_table_consulted_total Number of times each claus table was evaluated.',
+        '# TYPE claus_table_consulted_total counter',
+    ]
+    lines.extend('claus_table_consulted_total{{table="{}"}} {}'.format(name, collector.tables_consulted[name])
+                 for name in CLAUS_TABLE_NAMES)
+    lines.extend([
+        '# HELP claus_table_won_total Number of times each claus table gave the maximum risk.',
+        '# TYPE claus_table_won_total counter',
+    ])
+    lines.extend('claus_table_won_total{{table="{}"}} {}'.format(name, collector.tables_won[name])
+                 for name in CLAUS_TABLE_NAMES)
+    lines.extend([
+        '# HELP claus_dropped_ages_total Number of onset ages outside the valid age range.',
+        '# TYPE claus_dropped_ages_total counter',
+        'claus_dropped_ages_total {}'.format(collector.dropped_ages),
+        '# HELP claus_phase_seconds_total Time spent in each calculate_risk phase.',
+        '# TYPE claus_phase_seconds_total counter',
+    ])
+    lines.extend('claus_phase_seconds_total{{phase="{}"}} {!r}'.format(phase, collector.phase_seconds[phase])
+                 for phase in (COLLECT_PHASE, EVALUATE_PHASE))
+    return '\n'.join(lines) + '\n'
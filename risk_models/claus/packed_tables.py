@@ -0,0 +1,110 @@
+"""
+The Claus tables packed into one contiguous row-major buffer of doubles, and the lifetime risk formula read from it.
+
+Scoring reads the precomputed risk lattice, so only building the lattice, scoring outside it and the batch scorer
+need the packed tables. `risk_models.claus.claus` imports this module on first use, keeping it off the import path
+of `calculate_risk`.
+"""
+from __future__ import division
+
+import hashlib
+from array import array
+
+from risk_models.claus.claus import (
+    PATIENT_AGE_COUNT,
+    RELATIVE_BIN_COUNT,
+    VALID_MIN_AGE,
+    VALID_MAX_AGE,
+    _TABLE_IDS,
+    _iter_table_cells,
+    _lattice_offset,
+)
+from risk_models.claus.claus_tables import CLAUS_TABLES, CLAUS_TABLE_NAMES, CLAUS_TABLE_RELATIVES, TABLE_SIZE
+
+
+def _flatten(table):
+    if isinstance(table, tuple):
+        return [value for row in table for value in _flatten(row)]
+    return [table]
+
+
+# All tables packed into one contiguous row-major buffer of doubles. Table i starts at TABLE_OFFSETS[i] and has
+# element strides TABLE_STRIDES[i] along (patient age row, relative 1 bin[, relative 2 bin]).
+# The tuples in claus_tables stay the read-only source of truth; the packed buffer must not be modified either.
+PACKED_TABLES = array('d', [value for table in CLAUS_TABLES for value in _flatten(table)])
+TABLE_STRIDES = tuple(
+    tuple(TABLE_SIZE ** dimension for dimension in reversed(range(relatives + 1)))
+    for relatives in CLAUS_TABLE_RELATIVES
+)
+TABLE_OFFSETS = tuple(sum(TABLE_SIZE ** (relatives + 1) for relatives in CLAUS_TABLE_RELATIVES[:table_id])
+                      for table_id in range(len(CLAUS_TABLES)))
+
+
+def table_fingerprint():
+    """
+    Returns a hex digest identifying the table contents and layout. Changes whenever any table value changes.
+    """
+    digest = hashlib.sha256(repr((CLAUS_TABLE_NAMES, CLAUS_TABLE_RELATIVES)).encode('ascii'))
+    # array.tobytes is tostring on Python 2.
+    digest.update(PACKED_TABLES.tobytes() if hasattr(PACKED_TABLES, 'tobytes') else PACKED_TABLES.tostring())
+    return digest.hexdigest()
+
+
+def compute_lifetime_risk(table, patient_age, relative1_index, relative2_index=None):
+    """
+    The lifetime risk formula behind `get_lifetime_risk`, evaluated from the table rather than the risk lattice.
+    """
+    LIFETIME_AGE_INDEX = 5
+    lifetime_risk = lookup_claus_table(table, LIFETIME_AGE_INDEX, relative1_index, relative2_index)
+
+    # Get lower age bin index on table as well number years over that lower bin
+    patient_age_lower_bin_index, patient_age_over_bin = divmod(patient_age - 29, 10)
+
+    current_age_risk = lookup_claus_table(table, patient_age_lower_bin_index, relative1_index, relative2_index)
+
+    if patient_age_over_bin:
+        patient_age_upper_bin_risk = lookup_claus_table(table, patient_age_lower_bin_index + 1, relative1_index, relative2_index)
+        current_age_risk += (patient_age_upper_bin_risk - current_age_risk) * patient_age_over_bin / 10
+
+    return round((lifetime_risk - current_age_risk) / (1 - current_age_risk), 3)
+
+
+def compute_risk_lattice():
+    """
+    Returns `compute_lifetime_risk` for every table, relative index pair and valid patient age in one contiguous
+    array, indexed by `_lattice_offset`.
+    """
+    lattice = array('d', [0.0]) * (len(CLAUS_TABLES) * RELATIVE_BIN_COUNT * RELATIVE_BIN_COUNT * PATIENT_AGE_COUNT)
+    for table_id, table, relative1_index, relative2_index in _iter_table_cells():
+        for patient_age in range(VALID_MIN_AGE, VALID_MAX_AGE + 1):
+            lattice[_lattice_offset(table_id, patient_age, relative1_index, relative2_index)] = (
+                compute_lifetime_risk(table, patient_age, relative1_index, relative2_index))
+    return lattice
+
+
+def lookup_claus_table(table, patient_index, relative1_index, relative2_index=None):
+    """
+    Reads a table cell from the packed table buffer. Indices behave like tuple indices: negative values count
+    from the end and out-of-range values raise IndexError.
+    """
+    table_id = _TABLE_IDS.get(id(table))
+    if table_id is None or CLAUS_TABLE_RELATIVES[table_id] != (1 if relative2_index is None else 2):
+        if relative2_index is None:
+            return table[patient_index][relative1_index]
+        return table[patient_index][relative1_index][relative2_index]
+
+    strides = TABLE_STRIDES[table_id]
+    offset = (TABLE_OFFSETS[table_id] +
+              _table_index(patient_index) * strides[0] +
+              _table_index(relative1_index) * strides[1])
+    if relative2_index is not None:
+        offset += _table_index(relative2_index) * strides[2]
+    return PACKED_TABLES[offset]
+
+
+def _table_index(index):
+    if index < 0:
+        index += TABLE_SIZE
+    if not 0 <= index < TABLE_SIZE:
+        raise IndexError('table index out of range')
+    return index
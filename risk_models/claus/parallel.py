@@ -0,0 +1,74 @@
+"""
+Multi-process cohort scoring.
+
+Records are `calculate_risk` keyword argument dicts (see `risk_models.claus.records.parse_record`). They are
+grouped into chunks that worker processes score independently. Results come back in input order.
+"""
+import itertools
+from collections import deque
+from multiprocessing import Pool, cpu_count
+
+from risk_models.claus.claus import calculate_risk
+
+DEFAULT_CHUNK_SIZE = 1000
+# Chunks in flight per worker. Bounds memory on large inputs while keeping every worker busy.
+CHUNKS_PER_WORKER = 2
+
+
+class ParallelScorer(object):
+    """
+    Scores records on a pool of worker processes. Use as a context manager, or call `close()` when done.
+    """
+
+    def __init__(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+        self.workers = workers or cpu_count()
+        self.chunk_size = chunk_size
+        self._pool = Pool(self.workers)
+
+    def map(self, records):
+        """
+        Yields the risk of every record, in order. Reads `records` lazily, a few chunks ahead of the output.
+        """
+        records = iter(records)
+        pending = deque()
+        while True:
+            while len(pending) < self.workers * CHUNKS_PER_WORKER:
+                chunk = list(itertools.islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                pending.append(self._pool.apply_async(_score_chunk, (chunk,)))
+            if not pending:
+                return
+            for risk in pending.popleft().get():
+                yield risk
+
+    def score_chunk(self, records):
+        """
+        Scores a list of records in parallel and returns their risks as a list.
+        """
+        return list(self.map(records))
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def score_records_parallel(records, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields the risk of every record, in order, scored on a pool of `workers` processes (default: CPU count).
+    """
+    with ParallelScorer(workers, chunk_size) as scorer:
+        for risk in scorer.map(records):
+            yield risk
+
+
+def _score_chunk(records):
+    return [calculate_risk(**record) for record in records]
@@ -0,0 +1,197 @@
+"""
+Claus risk from a pedigree graph of individuals linked to their mothers and fathers.
+
+    pedigree = Pedigree([
+        Individual('grandmother', FEMALE, None, None, age=None, onset_age=61),
+        Individual('mother', FEMALE, 'grandmother', None, age=None, onset_age=48),
+        Individual('father', MALE, None, None, age=None, onset_age=None),
+        Individual('proband', FEMALE, 'mother', 'father', age=45, onset_age=None),
+    ])
+    pedigree.calculate_risk('proband')
+    pedigree.score_females()
+
+Siblings are full siblings when they share both parents, and half siblings when they share only their mother or
+only their father (including when a father is unknown). Aunts are daughters of either grandparent on that side.
+
+The graph is indexed once: for every parent and every couple, the daughters diagnosed at a valid onset age are
+kept in onset order, bounded to the few earliest that any relative classification can need. Classifying one
+proband's relatives then takes constant time, so scoring every female is linear in the size of the pedigree, up
+to sorting each sibship.
+"""
+from collections import defaultdict, namedtuple
+
+from risk_models.claus.claus import VALID_MIN_AGE, VALID_MAX_AGE, calculate_risk
+
+FEMALE = 'F'
+MALE = 'M'
+
+# One person: a unique id, sex (FEMALE or MALE), the ids of her or his parents (None where unknown), the current
+# age and the breast cancer onset age (None if not diagnosed).
+Individual = namedtuple('Individual', ['id', 'sex', 'mother', 'father', 'age', 'onset_age'])
+
+# calculate_risk consults at most the two earliest onset ages of each relationship.
+_RELATIVES_PER_RELATIONSHIP = 2
+# Daughters kept per couple: enough for two full sisters besides the proband.
+_DAUGHTERS_PER_COUPLE = _RELATIVES_PER_RELATIONSHIP + 1
+# Daughters kept per parent. At most three share any one other parent, so the first five include two half
+# sisters of any proband (whose own parents' daughters are excluded), and the first three are the earliest three.
+_DAUGHTERS_PER_PARENT = _RELATIVES_PER_RELATIONSHIP + _DAUGHTERS_PER_COUPLE
+
+
+class Pedigree(object):
+    """
+    Indexed pedigree. Raises ValueError for duplicate ids, links to unknown individuals and parents of the
+    wrong sex.
+    """
+
+    def __init__(self, individuals):
+        self.individuals = {}
+        for individual in individuals:
+            if individual.id in self.individuals:
+                raise ValueError('duplicate individual {!r}'.format(individual.id))
+            if individual.sex not in (FEMALE, MALE):
+                raise ValueError('{!r} has unknown sex {!r}'.format(individual.id, individual.sex))
+            self.individuals[individual.id] = individual
+
+        daughters_by_parent = defaultdict(list)
+        daughters_by_couple = defaultdict(list)
+        for individual in self.individuals.values():
+            for parent_id, sex in ((individual.mother, FEMALE), (individual.father, MALE)):
+                if parent_id is None:
+                    continue
+                parent = self.individuals.get(parent_id)
+                if parent is None:
+                    raise ValueError('{!r} has unknown parent {!r}'.format(individual.id, parent_id))
+                if parent.sex != sex:
+                    raise ValueError('{!r} cannot be the {} of {!r}'.format(
+                        parent_id, 'mother' if sex == FEMALE else 'father', individual.id))
+            if individual.sex == FEMALE and _counts(individual.onset_age):
+                entry = (individual.onset_age, individual.id)
+                if individual.mother is not None:
+                    daughters_by_parent[individual.mother].append(entry + (individual.father,))
+                if individual.father is not None:
+                    daughters_by_parent[individual.father].append(entry + (individual.mother,))
+                if individual.mother is not None and individual.father is not None:
+                    daughters_by_couple[individual.mother, individual.father].append(entry)
+
+        self._daughters_by_parent = dict(
+            (parent_id, _earliest_by_other_parent(entries)) for parent_id, entries in daughters_by_parent.items())
+        self._daughters_by_couple = dict(
+            (couple, sorted(entries, key=_onset_age)[:_DAUGHTERS_PER_COUPLE])
+            for couple, entries in daughters_by_couple.items()
+        )
+
+    def relatives(self, individual_id):
+        """
+        Returns `calculate_risk` relative keyword arguments for an individual. Each relationship lists the (at most
+        two) earliest valid onset ages, which are all that `calculate_risk` consults.
+        """
+        individual = self._get(individual_id)
+        mother = self.individuals.get(individual.mother)
+        father = self.individuals.get(individual.father)
+
+        full_sisters = []
+        if mother is not None and father is not None:
+            full_sisters = self._daughters_by_couple.get((mother.id, father.id), [])
+
+        return {
+            'mother_onset_age': mother.onset_age if mother is not None and _counts(mother.onset_age) else None,
+            'daughter_onset_ages': self._daughters(individual_id),
+            'full_sister_onset_ages': _earliest(entry for entry in full_sisters if entry[1] != individual_id),
+            'maternal_aunt_onset_ages': self._sisters_of(mother),
+            'paternal_aunt_onset_ages': self._sisters_of(father),
+            'maternal_grandmother_onset_ages': self._mother_onset_ages(mother),
+            'paternal_grandmother_onset_ages': self._mother_onset_ages(father),
+            'maternal_half_sister_onset_ages': self._half_sisters(individual, individual.mother, individual.father),
+            'paternal_half_sister_onset_ages': self._half_sisters(individual, individual.father, individual.mother),
+        }
+
+    def calculate_risk(self, individual_id):
+        """
+        Returns the Claus risk of an individual as the proband, using her current age.
+        """
+        individual = self._get(individual_id)
+        if individual.age is None or not VALID_MIN_AGE <= individual.age <= VALID_MAX_AGE:
+            raise ValueError('{!r} must have an age between {} and {}, got {}'.format(
+                individual_id, VALID_MIN_AGE, VALID_MAX_AGE, individual.age))
+        return calculate_risk(individual.age, **self.relatives(individual_id))
+
+    def score_females(self):
+        """
+        Returns {id: risk} with every female of a valid current age scored as the proband.
+        """
+        return dict(
+            (individual.id, self.calculate_risk(individual.id))
+            for individual in self.individuals.values()
+            if individual.sex == FEMALE and individual.age is not None and
+            VALID_MIN_AGE <= individual.age <= VALID_MAX_AGE
+        )
+
+    def _get(self, individual_id):
+        individual = self.individuals.get(individual_id)
+        if individual is None:
+            raise ValueError('unknown individual {!r}'.format(individual_id))
+        return individual
+
+    def _daughters(self, parent_id):
+        return _earliest(self._daughters_by_parent.get(parent_id, ()))
+
+    def _sisters_of(self, parent):
+        # Daughters of either grandparent on this side, other than the parent herself or himself.
+        if parent is None:
+            return []
+        entries = {}
+        for grandparent_id in (parent.mother, parent.father):
+            for entry in self._daughters_by_parent.get(grandparent_id, ())[:_DAUGHTERS_PER_COUPLE]:
+                if entry[1] != parent.id:
+                    entries[entry[1]] = entry
+        return _earliest(sorted(entries.values(), key=_onset_age))
+
+    def _mother_onset_ages(self, parent):
+        if parent is None or parent.mother is None:
+            return []
+        onset_age = self.individuals[parent.mother].onset_age
+        return [onset_age] if _counts(onset_age) else []
+
+    def _half_sisters(self, individual, parent_id, other_parent_id):
+        # Daughters of `parent_id` whose other parent is unknown or differs from the individual's.
+        if parent_id is None:
+            return []
+        return _earliest(
+            entry for entry in self._daughters_by_parent.get(parent_id, ())
+            if entry[1] != individual.id and (other_parent_id is None or entry[2] != other_parent_id)
+        )
+
+
+def _counts(onset_age):
+    # Whether calculate_risk would count this onset age.
+    return onset_age is not None and VALID_MIN_AGE <= onset_age <= VALID_MAX_AGE
+
+
+def _onset_age(entry):
+    return entry[0]
+
+
+def _earliest_by_other_parent(entries):
+    """
+    Sorts (onset age, id, other parent id) entries and keeps the first _DAUGHTERS_PER_PARENT, with at most
+    _DAUGHTERS_PER_COUPLE per other parent.
+    """
+    kept = []
+    per_other_parent = defaultdict(int)
+    for entry in sorted(entries, key=_onset_age):
+        if per_other_parent[entry[2]] < _DAUGHTERS_PER_COUPLE:
+            per_other_parent[entry[2]] += 1
+            kept.append(entry)
+            if len(kept) == _DAUGHTERS_PER_PARENT:
+                break
+    return kept
+
+
+def _earliest(entries):
+    onset_ages = []
+    for entry in entries:
+        onset_ages.append(entry[0])
+        if len(onset_ages) == _RELATIVES_PER_RELATIONSHIP:
+            break
+    return onset_ages
@@ -0,0 +1,95 @@
+"""
+Claus risk with the provenance of each score, for audits.
+
+`calculate_risk_with_provenance` returns the risk together with the table criteria that produced it, the
+relative bin indices looked up and the patient age interpolation point. `calculate_risk_batch(...,
+provenance=True)` in `risk_models.claus.batch` returns the same fields for a whole cohort as one byte each.
+
+Fields:
+
+- criteria: position in TABLE_CRITERIA of the winning criteria. It tells apart the maternal and paternal uses of
+  TWO_SEC_DEG_SAME_SIDE_TABLE.
+- table: position of the winning table in CLAUS_TABLES (see CLAUS_TABLE_NAMES).
+- relative1_index, relative2_index: the relative bin indices looked up in that table (relative2_index is missing
+  for single relative tables).
+- age_bin: the table row of the lower interpolation point. Ages 20-28 interpolate from the lifetime row (5)
+  towards row 0, as `get_lifetime_risk` does.
+- age_offset: years past the lower interpolation point, from 0 to 9. The risk at the patient's age is
+  interpolated age_offset tenths of the way to the next row.
+
+When several criteria share the maximal risk, the first in TABLE_CRITERIA order wins. Patients with no applicable
+table have no provenance: the scalar fields are None, and the batch fields hold MISSING.
+"""
+from collections import namedtuple
+
+from risk_models.claus.claus import (
+    TABLE_CRITERIA,
+    FamilyIndices,
+    _TABLE_IDS,
+    collect_family_indices,
+    get_lifetime_risk,
+)
+from risk_models.claus.claus_tables import TABLE_SIZE
+
+PROVENANCE_FIELDS = ('criteria', 'table', 'relative1_index', 'relative2_index', 'age_bin', 'age_offset')
+# Value of a batch provenance field that does not apply.
+MISSING = 255
+
+Provenance = namedtuple('Provenance', ('risk',) + PROVENANCE_FIELDS)
+
+_NO_PROVENANCE = Provenance(*([None] * len(Provenance._fields)))
+
+
+def calculate_risk_with_provenance(
+        patient_age,
+        mother_onset_age=None,
+        daughter_onset_ages=None,
+        full_sister_onset_ages=None,
+        maternal_aunt_onset_ages=None,
+        paternal_aunt_onset_ages=None,
+        maternal_grandmother_onset_ages=None,
+        paternal_grandmother_onset_ages=None,
+        maternal_half_sister_onset_ages=None,
+        paternal_half_sister_onset_ages=None):
+    """
+    Same arguments as `calculate_risk`. Returns a Provenance whose risk is the `calculate_risk` result.
+    """
+    return score_family_indices_with_provenance(patient_age, collect_family_indices(
+        mother_onset_age=mother_onset_age,
+        daughter_onset_ages=daughter_onset_ages,
+        full_sister_onset_ages=full_sister_onset_ages,
+        maternal_aunt_onset_ages=maternal_aunt_onset_ages,
+        paternal_aunt_onset_ages=paternal_aunt_onset_ages,
+        maternal_grandmother_onset_ages=maternal_grandmother_onset_ages,
+        paternal_grandmother_onset_ages=paternal_grandmother_onset_ages,
+        maternal_half_sister_onset_ages=maternal_half_sister_onset_ages,
+        paternal_half_sister_onset_ages=paternal_half_sister_onset_ages,
+    ))
+
+
+def score_family_indices_with_provenance(patient_age, family_indices):
+    """
+    Provenance of `score_family_indices` for binned relatives.
+    """
+    winner = None
+    for criteria, (table, fields) in enumerate(TABLE_CRITERIA):
+        relative_indices = [family_indices[FamilyIndices._fields.index(field)] for field in fields]
+        if None in relative_indices:
+            continue
+        risk = get_lifetime_risk(table, patient_age, *relative_indices)
+        if winner is None or risk > winner[0]:
+            winner = (risk, criteria, table, relative_indices)
+    if winner is None:
+        return _NO_PROVENANCE
+
+    risk, criteria, table, relative_indices = winner
+    lower_bin, age_offset = divmod(patient_age - 29, 10)
+    return Provenance(
+        risk,
+        criteria,
+        _TABLE_IDS[id(table)],
+        relative_indices[0],
+        relative_indices[1] if len(relative_indices) == 2 else None,
+        lower_bin % TABLE_SIZE,
+        age_offset,
+    )
@@ -0,0 +1,87 @@
+"""
+Conversion of loosely typed input records, such as parsed CSV rows or JSON objects, into `calculate_risk`
+keyword arguments.
+
+Records use the `calculate_risk` argument names as keys. Relative onset ages are lists, or strings of ages
+separated by semicolons when they come from CSV.
+"""
+import numbers
+
+from risk_models.claus.claus import VALID_MIN_AGE, VALID_MAX_AGE
+
+PATIENT_AGE_FIELD = 'patient_age'
+MOTHER_FIELD = 'mother_onset_age'
+RELATIVE_FIELDS = (
+    'daughter_onset_ages',
+    'full_sister_onset_ages',
+    'maternal_aunt_onset_ages',
+    'paternal_aunt_onset_ages',
+    'maternal_grandmother_onset_ages',
+    'paternal_grandmother_onset_ages',
+    'maternal_half_sister_onset_ages',
+    'paternal_half_sister_onset_ages',
+)
+AGE_LIST_SEPARATOR = ';'
+
+try:
+    # Python 2: CSV fields are str and JSON strings are unicode.
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    _STRING_TYPES = (str,)
+
+
+def parse_record(record):
+    """
+    Returns the `calculate_risk` keyword arguments (including patient_age) for a record.
+
+    Raises ValueError if a field is malformed or the patient age is outside the valid range.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('record must be an object, got {!r}'.format(record))
+
+    patient_age = _parse_age(record.get(PATIENT_AGE_FIELD), PATIENT_AGE_FIELD)
+    if patient_age is None:
+        raise ValueError('{} is required'.format(PATIENT_AGE_FIELD))
+    if not VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE:
+        raise ValueError('{} must be between {} and {}, got {}'.format(
+            PATIENT_AGE_FIELD, VALID_MIN_AGE, VALID_MAX_AGE, patient_age))
+    arguments = {PATIENT_AGE_FIELD: patient_age}
+
+    mother_onset_age = _parse_age(record.get(MOTHER_FIELD), MOTHER_FIELD)
+    if mother_onset_age is not None:
+        arguments[MOTHER_FIELD] = mother_onset_age
+
+    for field in RELATIVE_FIELDS:
+        onset_ages = _parse_ages(record.get(field), field)
+        if onset_ages:
+            arguments[field] = onset_ages
+
+    return arguments
+
+
+def _parse_ages(value, field):
+    if value is None:
+        return []
+    if isinstance(value, _STRING_TYPES):
+        value = [age for age in value.split(AGE_LIST_SEPARATOR) if age.strip()]
+    elif not isinstance(value, (list, tuple)):
+        raise ValueError('{} must be a list of ages, got {!r}'.format(field, value))
+    onset_ages = [_parse_age(age, field) for age in value]
+    if None in onset_ages:
+        raise ValueError('{} must not contain empty ages, got {!r}'.format(field, value))
+    return onset_ages
+
+
+def _parse_age(value, field):
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError('{} must be an integer age, got {!r}'.format(field, value))
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, _STRING_TYPES):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise ValueError('{} must be an integer age, got {!r}'.format(field, value))
@@ -0,0 +1,154 @@
+"""
+Persistent, content-addressed cache of claus risk scores in a local SQLite file.
+
+Entries are keyed by a sha256 hash of the normalized inputs (the patient age, the mother's onset age and each
+relationship's sorted onset ages, dropping ages `calculate_risk` ignores) together with the table fingerprint.
+Rescoring a cohort that hardly changes only runs the scorer for new or changed records:
+
+    with PersistentRiskCache('claus-cache.sqlite') as cache:
+        risks = cache.score_records(records)
+
+Opening a cache built from different tables drops its entries, so table edits invalidate it automatically.
+When the cache grows past `max_entries`, the least recently used entries are evicted.
+"""
+import hashlib
+import json
+import sqlite3
+
+from risk_models.claus.cache import CacheInfo
+from risk_models.claus.claus import VALID_MIN_AGE, VALID_MAX_AGE, calculate_risk
+from risk_models.claus.packed_tables import table_fingerprint
+from risk_models.claus.records import MOTHER_FIELD, PATIENT_AGE_FIELD, RELATIVE_FIELDS
+
+FORMAT_VERSION = 1
+DEFAULT_MAX_ENTRIES = 1000000
+# SQLite limits the number of bound parameters per statement.
+_QUERY_BATCH_SIZE = 500
+
+
+class PersistentRiskCache(object):
+    """
+    Claus risk scores persisted across runs, bounded to `max_entries` entries.
+
+    Cache misses are scored with `score_batch`, which maps a list of `calculate_risk` keyword argument dicts to
+    their risks, and defaults to scoring them one at a time.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, score_batch=None):
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        self.path = path
+        self.max_entries = max_entries
+        self.score_batch = score_batch or _score_batch
+        self._fingerprint = '{}:{}'.format(FORMAT_VERSION, table_fingerprint())
+        self._connection = sqlite3.connect(path)
+        self._hits = 0
+        self._misses = 0
+
+        with self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, risk REAL, used INTEGER NOT NULL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+            row = self._connection.execute("SELECT value FROM meta WHERE name = 'fingerprint'").fetchone()
+            if row is None or row[0] != self._fingerprint:
+                self._connection.execute('DELETE FROM entries')
+                self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (self._fingerprint,))
+        self._clock = self._connection.execute('SELECT COALESCE(MAX(used), 0) FROM entries').fetchone()[0]
+
+    def calculate_risk(self, patient_age, **relatives):
+        """
+        Same arguments and result as `calculate_risk`, served from the cache when the inputs were seen.
+        """
+        return self.score_records([dict(relatives, patient_age=patient_age)])[0]
+
+    def score_records(self, records):
+        """
+        Scores a list of `calculate_risk` keyword argument dicts, passing only records not already cached to
+        `score_batch`, and returns their risks in order.
+        """
+        keys = [self._key(record) for record in records]
+        cached = {}
+        unique_keys = list(set(keys))
+        for start in range(0, len(unique_keys), _QUERY_BATCH_SIZE):
+            batch = unique_keys[start:start + _QUERY_BATCH_SIZE]
+            cached.update(self._connection.execute(
+                'SELECT key, risk FROM entries WHERE key IN ({})'.format(', '.join('?' * len(batch))), batch))
+
+        missing = {}
+        for key, record in zip(keys, records):
+            if key in cached:
+                self._hits += 1
+            else:
+                self._misses += 1
+                missing.setdefault(key, record)
+        scored = dict(zip(missing, self.score_batch(list(missing.values()))))
+        risks = [cached[key] if key in cached else scored[key] for key in keys]
+
+        self._clock += 1
+        with self._connection:
+            self._connection.executemany('UPDATE entries SET used = ? WHERE key = ?',
+                                         ((self._clock, key) for key in cached))
+            self._connection.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?)',
+                                         ((key, risk, self._clock) for key, risk in scored.items()))
+            if scored:
+                self._evict()
+        return risks
+
+    def cache_info(self):
+        currsize = self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return CacheInfo(self._hits, self._misses, self.max_entries, currsize)
+
+    def clear(self):
+        """
+        Drops all cached scores and resets the hit/miss statistics.
+        """
+        with self._connection:
+            self._connection.execute('DELETE FROM entries')
+        self._hits = 0
+        self._misses = 0
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _evict(self):
+        excess = self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._connection.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used LIMIT ?)', (excess,))
+
+    def _key(self, record):
+        normalized = normalize_record(record)
+        return hashlib.sha256(
+            (self._fingerprint + json.dumps(normalized, sort_keys=True, separators=(',', ':'))).encode('ascii')
+        ).hexdigest()
+
+
+def normalize_record(record):
+    """
+    Returns the canonical form of `calculate_risk` keyword arguments: the mother's onset age only if it counts,
+    and each relationship's counted onset ages in sorted order. Records with the same canonical form have the
+    same risk.
+    """
+    mother_onset_age = record.get(MOTHER_FIELD)
+    normalized = {
+        PATIENT_AGE_FIELD: record[PATIENT_AGE_FIELD],
+        MOTHER_FIELD: mother_onset_age if mother_onset_age and _counts(mother_onset_age) else None,
+    }
+    for field in RELATIVE_FIELDS:
+        normalized[field] = sorted(age for age in record.get(field) or () if _counts(age))
+    return normalized
+
+
+def _score_batch(records):
+    return [calculate_risk(**record) for record in records]
+
+
+def _counts(onset_age):
+    return VALID_MIN_AGE <= onset_age <= VALID_MAX_AGE
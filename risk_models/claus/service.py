@@ -0,0 +1,249 @@
+"""
+Asyncio HTTP scoring service with request micro-batching.
+
+Concurrent requests are queued and scored together in micro-batches of at most `max_batch_size` records,
+waiting at most `max_wait` seconds for a batch to fill. Endpoints:
+
+    POST /score    body: one record as a JSON object (see `risk_models.claus.records`), returns {"risk": ...}
+    GET /metrics   request count, latency percentiles and the batch size histogram
+
+Run a local server with `python -m risk_models.claus.service --port 8080`. Requires Python 3.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import Counter, deque
+
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.records import parse_record
+
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT = 0.002
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+# Number of most recent request latencies that percentiles are computed over.
+LATENCY_WINDOW = 100000
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+def score_records(records):
+    """
+    Default batch scorer: scores `calculate_risk` keyword argument dicts in one pass.
+    """
+    return [calculate_risk(**record) for record in records]
+
+
+class ServiceMetrics(object):
+    """
+    Request latencies (over a sliding window) and a histogram of micro-batch sizes.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.requests = 0
+        self.batch_sizes = Counter()
+        self.latencies = deque(maxlen=window)
+
+    def record_batch(self, latencies):
+        self.requests += len(latencies)
+        self.batch_sizes[len(latencies)] += 1
+        self.latencies.extend(latencies)
+
+    def latency_percentiles(self, percentiles=LATENCY_PERCENTILES):
+        """
+        Returns {percentile: seconds} using the nearest-rank method, or an empty dict before any request.
+        """
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {}
+        return dict(
+            (percentile, latencies[max(1, int(math.ceil(percentile / 100 * len(latencies)))) - 1])
+            for percentile in percentiles
+        )
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'batches': sum(self.batch_sizes.values()),
+            'latency_seconds': dict(('p{:g}'.format(percentile), latency)
+                                    for percentile, latency in self.latency_percentiles().items()),
+            'batch_sizes': dict((str(size), count) for size, count in sorted(self.batch_sizes.items())),
+        }
+
+
+class MicroBatcher(object):
+    """
+    Collects concurrently submitted records into batches and resolves each caller with its own result.
+    """
+
+    def __init__(self, score_batch=score_records, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT,
+                 metrics=None):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.metrics = metrics or ServiceMetrics()
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def score(self, record):
+        """
+        Queues a record for the next batch and returns its score.
+        """
+        self.start()
+        future = asyncio.get_event_loop().create_future()
+        self._queue.put_nowait((record, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._score(batch)
+
+    def _score(self, batch):
+        try:
+            results = self.score_batch([record for record, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        for (_, future, submitted), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+        self.metrics.record_batch([finished - submitted for _, _, submitted in batch])
+
+
+class ScoringService(object):
+    """
+    Minimal HTTP/1.1 front-end over a MicroBatcher.
+    """
+
+    def __init__(self, batcher=None):
+        self.batcher = batcher or MicroBatcher()
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """
+        Starts listening and returns the bound (host, port); pass port 0 to pick a free port.
+        """
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.close()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    body = await reader.readexactly(int(headers.get('content-length', 0)))
+                except ValueError:
+                    self._write_response(writer, 400, {'error': 'malformed request'}, keep_alive=False)
+                    break
+
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        if path == '/score':
+            if method != 'POST':
+                return 405, {'error': 'use POST'}
+            try:
+                record = parse_record(json.loads(body.decode('utf-8')))
+            except ValueError as e:
+                return 400, {'error': str(e)}
+            return 200, {'risk': await self.batcher.score(record)}
+        if path == '/metrics':
+            if method != 'GET':
+                return 405, {'error': 'use GET'}
+            return 200, self.batcher.metrics.snapshot()
+        return 404, {'error': 'not found'}
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        head = 'HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+            status, _REASONS[status], len(body), 'keep-alive' if keep_alive else 'close')
+        writer.write(head.encode('latin-1') + body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Claus risk scoring service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT * 1000)
+    args = parser.parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    service = ScoringService(MicroBatcher(max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000))
+    host, port = loop.run_until_complete(service.start(args.host, args.port))
+    print('Serving on http://{}:{}'.format(host, port))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(service.close())
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
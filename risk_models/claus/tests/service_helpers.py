@@ -0,0 +1,44 @@
+"""
+Coroutines for test_service, kept apart because `async def` is a syntax error on Python 2.
+"""
+import asyncio
+import json
+
+from risk_models.claus.service import MicroBatcher, ScoringService
+
+
+async def request(host, port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write('{} {} HTTP/1.1\r\nHost: {}\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'.format(
+        method, path, host, len(body)).encode('latin-1') + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body.decode('utf-8'))
+
+
+async def run_service(test, **batcher_options):
+    service = ScoringService(MicroBatcher(**batcher_options))
+    host, port = await service.start(port=0)
+    try:
+        return await test(host, port)
+    finally:
+        await service.close()
+
+
+async def score_concurrently(host, port, records):
+    """
+    Posts every record at once, then fetches the metrics. Returns the responses and the metrics response.
+    """
+    responses = await asyncio.gather(*[request(host, port, 'POST', '/score', record) for record in records])
+    metrics = await request(host, port, 'GET', '/metrics')
+    return responses, metrics
+
+
+async def error_responses(host, port):
+    return [
+        await request(host, port, 'POST', '/score', {'patient_age': 'x'}),
+        await request(host, port, 'GET', '/score'),
+        await request(host, port, 'GET', '/other'),
+    ]
@@ -0,0 +1,121 @@
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from risk_models.claus import aggregation
+from risk_models.claus.aggregation import AGE_BANDS, RiskAggregator, format_report
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.differential import random_case
+
+
+def random_records(rng, count):
+    cases = [random_case(rng) for _ in range(count)]
+    return [dict(relatives, patient_age=patient_age) for patient_age, relatives in cases]
+
+
+class RiskAggregatorTest(TestCase):
+
+    def test_matches_exact_statistics(self):
+        records = random_records(random.Random(0), 3000)
+        aggregator = RiskAggregator(thresholds=(0.1, 0.2)).update(records)
+        risks = [calculate_risk(**record) for record in records]
+        scored = sorted(risk for risk in risks if risk is not None)
+
+        self.assertEqual(aggregator.count(), len(scored))
+        self.assertEqual(aggregator.no_risk_count(), risks.count(None))
+        self.assertAlmostEqual(aggregator.mean(), sum(scored) / len(scored))
+        self.assertEqual(aggregator.quantile(0), scored[0])
+        self.assertEqual(aggregator.quantile(0.5), scored[(len(scored) + 1) // 2 - 1])
+        self.assertEqual(aggregator.quantile(1), scored[-1])
+        self.assertEqual(aggregator.at_or_above(0.2), sum(1 for risk in scored if risk >= 0.2))
+        self.assertEqual(sum(aggregator.histogram().values()), len(scored))
+
+        band_records = [record for record in records if 40 <= record['patient_age'] <= 49]
+        band_risks = [calculate_risk(**record) for record in band_records]
+        self.assertEqual(aggregator.count('40-49'), len(band_records) - band_risks.count(None))
+        self.assertEqual(aggregator.at_or_above(0.1, band='40-49'),
+                         sum(1 for risk in band_risks if risk is not None and risk >= 0.1))
+
+    def test_merge_is_lossless(self):
+        records = random_records(random.Random(1), 2000)
+        whole = RiskAggregator().update(records)
+        shards = [RiskAggregator().update(records[start:start + 300]) for start in range(0, len(records), 300)]
+        merged = RiskAggregator()
+        for shard in shards:
+            merged.merge(RiskAggregator.from_dict(json.loads(json.dumps(shard.to_dict()))))
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+        with self.assertRaises(ValueError):
+            merged.merge(RiskAggregator(thresholds=(0.3,)))
+
+    def test_scored_records(self):
+        aggregator = RiskAggregator()
+        aggregator.add_record({'patient_age': '45', 'mother_onset_age': '44', 'risk': '0.25'})
+        aggregator.add_record({'patient_age': 45, 'risk': ''})
+        aggregator.add_record({'patient_age': 45, 'risk': None})
+        self.assertEqual(aggregator.histogram('40-49'), {0.25: 1})
+        self.assertEqual(aggregator.no_risk_count(), 2)
+        self.assertEqual(aggregator.at_or_above(0.2), 1)
+
+    def test_empty(self):
+        aggregator = RiskAggregator()
+        self.assertEqual(aggregator.count(), 0)
+        self.assertIsNone(aggregator.mean())
+        self.assertIsNone(aggregator.quantile(0.5))
+        self.assertEqual(len(AGE_BANDS), 6)
+
+    def test_invalid_values(self):
+        aggregator = RiskAggregator()
+        for patient_age, risk in ((19, 0.1), (45, 0.1234), (45, 1.5), (45, -0.001)):
+            with self.assertRaises(ValueError):
+                aggregator.add(patient_age, risk)
+        for call in (lambda: aggregator.quantile(1.5),
+                     lambda: aggregator.count('40-50'),
+                     lambda: aggregator.at_or_above(0.3),
+                     lambda: aggregator.add_record({'patient_age': 45, 'risk': 'x'})):
+            with self.assertRaises(ValueError):
+                call()
+        summary = aggregator.to_dict()
+        for bad in ({}, dict(summary, format_version=2), dict(summary, thresholds=[0.3, 0.2])):
+            with self.assertRaises(ValueError):
+                RiskAggregator.from_dict(bad)
+        summary['bands']['40-49']['histogram'] = [[-1, 1]]
+        with self.assertRaises(ValueError):
+            RiskAggregator.from_dict(summary)
+
+    def test_main_merges_summaries(self):
+        directory = tempfile.mkdtemp()
+        try:
+            paths = []
+            for index, records in enumerate(([{'patient_age': 45, 'mother_onset_age': 44}], [{'patient_age': 62}])):
+                paths.append(os.path.join(directory, '{}.json'.format(index)))
+                with open(paths[-1], 'w') as f:
+                    json.dump(RiskAggregator().update(records).to_dict(), f)
+            output_path = os.path.join(directory, 'merged.json')
+            stdout, sys.stdout = sys.stdout, StringIO()
+            try:
+                self.assertEqual(aggregation.main(paths + ['-o', output_path]), 0)
+                report = sys.stdout.getvalue()
+            finally:
+                sys.stdout = stdout
+            self.assertIn('40-49', report)
+            with open(output_path) as f:
+                merged = RiskAggregator.from_dict(json.load(f))
+            self.assertEqual((merged.count(), merged.no_risk_count()), (1, 1))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_format_report(self):
+        report = format_report(RiskAggregator().update([{'patient_age': 45, 'mother_onset_age': 44}]))
+        lines = report.splitlines()
+        self.assertEqual(len(lines), len(AGE_BANDS) + 2)
+        self.assertIn('40-49', lines[3])
+        self.assertTrue(lines[-1].split()[0] == 'all' and lines[-1].split()[1] == '1')
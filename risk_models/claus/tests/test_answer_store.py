@@ -0,0 +1,56 @@
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase
+
+from risk_models.claus.answer_store import AnswerStore, write_answer_store
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.family_history import RELATIONSHIPS
+
+
+class AnswerStoreTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'claus.answers')
+        write_answer_store(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_matches_calculate_risk(self):
+        rng = random.Random(0)
+        with AnswerStore(self.path) as store:
+            for _ in range(20000):
+                relatives = {}
+                if rng.random() < 0.4:
+                    relatives['mother_onset_age'] = rng.randint(15, 90)
+                for relationship in RELATIONSHIPS:
+                    if rng.random() < 0.3:
+                        relatives[relationship + '_onset_ages'] = [
+                            rng.randint(15, 90) for _ in range(rng.randint(0, 3))]
+                patient_age = rng.randint(20, 79)
+                self.assertEqual(store.calculate_risk(patient_age, **relatives),
+                                 calculate_risk(patient_age, **relatives))
+
+    def test_invalid_patient_age(self):
+        with AnswerStore(self.path) as store:
+            with self.assertRaises(ValueError):
+                store.calculate_risk(80, mother_onset_age=40)
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.directory, 'other')
+        with open(path, 'wb') as f:
+            f.write(b'not an answer file' * 10)
+        with self.assertRaises(ValueError):
+            AnswerStore(path)
+
+        with open(self.path, 'rb') as f:
+            contents = f.read()
+        with open(path, 'wb') as f:
+            f.write(contents[:-2])
+        with self.assertRaises(ValueError):
+            AnswerStore(path)
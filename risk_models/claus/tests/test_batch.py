@@ -0,0 +1,97 @@
+import random
+from unittest import TestCase, skipIf
+
+try:
+    import numpy as np
+    from risk_models.claus.batch import calculate_risk_batch
+except ImportError:
+    np = None
+
+from risk_models.claus.claus import calculate_risk
+
+RELATIONSHIPS = (
+    'daughter_onset_ages',
+    'full_sister_onset_ages',
+    'maternal_aunt_onset_ages',
+    'paternal_aunt_onset_ages',
+    'maternal_grandmother_onset_ages',
+    'paternal_grandmother_onset_ages',
+    'maternal_half_sister_onset_ages',
+    'paternal_half_sister_onset_ages',
+)
+
+
+def random_cohort(size, seed=0):
+    rng = random.Random(seed)
+    patient_ages = [rng.randint(20, 79) for _ in range(size)]
+    mother_onset_ages = [rng.choice([None, rng.randint(10, 95)]) for _ in range(size)]
+    relatives = {}
+    for relationship in RELATIONSHIPS:
+        relatives[relationship] = [
+            rng.choice([None, [], [rng.randint(10, 95) for _ in range(rng.randint(1, 4))]])
+            for _ in range(size)
+        ]
+    return patient_ages, mother_onset_ages, relatives
+
+
+@skipIf(np is None, 'numpy is not installed')
+class BatchTest(TestCase):
+
+    def assertMatchesScalar(self, risks, patient_ages, mother_onset_ages, relatives):
+        for row, patient_age in enumerate(patient_ages):
+            expected = calculate_risk(
+                patient_age,
+                mother_onset_age=mother_onset_ages[row],
+                **dict((relationship, ages[row]) for relationship, ages in relatives.items())
+            )
+            if expected is None:
+                self.assertTrue(np.isnan(risks[row]))
+            else:
+                self.assertEqual(risks[row], expected)
+
+    def test_ragged_cohort_matches_scalar(self):
+        patient_ages, mother_onset_ages, relatives = random_cohort(3000)
+        risks = calculate_risk_batch(patient_ages, mother_onset_ages=mother_onset_ages, **relatives)
+        self.assertEqual(risks.dtype, np.float64)
+        self.assertMatchesScalar(risks, patient_ages, mother_onset_ages, relatives)
+
+    def test_padded_cohort_matches_scalar(self):
+        patient_ages, mother_onset_ages, relatives = random_cohort(1000, seed=1)
+        padded = {}
+        for relationship, ages in relatives.items():
+            array = np.zeros((len(ages), 4))
+            for row, row_ages in enumerate(ages):
+                array[row, :len(row_ages or [])] = row_ages or []
+            padded[relationship] = array
+        risks = calculate_risk_batch(patient_ages, mother_onset_ages=mother_onset_ages, **padded)
+        self.assertMatchesScalar(risks, patient_ages, mother_onset_ages, relatives)
+
+    def test_nan_padding(self):
+        risks = calculate_risk_batch(
+            [20, 45],
+            maternal_aunt_onset_ages=np.array([[44, np.nan], [np.nan, np.nan]]),
+        )
+        self.assertEqual(risks[0], calculate_risk(20, maternal_aunt_onset_ages=[44]))
+        self.assertTrue(np.isnan(risks[1]))
+
+    def test_empty_cohort(self):
+        self.assertEqual(len(calculate_risk_batch([])), 0)
+
+    def test_invalid_patient_age(self):
+        with self.assertRaises(ValueError):
+            calculate_risk_batch([19, 40])
+        with self.assertRaises(ValueError):
+            calculate_risk_batch([80])
+
+    def test_non_integer_patient_age(self):
+        for patient_ages in ([44.9], [40, np.nan]):
+            with self.assertRaises(ValueError):
+                calculate_risk_batch(patient_ages, mother_onset_ages=[44] * len(patient_ages))
+        self.assertEqual(list(calculate_risk_batch(np.array([40.0]), mother_onset_ages=[44])),
+                         [calculate_risk(40, mother_onset_age=44)])
+
+    def test_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            calculate_risk_batch([20, 30], daughter_onset_ages=[[44]])
+        with self.assertRaises(ValueError):
+            calculate_risk_batch([20, 30], mother_onset_ages=[44])
@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+from risk_models.claus.cache import CacheInfo, ClausRiskCache
+from risk_models.claus.claus import calculate_risk
+
+
+class ClausRiskCacheTest(TestCase):
+
+    def test_matches_calculate_risk(self):
+        cache = ClausRiskCache()
+        histories = [
+            dict(mother_onset_age=44),
+            dict(maternal_aunt_onset_ages=[55, 33], paternal_half_sister_onset_ages=[44]),
+            dict(daughter_onset_ages=[12, 22], full_sister_onset_ages=[11, 34]),
+            dict(),
+        ]
+        for patient_age in (20, 34, 79):
+            for history in histories:
+                self.assertEqual(cache.calculate_risk(patient_age, **history), calculate_risk(patient_age, **history))
+
+    def test_equivalent_histories_share_entry(self):
+        cache = ClausRiskCache()
+        cache.calculate_risk(40, maternal_aunt_onset_ages=[44])
+        cache.calculate_risk(40, maternal_aunt_onset_ages=[47, 90, 12])
+        cache.calculate_risk(41, maternal_aunt_onset_ages=[44])
+        self.assertEqual(cache.cache_info(), CacheInfo(hits=1, misses=2, maxsize=65536, currsize=2))
+
+    def test_evicts_least_recently_used(self):
+        cache = ClausRiskCache(maxsize=2)
+        cache.calculate_risk(30, mother_onset_age=44)
+        cache.calculate_risk(31, mother_onset_age=44)
+        cache.calculate_risk(30, mother_onset_age=44)
+        cache.calculate_risk(32, mother_onset_age=44)
+        self.assertEqual(cache.cache_info().currsize, 2)
+
+        cache.calculate_risk(30, mother_onset_age=44)
+        self.assertEqual(cache.cache_info().hits, 2)
+        cache.calculate_risk(31, mother_onset_age=44)
+        self.assertEqual(cache.cache_info().misses, 4)
+
+    def test_clear(self):
+        cache = ClausRiskCache()
+        cache.calculate_risk(30, mother_onset_age=44)
+        cache.clear()
+        self.assertEqual(cache.cache_info(), CacheInfo(hits=0, misses=0, maxsize=65536, currsize=0))
+
+    def test_invalid_maxsize(self):
+        with self.assertRaises(ValueError):
+            ClausRiskCache(maxsize=0)
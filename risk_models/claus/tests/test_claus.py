@@ -1,5 +1,15 @@
 from unittest import TestCase
-from risk_models.claus.claus import calculate_risk, get_lifetime_risk
+import itertools
+import pickle
+
+from risk_models.claus.claus import (
+    TABLE_CRITERIA,
+    FamilyIndices,
+    applicable_tables,
+    calculate_risk,
+    get_lifetime_risk,
+    verify_risk_lattice,
+)
 from risk_models.claus.claus_tables import (
     ONE_FIRST_DEG_TABLE,
     ONE_SECOND_DEG_TABLE,
@@ -7,8 +17,11 @@ from risk_models.claus.claus_tables import (
     MOTHER_MATERNAL_AUNT,
     MOTHER_PATERNAL_AUNT,
     TWO_SEC_DEG_DIFF_SIDE_TABLE,
-    TWO_SEC_DEG_SAME_SIDE_TABLE
+    TWO_SEC_DEG_SAME_SIDE_TABLE,
+    CLAUS_TABLES,
+    CLAUS_TABLE_RELATIVES,
 )
+from risk_models.claus.packed_tables import lookup_claus_table
 
 
 class ClausTest(TestCase):
@@ -214,6 +227,11 @@ class ClausTest(TestCase):
         )
         self.assertEqual(score, get_lifetime_risk(TWO_SEC_DEG_SAME_SIDE_TABLE, 20, 0, 5))
 
+    def test_no_applicable_relatives(self):
+        self.assertIsNone(calculate_risk(45))
+        self.assertIsNone(calculate_risk(45, mother_onset_age=0, full_sister_onset_ages=[], maternal_aunt_onset_ages=None))
+        self.assertIsNone(calculate_risk(45, mother_onset_age=85, daughter_onset_ages=[12]))
+
     def test_get_lifetime_risk_one_relative(self):
         table = ONE_FIRST_DEG_TABLE
         computed_score = get_lifetime_risk(table, 32, 3)
@@ -228,3 +246,56 @@ class ClausTest(TestCase):
         current_age_risk = table[1][4][1] + (table[2][4][1] - table[1][4][1]) * 8 / 10
         expected_score = (table[5][4][1] - current_age_risk) / (1 - current_age_risk)
         self.assertEqual(computed_score, round(expected_score, 3))
+
+    def test_risk_lattice_matches_formula(self):
+        self.assertEqual(verify_risk_lattice(), 60 * (6 + 6 + 5 * 6 * 6))
+
+    def test_get_lifetime_risk_outside_lattice(self):
+        # Copies of a table are not in the lattice and fall back to the formula.
+        table = tuple(tuple(row) for row in TWO_FIRST_DEG_TABLE)
+        self.assertEqual(get_lifetime_risk(table, 47, 4, 1), get_lifetime_risk(TWO_FIRST_DEG_TABLE, 47, 4, 1))
+        with self.assertRaises(IndexError):
+            get_lifetime_risk(ONE_FIRST_DEG_TABLE, 80, 3)
+
+    def test_packed_tables_match_tuples(self):
+        for table, relatives in zip(CLAUS_TABLES, CLAUS_TABLE_RELATIVES):
+            for patient_index in range(-6, 6):
+                for relative1_index in range(6):
+                    if relatives == 1:
+                        self.assertEqual(lookup_claus_table(table, patient_index, relative1_index),
+                                         table[patient_index][relative1_index])
+                        continue
+                    for relative2_index in range(6):
+                        self.assertEqual(lookup_claus_table(table, patient_index, relative1_index, relative2_index),
+                                         table[patient_index][relative1_index][relative2_index])
+
+    def test_packed_table_index_errors(self):
+        with self.assertRaises(IndexError):
+            lookup_claus_table(ONE_FIRST_DEG_TABLE, 6, 0)
+        with self.assertRaises(IndexError):
+            lookup_claus_table(TWO_FIRST_DEG_TABLE, 0, 0, 7)
+
+    def test_family_indices_behaves_like_a_namedtuple(self):
+        family_indices = FamilyIndices(*range(10))
+        self.assertEqual(family_indices.mother, 3)
+        self.assertEqual(family_indices.paternal_second_degree_2, 9)
+        self.assertEqual(FamilyIndices(**dict(zip(FamilyIndices._fields, range(10)))), family_indices)
+        self.assertEqual(repr(family_indices)[:48], 'FamilyIndices(first_degree_1=0, first_degree_2=1')
+        restored = pickle.loads(pickle.dumps(family_indices, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual((type(restored), restored), (FamilyIndices, family_indices))
+        with self.assertRaises(AttributeError):
+            family_indices.mother = 0
+
+    def test_applicable_tables_matches_criteria(self):
+        for presence in itertools.product((None, 1), repeat=len(FamilyIndices._fields)):
+            family_indices = FamilyIndices(*presence)
+            # A second smallest bin implies a smallest one.
+            if any(family_indices[position + 1] is not None and family_indices[position] is None
+                   for position in (0, 6, 8)):
+                continue
+            expected = []
+            for table, fields in TABLE_CRITERIA:
+                relative_indices = [getattr(family_indices, field) for field in fields]
+                if None not in relative_indices:
+                    expected.append((table, relative_indices[0], relative_indices[1] if len(fields) == 2 else None))
+            self.assertEqual(applicable_tables(family_indices), expected)
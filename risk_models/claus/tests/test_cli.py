@@ -0,0 +1,192 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase, skipIf
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from risk_models.claus.aggregation import RiskAggregator
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.cli import main, score_stream
+from risk_models.claus.records import parse_record
+
+
+class ParseRecordTest(TestCase):
+
+    def test_json_record(self):
+        arguments = parse_record({
+            'id': 'p1',
+            'patient_age': 34,
+            'mother_onset_age': 44,
+            'maternal_aunt_onset_ages': [55, 33],
+            'daughter_onset_ages': [],
+        })
+        self.assertEqual(arguments, {
+            'patient_age': 34,
+            'mother_onset_age': 44,
+            'maternal_aunt_onset_ages': [55, 33],
+        })
+
+    def test_csv_record(self):
+        arguments = parse_record({
+            'patient_age': '34',
+            'mother_onset_age': '',
+            'paternal_aunt_onset_ages': '52; 43;54',
+        })
+        self.assertEqual(arguments, {'patient_age': 34, 'paternal_aunt_onset_ages': [52, 43, 54]})
+        # JSON strings are unicode on Python 2.
+        self.assertEqual(parse_record({u'patient_age': u'34', u'full_sister_onset_ages': u'44;55'}),
+                         {'patient_age': 34, 'full_sister_onset_ages': [44, 55]})
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_numpy_integer_ages(self):
+        arguments = parse_record({'patient_age': np.int64(34), 'full_sister_onset_ages': [np.int32(44)]})
+        self.assertEqual(arguments, {'patient_age': 34, 'full_sister_onset_ages': [44]})
+        self.assertIs(type(arguments['patient_age']), int)
+
+    def test_malformed_records(self):
+        malformed = [
+            [],
+            {},
+            {'patient_age': 'forty'},
+            {'patient_age': 80},
+            {'patient_age': 40, 'mother_onset_age': 44.5},
+            {'patient_age': 40, 'mother_onset_age': True},
+            {'patient_age': 40, 'full_sister_onset_ages': 44},
+            {'patient_age': 40, 'full_sister_onset_ages': [44, None]},
+            {'patient_age': 40, 'full_sister_onset_ages': '44;4x'},
+        ]
+        for record in malformed:
+            with self.assertRaises(ValueError):
+                parse_record(record)
+
+
+class ScoreStreamTest(TestCase):
+
+    def test_jsonl(self):
+        input_stream = io.StringIO(
+            u'{"id": 1, "patient_age": 34, "mother_onset_age": 44}\n'
+            u'\n'
+            u'{"id": 2, "patient_age": 34, "mother_onset_age": "4x"}\n'
+            u'not json\n'
+            u'{"id": 3, "patient_age": 60}\n'
+            u'{"id": 4, "patient_age": 20, "maternal_aunt_onset_ages": [55, 33]}\n'
+        )
+        output_stream = io.StringIO()
+        error_stream = io.StringIO()
+
+        self.assertEqual(score_stream(input_stream, output_stream, 'jsonl', 2, error_stream), (3, 2))
+
+        results = [json.loads(line) for line in output_stream.getvalue().splitlines()]
+        self.assertEqual([result['id'] for result in results], [1, 3, 4])
+        self.assertEqual(results[0]['risk'], calculate_risk(34, mother_onset_age=44))
+        self.assertIsNone(results[1]['risk'])
+        self.assertEqual(results[2]['risk'], calculate_risk(20, maternal_aunt_onset_ages=[55, 33]))
+
+        errors = [json.loads(line) for line in error_stream.getvalue().splitlines()]
+        self.assertEqual([error['line'] for error in errors], [3, 4])
+
+    def test_csv(self):
+        input_stream = io.StringIO(
+            u'id,patient_age,mother_onset_age,paternal_aunt_onset_ages\n'
+            u'a,34,44,\n'
+            u'b,34,,52;43\n'
+            u'c,3x,,\n'
+            u'd,50,,\n'
+        )
+        output_stream = io.StringIO()
+        error_stream = io.StringIO()
+
+        self.assertEqual(score_stream(input_stream, output_stream, 'csv', 1, error_stream), (3, 1))
+        self.assertEqual(output_stream.getvalue().splitlines(), [
+            'id,patient_age,mother_onset_age,paternal_aunt_onset_ages,risk',
+            'a,34,44,,{}'.format(calculate_risk(34, mother_onset_age=44)),
+            'b,34,,52;43,{}'.format(calculate_risk(34, paternal_aunt_onset_ages=[52, 43])),
+            'd,50,,,',
+        ])
+        self.assertEqual(json.loads(error_stream.getvalue())['line'], 4)
+
+
+class MainTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # main writes its summary to stderr, and reports malformed records there without --errors; it needs a
+        # file descriptor, so capture it in a temporary file.
+        self.stderr = sys.stderr
+        sys.stderr = tempfile.TemporaryFile('w+')
+
+    def tearDown(self):
+        sys.stderr.close()
+        sys.stderr = self.stderr
+        shutil.rmtree(self.directory)
+
+    def captured_stderr(self):
+        sys.stderr.flush()
+        sys.stderr.seek(0)
+        return sys.stderr.read()
+
+    def test_files(self):
+        input_path = os.path.join(self.directory, 'cohort.csv')
+        output_path = os.path.join(self.directory, 'scores.csv')
+        errors_path = os.path.join(self.directory, 'errors.jsonl')
+        with open(input_path, 'w') as f:
+            f.write('patient_age,full_sister_onset_ages\n40,44;55\n40,x\n')
+
+        self.assertEqual(main([input_path, '-o', output_path, '--errors', errors_path, '--chunk-size', '10']), 0)
+
+        with open(output_path) as f:
+            self.assertEqual(f.read().splitlines()[1], '40,44;55,{}'.format(
+                calculate_risk(40, full_sister_onset_ages=[44, 55])))
+        with open(errors_path) as f:
+            self.assertEqual(len(f.read().splitlines()), 1)
+
+    def test_undecodable_input(self):
+        input_path = os.path.join(self.directory, 'cohort.jsonl')
+        output_path = os.path.join(self.directory, 'scores.jsonl')
+        errors_path = os.path.join(self.directory, 'errors.jsonl')
+        with open(input_path, 'wb') as f:
+            f.write(b'{"id": "\xff\xfe", "patient_age": 40}\n{"patient_age": 40, "mother_onset_age": 44}\n')
+
+        self.assertEqual(main([input_path, '-o', output_path, '--errors', errors_path]), 0)
+
+        with open(output_path) as f:
+            self.assertEqual([json.loads(line)['risk'] for line in f], [calculate_risk(40, mother_onset_age=44)])
+        with open(errors_path) as f:
+            errors = [json.loads(line) for line in f]
+        self.assertEqual([error['line'] for error in errors], [1])
+        self.assertIn('UTF-8', errors[0]['error'])
+        self.assertEqual(self.captured_stderr(), 'Scored 1 records, 1 malformed\n')
+
+    def test_cache(self):
+        input_path = os.path.join(self.directory, 'cohort.jsonl')
+        cache_path = os.path.join(self.directory, 'cache.sqlite')
+        with open(input_path, 'w') as f:
+            f.write('{"patient_age": 40, "mother_onset_age": 44}\n{"patient_age": 50}\n')
+
+        for _ in range(2):
+            output_path = os.path.join(self.directory, 'scores.jsonl')
+            self.assertEqual(main([input_path, '-o', output_path, '--cache', cache_path]), 0)
+            with open(output_path) as f:
+                risks = [json.loads(line)['risk'] for line in f]
+            self.assertEqual(risks, [calculate_risk(40, mother_onset_age=44), None])
+
+    def test_summary(self):
+        input_path = os.path.join(self.directory, 'cohort.jsonl')
+        summary_path = os.path.join(self.directory, 'summary.json')
+        with open(input_path, 'w') as f:
+            f.write('{"patient_age": 40, "mother_onset_age": 44}\n{"patient_age": 50}\n')
+
+        self.assertEqual(main([input_path, '-o', os.path.join(self.directory, 'scores.jsonl'),
+                               '--summary', summary_path, '--threshold', '0.1', '--threshold', '0.3']), 0)
+        with open(summary_path) as f:
+            summary = RiskAggregator.from_dict(json.load(f))
+        self.assertEqual(summary.thresholds, (0.1, 0.3))
+        self.assertEqual(summary.histogram('40-49'), {calculate_risk(40, mother_onset_age=44): 1})
+        self.assertEqual(summary.no_risk_count('50-59'), 1)
@@ -0,0 +1,95 @@
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from risk_models.claus.columnar import score_arrow_ipc, score_parquet, score_record_batch
+except ImportError:
+    pa = None
+
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.records import RELATIVE_FIELDS
+
+
+def random_records(size, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(size):
+        record = {
+            'patient_age': rng.randint(20, 79),
+            'mother_onset_age': rng.choice([None, rng.randint(10, 95)]),
+        }
+        for field in RELATIVE_FIELDS:
+            record[field] = rng.choice([None, [], [rng.randint(10, 95) for _ in range(rng.randint(1, 3))]])
+        records.append(record)
+    return records
+
+
+def expected_risk(record):
+    return calculate_risk(**dict((field, value) for field, value in record.items() if value is not None))
+
+
+@skipIf(pa is None, 'pyarrow is not installed')
+class ColumnarTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.records = random_records(2000)
+        self.schema = pa.schema(
+            [('patient_age', pa.int32()), ('mother_onset_age', pa.int32())] +
+            [(field, pa.list_(pa.int32())) for field in RELATIVE_FIELDS]
+        )
+        self.table = pa.Table.from_pylist(self.records, schema=self.schema)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_score_record_batch_matches_calculate_risk(self):
+        batch = self.table.to_batches()[0]
+        risks = score_record_batch(batch).column('risk').to_pylist()
+        self.assertEqual(risks, [expected_risk(record) for record in self.records[:batch.num_rows]])
+
+    def test_missing_columns_and_invalid_patient_ages(self):
+        batch = pa.record_batch({
+            'patient_age': pa.array([40, None, 85, 40], pa.int64()),
+            'daughter_onset_ages': pa.array([[35], [35], [35], None], pa.list_(pa.int64())),
+        })
+        self.assertEqual(score_record_batch(batch).column('risk').to_pylist(),
+                         [calculate_risk(40, daughter_onset_ages=[35]), None, None, None])
+
+    def test_rejects_non_list_relative_column(self):
+        batch = pa.record_batch({'patient_age': [40], 'daughter_onset_ages': [35]})
+        with self.assertRaises(ValueError):
+            score_record_batch(batch)
+
+    def test_score_parquet(self):
+        input_path = os.path.join(self.directory, 'cohort.parquet')
+        output_path = os.path.join(self.directory, 'scored.parquet')
+        pq.write_table(self.table, input_path, row_group_size=300)
+
+        self.assertEqual(score_parquet(input_path, output_path, batch_size=128), len(self.records))
+        scored = pq.read_table(output_path)
+        self.assertEqual(scored.schema.names, self.schema.names + ['risk'])
+        self.assertEqual(scored.column('risk').to_pylist(), [expected_risk(record) for record in self.records])
+
+    def test_score_arrow_ipc(self):
+        input_path = os.path.join(self.directory, 'cohort.arrow')
+        output_path = os.path.join(self.directory, 'scored.arrow')
+        with pa.ipc.new_file(input_path, self.schema) as writer:
+            for batch in self.table.to_batches(max_chunksize=300):
+                writer.write_batch(batch)
+
+        self.assertEqual(score_arrow_ipc(input_path, output_path), len(self.records))
+        with pa.memory_map(output_path) as source:
+            scored = pa.ipc.open_file(source).read_all()
+        self.assertEqual(scored.column('risk').to_pylist(), [expected_risk(record) for record in self.records])
+
+    def test_rejects_existing_risk_column(self):
+        input_path = os.path.join(self.directory, 'cohort.parquet')
+        pq.write_table(self.table.append_column('risk', pa.array([0.0] * len(self.records))), input_path)
+        with self.assertRaises(ValueError):
+            score_parquet(input_path, os.path.join(self.directory, 'scored.parquet'))
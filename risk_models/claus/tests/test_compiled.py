@@ -0,0 +1,47 @@
+import random
+from itertools import product
+from unittest import TestCase
+
+from risk_models.claus import claus, compiled, instrumentation
+from risk_models.claus.claus import TABLE_CRITERIA, FamilyIndices
+from risk_models.claus.differential import random_case
+
+
+class CompiledTest(TestCase):
+
+    def test_matches_generic_scoring(self):
+        rng = random.Random(0)
+        masks = set()
+        for _ in range(5000):
+            patient_age, relatives = random_case(rng)
+            family_indices = claus.collect_family_indices(**relatives)
+            masks.add(compiled.presence_mask(family_indices))
+            self.assertEqual(compiled.score_family_indices(patient_age, family_indices),
+                             claus.score_family_indices(patient_age, family_indices))
+            self.assertEqual(compiled.calculate_risk(patient_age, **relatives),
+                             claus.calculate_risk(patient_age, **relatives))
+        self.assertGreater(len(masks), 50)
+
+    def test_out_of_range_patient_ages_use_generic_path(self):
+        family_indices = claus.collect_family_indices(mother_onset_age=44, maternal_aunt_onset_ages=[51])
+        for patient_age in (15, 19):
+            self.assertEqual(compiled.score_family_indices(patient_age, family_indices),
+                             claus.score_family_indices(patient_age, family_indices))
+        with self.assertRaises(IndexError):
+            compiled.score_family_indices(80, family_indices)
+
+    def test_pattern_source_reads_applicable_criteria(self):
+        for values in product((None, 0), repeat=10):
+            family_indices = FamilyIndices(*values)
+            source = compiled.pattern_source(compiled.presence_mask(family_indices))
+            applicable = [table for table, fields in TABLE_CRITERIA
+                          if all(getattr(family_indices, field) is not None for field in fields)]
+            self.assertEqual(source.count('lattice['), len(applicable))
+        with self.assertRaises(ValueError):
+            compiled.compile_pattern(compiled.PATTERN_COUNT)
+
+    def test_instrumentation_is_reported(self):
+        collector = instrumentation.InMemoryCollector()
+        with instrumentation.collecting(collector):
+            compiled.calculate_risk(45, mother_onset_age=44)
+        self.assertEqual(collector.calls, 1)
@@ -0,0 +1,88 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from risk_models.claus import differential
+from risk_models.claus.answer_store import write_answer_store
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.differential import (
+    fast_paths,
+    random_case,
+    reference_calculate_risk,
+    run_differential,
+    shrink,
+    unregister_fast_path,
+)
+
+
+def ignoring_paternal_half_sisters(cases):
+    return [calculate_risk(patient_age, **dict(relatives, paternal_half_sister_onset_ages=None))
+            for patient_age, relatives in cases]
+
+
+def failing(cases):
+    raise RuntimeError('broken')
+
+
+class DifferentialTest(TestCase):
+
+    def test_fast_paths_agree_with_reference(self):
+        report = run_differential(cases=3000, seed=1, chunk_size=1000)
+        self.assertEqual(report.cases, 3000)
+        self.assertEqual(report.mismatches, [])
+        self.assertIn('calculate_risk', fast_paths())
+        self.assertIn('provenance', fast_paths())
+
+    def test_reference_matches_calculate_risk(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            patient_age, relatives = random_case(rng)
+            self.assertEqual(reference_calculate_risk(patient_age, **relatives),
+                             calculate_risk(patient_age, **relatives))
+
+    def test_mismatches_are_shrunk(self):
+        report = run_differential(cases=2000, paths={'broken': ignoring_paternal_half_sisters}, chunk_size=500)
+        self.assertEqual(len(report.mismatches), 1)
+        mismatch = report.mismatches[0]
+        self.assertEqual(mismatch.fast_path, 'broken')
+        self.assertEqual(list(mismatch.relatives), ['paternal_half_sister_onset_ages'])
+        self.assertEqual(len(mismatch.relatives['paternal_half_sister_onset_ages']), 1)
+        self.assertEqual(mismatch.expected, reference_calculate_risk(mismatch.patient_age, **mismatch.relatives))
+        self.assertIsNone(mismatch.actual)
+
+    def test_exceptions_are_mismatches(self):
+        mismatch = shrink('failing', failing, 45, {'mother_onset_age': 44, 'daughter_onset_ages': [33]})
+        self.assertEqual(mismatch.relatives, {})
+        self.assertIsInstance(mismatch.actual, RuntimeError)
+        with self.assertRaises(ValueError):
+            shrink('calculate_risk', fast_paths()['calculate_risk'], 45, {'mother_onset_age': 44})
+
+    def test_workers_require_registered_paths(self):
+        with self.assertRaises(ValueError):
+            run_differential(cases=10, paths={'broken': ignoring_paternal_half_sisters}, workers=2)
+
+    def test_answer_store_adds_to_builtins(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'claus.answers')
+            write_answer_store(path)
+            stdout, sys.stdout = sys.stdout, StringIO()
+            try:
+                self.assertEqual(differential.main(['--cases', '200', '--answer-store', path]), 0)
+                output = sys.stdout.getvalue()
+            finally:
+                sys.stdout = stdout
+                unregister_fast_path('answer_store')
+        finally:
+            shutil.rmtree(directory)
+        checked = output.splitlines()[0].split(' against ')[1].split(', ')
+        for name in ('calculate_risk', 'compiled', 'provenance', 'answer_store'):
+            self.assertIn(name, checked)
@@ -0,0 +1,87 @@
+import pickle
+import random
+from unittest import TestCase, skipIf
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from risk_models.claus.claus import calculate_risk, collect_family_indices
+from risk_models.claus.family_history import RELATIONSHIPS, FamilyHistory, calculate_risk_for
+
+
+def random_relatives(rng):
+    relatives = {}
+    if rng.random() < 0.4:
+        relatives['mother_onset_age'] = rng.randint(0, 95)
+    for relationship in RELATIONSHIPS:
+        if rng.random() < 0.3:
+            relatives[relationship + '_onset_ages'] = [rng.randint(10, 95) for _ in range(rng.randint(0, 4))]
+    return relatives
+
+
+class FamilyHistoryTest(TestCase):
+
+    def test_matches_calculate_risk(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            relatives = random_relatives(rng)
+            history = FamilyHistory(**relatives)
+            self.assertEqual(history.family_indices, collect_family_indices(**relatives))
+            for patient_age in (20, 29, rng.randint(20, 79), 79):
+                self.assertEqual(calculate_risk_for(history, patient_age), calculate_risk(patient_age, **relatives))
+
+    def test_sorted_relative_indices(self):
+        history = FamilyHistory(mother_onset_age=45, maternal_aunt_onset_ages=[66, 19, 33, 44])
+        self.assertEqual(history.mother_index, 2)
+        self.assertEqual(history.relative_indices['maternal_aunt'], (1, 2, 4))
+        self.assertEqual(history.relative_indices['daughter'], ())
+        self.assertEqual(history.onset_ages['maternal_aunt'], (66, 19, 33, 44))
+
+    def test_as_kwargs_round_trip(self):
+        history = FamilyHistory(mother_onset_age=45, paternal_half_sister_onset_ages=[64, 53])
+        self.assertEqual(FamilyHistory(**history.as_kwargs()), history)
+        self.assertEqual(hash(FamilyHistory(**history.as_kwargs())), hash(history))
+        self.assertNotEqual(FamilyHistory(mother_onset_age=46), FamilyHistory(mother_onset_age=45))
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            FamilyHistory().extra = 1
+
+    def test_immutable(self):
+        history = FamilyHistory(mother_onset_age=45, maternal_aunt_onset_ages=[51])
+        with self.assertRaises(AttributeError):
+            history.family_indices = collect_family_indices()
+        with self.assertRaises(AttributeError):
+            del history.mother_onset_age
+        with self.assertRaises(TypeError):
+            history.onset_ages['maternal_aunt'] = (33,)
+        with self.assertRaises(TypeError):
+            history.relative_indices.update(paternal_aunt=(1,))
+        self.assertEqual(history.family_indices,
+                         collect_family_indices(mother_onset_age=45, maternal_aunt_onset_ages=[51]))
+
+    def test_pickle_round_trip(self):
+        history = FamilyHistory(mother_onset_age=45, paternal_half_sister_onset_ages=[64, 53])
+        restored = pickle.loads(pickle.dumps(history, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(restored, history)
+        self.assertEqual(restored.family_indices, history.family_indices)
+        self.assertEqual(pickle.loads(pickle.dumps(history.onset_ages)), history.onset_ages)
+
+    def test_rejects_non_integer_ages(self):
+        with self.assertRaises(ValueError):
+            FamilyHistory(mother_onset_age='45')
+        with self.assertRaises(ValueError):
+            FamilyHistory(daughter_onset_ages=[22.5])
+        with self.assertRaises(ValueError):
+            FamilyHistory(full_sister_onset_ages=[True])
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_numpy_integer_ages(self):
+        history = FamilyHistory(mother_onset_age=np.int64(45), daughter_onset_ages=[np.int32(30)])
+        self.assertEqual(history, FamilyHistory(mother_onset_age=45, daughter_onset_ages=[30]))
+
+    def test_repr(self):
+        self.assertEqual(repr(FamilyHistory(mother_onset_age=45, daughter_onset_ages=[30])),
+                         'FamilyHistory(mother_onset_age=45, daughter_onset_ages=[30])')
@@ -0,0 +1,66 @@
+import random
+from unittest import TestCase
+
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.family_history import RELATIONSHIPS, FamilyHistory
+from risk_models.claus.incremental import IncrementalClausScorer, RiskUpdate
+
+
+class IncrementalClausScorerTest(TestCase):
+
+    def test_random_updates_match_calculate_risk(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            patient_age = rng.randint(20, 79)
+            scorer = IncrementalClausScorer(patient_age)
+            relatives = {}
+            for _ in range(10):
+                relationship = rng.choice(RELATIONSHIPS + ('mother',))
+                previous_risk = calculate_risk(patient_age, **relatives)
+                if relationship == 'mother':
+                    relatives['mother_onset_age'] = rng.choice([None, rng.randint(15, 90)])
+                    update = scorer.update('mother', relatives['mother_onset_age'])
+                elif rng.random() < 0.5:
+                    onset_age = rng.randint(15, 90)
+                    relatives.setdefault(relationship + '_onset_ages', []).append(onset_age)
+                    update = scorer.add_relative(relationship, onset_age)
+                else:
+                    relatives[relationship + '_onset_ages'] = [rng.randint(15, 90) for _ in range(rng.randint(0, 2))]
+                    update = scorer.update(relationship, relatives[relationship + '_onset_ages'])
+
+                risk = calculate_risk(patient_age, **relatives)
+                self.assertEqual(update, RiskUpdate(risk, risk != previous_risk))
+                self.assertEqual(scorer.risk, risk)
+
+    def test_from_history(self):
+        history = FamilyHistory(mother_onset_age=55, maternal_aunt_onset_ages=[66])
+        scorer = IncrementalClausScorer(20, history)
+        self.assertEqual(scorer.risk, calculate_risk(20, mother_onset_age=55, maternal_aunt_onset_ages=[66]))
+
+        update = scorer.add_relative('daughter', 33)
+        self.assertEqual(update.risk, calculate_risk(
+            20, mother_onset_age=55, maternal_aunt_onset_ages=[66], daughter_onset_ages=[33]))
+        self.assertTrue(update.changed)
+
+    def test_only_affected_tables_rescored(self):
+        scorer = IncrementalClausScorer(40, FamilyHistory(daughter_onset_ages=[33, 45]))
+        first_degree_scores = scorer.table_scores[:3]
+
+        scorer.add_relative('maternal_aunt', 50)
+        self.assertEqual(scorer.table_scores[:3], [first_degree_scores[0], scorer.table_scores[1],
+                                                   first_degree_scores[2]])
+        self.assertIsNotNone(scorer.table_scores[1])
+
+        # An out of range onset age changes no bins and no scores.
+        scores = scorer.table_scores
+        self.assertEqual(scorer.add_relative('maternal_aunt', 85), RiskUpdate(scorer.risk, False))
+        self.assertEqual(scorer.table_scores, scores)
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            IncrementalClausScorer(80)
+        scorer = IncrementalClausScorer(40)
+        with self.assertRaises(ValueError):
+            scorer.add_relative('cousin', 40)
+        with self.assertRaises(ValueError):
+            scorer.add_relative('maternal_aunt', '40')
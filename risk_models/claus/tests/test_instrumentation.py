@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+from risk_models.claus import instrumentation
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.instrumentation import InMemoryCollector, collecting, prometheus_text
+
+
+class InstrumentationTest(TestCase):
+
+    def test_collects_table_counts(self):
+        collector = InMemoryCollector()
+        with collecting(collector):
+            risk = calculate_risk(
+                20,
+                mother_onset_age=55,
+                maternal_aunt_onset_ages=[66, 90],
+                paternal_aunt_onset_ages=[52, 13],
+            )
+            calculate_risk(20, maternal_aunt_onset_ages=[44])
+            calculate_risk(20, daughter_onset_ages=[12])
+        self.assertEqual(instrumentation.collectors, [])
+        self.assertEqual(risk, calculate_risk(
+            20, mother_onset_age=55, maternal_aunt_onset_ages=[66, 90], paternal_aunt_onset_ages=[52, 13]))
+
+        self.assertEqual(collector.calls, 3)
+        self.assertEqual(collector.tables_consulted, {
+            'ONE_FIRST_DEG_TABLE': 1,
+            'ONE_SECOND_DEG_TABLE': 2,
+            'MOTHER_MATERNAL_AUNT': 1,
+            'MOTHER_PATERNAL_AUNT': 1,
+            'TWO_SEC_DEG_DIFF_SIDE_TABLE': 1,
+        })
+        self.assertEqual(sum(collector.tables_won.values()), 2)
+        self.assertEqual(collector.tables_won['ONE_SECOND_DEG_TABLE'], 1)
+        self.assertEqual(collector.dropped_ages, 3)
+        self.assertGreater(collector.phase_seconds['collect_indices'], 0)
+        self.assertGreater(collector.phase_seconds['evaluate_tables'], 0)
+
+    def test_callback(self):
+        events = []
+        with collecting(events.append):
+            calculate_risk(40, full_sister_onset_ages=[44, 85])
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].tables_consulted, ['ONE_FIRST_DEG_TABLE'])
+        self.assertEqual(events[0].winning_table, 'ONE_FIRST_DEG_TABLE')
+        self.assertEqual(events[0].dropped_ages, 1)
+
+    def test_prometheus_text(self):
+        collector = InMemoryCollector()
+        with collecting(collector):
+            calculate_risk(40, full_sister_onset_ages=[44, 85])
+        text = prometheus_text(collector)
+        self.assertIn('claus_calculate_risk_total 1\n', text)
+        self.assertIn('claus_table_consulted_total{table="ONE_FIRST_DEG_TABLE"} 1\n', text)
+        self.assertIn('claus_table_won_total{table="TWO_FIRST_DEG_TABLE"} 0\n', text)
+        self.assertIn('claus_dropped_ages_total 1\n', text)
+        self.assertIn('# TYPE claus_phase_seconds_total counter\n', text)
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+import risk_models.claus
+from risk_models.claus.claus import calculate_risk
+
+
+class PackageTest(TestCase):
+
+    def test_lazy_attributes(self):
+        self.assertIs(risk_models.claus.calculate_risk, calculate_risk)
+        self.assertIn('FamilyHistory', dir(risk_models.claus))
+        self.assertEqual('calculate_risk_batch' in dir(risk_models.claus), 'risk_models.claus.batch' in sys.modules)
+        with self.assertRaises(AttributeError):
+            risk_models.claus.not_a_name
+
+    def test_import_is_lazy(self):
+        # A fresh interpreter, since other tests may already have imported NumPy or built the tables.
+        code = '\n'.join([
+            'import sys',
+            'import risk_models.claus',
+            'from risk_models.claus import calculate_risk',
+            'from risk_models.claus import claus',
+            'assert "numpy" not in sys.modules',
+            'assert "pyarrow" not in sys.modules',
+            'assert claus._risk_lattice is None',
+            'assert "risk_models.claus.packed_tables" not in sys.modules',
+            'assert "risk_models.claus.instrumentation" not in sys.modules',
+        ])
+        subprocess.check_call([sys.executable, '-c', code])
@@ -0,0 +1,38 @@
+import io
+import json
+from unittest import TestCase
+
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.cli import score_stream
+from risk_models.claus.parallel import ParallelScorer, score_records_parallel
+
+RECORDS = [
+    {'patient_age': 34, 'mother_onset_age': 44},
+    {'patient_age': 20, 'maternal_aunt_onset_ages': [55, 33], 'paternal_half_sister_onset_ages': [44]},
+    {'patient_age': 60},
+    {'patient_age': 45, 'daughter_onset_ages': [12, 22], 'full_sister_onset_ages': [11, 34]},
+    {'patient_age': 79, 'maternal_grandmother_onset_ages': [22, 77], 'paternal_aunt_onset_ages': [44, 55]},
+] * 7
+
+
+class ParallelTest(TestCase):
+
+    def test_preserves_order(self):
+        expected = [calculate_risk(**record) for record in RECORDS]
+        self.assertEqual(list(score_records_parallel(iter(RECORDS), workers=2, chunk_size=3)), expected)
+
+    def test_empty(self):
+        self.assertEqual(list(score_records_parallel([], workers=2)), [])
+
+    def test_score_stream(self):
+        input_stream = io.StringIO(u''.join(json.dumps(record) + '\n' for record in RECORDS))
+        output_stream = io.StringIO()
+        with ParallelScorer(workers=2, chunk_size=4) as scorer:
+            self.assertEqual(score_stream(input_stream, output_stream, 'jsonl', 10, score_chunk=scorer.score_chunk),
+                             (len(RECORDS), 0))
+        risks = [json.loads(line)['risk'] for line in output_stream.getvalue().splitlines()]
+        self.assertEqual(risks, [calculate_risk(**record) for record in RECORDS])
+
+    def test_invalid_chunk_size(self):
+        with self.assertRaises(ValueError):
+            ParallelScorer(workers=1, chunk_size=0)
@@ -0,0 +1,126 @@
+import random
+from unittest import TestCase
+
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.pedigree import FEMALE, MALE, Individual, Pedigree
+
+
+def random_pedigree(rng, generations=4, founders=6):
+    individuals = []
+    previous = []
+    for generation in range(generations):
+        current = []
+        for index in range(founders if generation == 0 else rng.randint(4, 20)):
+            mothers = [individual for individual in previous if individual.sex == FEMALE]
+            fathers = [individual for individual in previous if individual.sex == MALE]
+            mother = rng.choice(mothers).id if mothers and rng.random() < 0.9 else None
+            father = rng.choice(fathers).id if fathers and rng.random() < 0.7 else None
+            individual = Individual(
+                '{}-{}'.format(generation, index),
+                rng.choice([FEMALE, FEMALE, MALE]),
+                mother,
+                father,
+                rng.choice([None, rng.randint(15, 85)]),
+                rng.choice([None, None, rng.randint(15, 90)]),
+            )
+            current.append(individual)
+        individuals.extend(current)
+        previous = current
+    return individuals
+
+
+def naive_relatives(individuals, proband):
+    # Classifies every relative by scanning the whole pedigree.
+    by_id = dict((individual.id, individual) for individual in individuals)
+
+    def onset_ages(relatives):
+        return [relative.onset_age for relative in relatives
+                if relative.sex == FEMALE and relative.onset_age is not None]
+
+    def children(parent_id):
+        return [individual for individual in individuals
+                if parent_id is not None and parent_id in (individual.mother, individual.father)]
+
+    def sisters_of(parent):
+        if parent is None:
+            return []
+        return [child for child in children(parent.mother) + [child for child in children(parent.father)
+                                                              if child.mother != parent.mother or parent.mother is None]
+                if child.id != parent.id]
+
+    mother = by_id.get(proband.mother)
+    father = by_id.get(proband.father)
+    siblings = [individual for individual in individuals if individual.id != proband.id]
+    return {
+        'mother_onset_age': mother.onset_age if mother else None,
+        'daughter_onset_ages': onset_ages(children(proband.id)),
+        'full_sister_onset_ages': onset_ages(
+            sibling for sibling in siblings
+            if proband.mother is not None and proband.father is not None and
+            (sibling.mother, sibling.father) == (proband.mother, proband.father)),
+        'maternal_aunt_onset_ages': onset_ages(sisters_of(mother)),
+        'paternal_aunt_onset_ages': onset_ages(sisters_of(father)),
+        'maternal_grandmother_onset_ages': onset_ages([by_id[mother.mother]] if mother and mother.mother else []),
+        'paternal_grandmother_onset_ages': onset_ages([by_id[father.mother]] if father and father.mother else []),
+        'maternal_half_sister_onset_ages': onset_ages(
+            sibling for sibling in siblings
+            if proband.mother is not None and sibling.mother == proband.mother and
+            (proband.father is None or sibling.father != proband.father)),
+        'paternal_half_sister_onset_ages': onset_ages(
+            sibling for sibling in siblings
+            if proband.father is not None and sibling.father == proband.father and
+            (proband.mother is None or sibling.mother != proband.mother)),
+    }
+
+
+class PedigreeTest(TestCase):
+
+    def test_matches_naive_classification(self):
+        rng = random.Random(0)
+        for _ in range(100):
+            individuals = random_pedigree(rng)
+            pedigree = Pedigree(individuals)
+            scores = pedigree.score_females()
+            for individual in individuals:
+                if individual.sex != FEMALE or individual.age is None or not 20 <= individual.age <= 79:
+                    self.assertNotIn(individual.id, scores)
+                    continue
+                expected = calculate_risk(individual.age, **naive_relatives(individuals, individual))
+                self.assertEqual(scores[individual.id], expected)
+
+    def test_relatives(self):
+        pedigree = Pedigree([
+            Individual('grandmother', FEMALE, None, None, None, 61),
+            Individual('aunt', FEMALE, 'grandmother', None, None, 52),
+            Individual('mother', FEMALE, 'grandmother', None, None, 48),
+            Individual('father', MALE, None, None, None, None),
+            Individual('stepfather', MALE, None, None, None, None),
+            Individual('sister', FEMALE, 'mother', 'father', None, 39),
+            Individual('half_sister', FEMALE, 'mother', 'stepfather', None, 44),
+            Individual('proband', FEMALE, 'mother', 'father', 45, None),
+            Individual('daughter', FEMALE, 'proband', None, 25, 24),
+        ])
+        self.assertEqual(pedigree.relatives('proband'), {
+            'mother_onset_age': 48,
+            'daughter_onset_ages': [24],
+            'full_sister_onset_ages': [39],
+            'maternal_aunt_onset_ages': [52],
+            'paternal_aunt_onset_ages': [],
+            'maternal_grandmother_onset_ages': [61],
+            'paternal_grandmother_onset_ages': [],
+            'maternal_half_sister_onset_ages': [44],
+            'paternal_half_sister_onset_ages': [],
+        })
+        self.assertEqual(pedigree.calculate_risk('proband'),
+                         calculate_risk(45, **pedigree.relatives('proband')))
+        with self.assertRaises(ValueError):
+            pedigree.calculate_risk('grandmother')
+
+    def test_invalid_pedigrees(self):
+        for individuals in (
+                [Individual('a', FEMALE, None, None, 40, None), Individual('a', FEMALE, None, None, 40, None)],
+                [Individual('a', FEMALE, 'missing', None, 40, None)],
+                [Individual('m', MALE, None, None, 40, None), Individual('a', FEMALE, 'm', None, 40, None)],
+                [Individual('a', 'X', None, None, 40, None)]):
+            with self.assertRaises(ValueError):
+                Pedigree(individuals)
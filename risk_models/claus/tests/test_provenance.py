@@ -0,0 +1,68 @@
+import random
+from unittest import TestCase, skipIf
+
+try:
+    import numpy as np
+    from risk_models.claus.batch import PROVENANCE_DTYPE, calculate_risk_batch
+except ImportError:
+    np = None
+
+from risk_models.claus.claus import TABLE_CRITERIA, calculate_risk, get_lifetime_risk
+from risk_models.claus.claus_tables import CLAUS_TABLES, CLAUS_TABLE_NAMES
+from risk_models.claus.differential import random_case
+from risk_models.claus.provenance import MISSING, PROVENANCE_FIELDS, calculate_risk_with_provenance
+from risk_models.claus.records import MOTHER_FIELD, RELATIVE_FIELDS
+
+
+def random_cases(seed, count):
+    rng = random.Random(seed)
+    return [random_case(rng) for _ in range(count)]
+
+
+class ProvenanceTest(TestCase):
+
+    def test_provenance_reproduces_risk(self):
+        for patient_age, relatives in random_cases(0, 3000):
+            provenance = calculate_risk_with_provenance(patient_age, **relatives)
+            self.assertEqual(provenance.risk, calculate_risk(patient_age, **relatives))
+            if provenance.risk is None:
+                self.assertEqual(set(provenance[1:]), {None})
+                continue
+            table = CLAUS_TABLES[provenance.table]
+            self.assertIs(TABLE_CRITERIA[provenance.criteria][0], table)
+            self.assertEqual(get_lifetime_risk(table, patient_age, provenance.relative1_index,
+                                               provenance.relative2_index), provenance.risk)
+            lower_bin, age_offset = divmod(patient_age - 29, 10)
+            self.assertEqual((provenance.age_bin, provenance.age_offset), (lower_bin % 6, age_offset))
+
+    def test_example(self):
+        provenance = calculate_risk_with_provenance(
+            33, mother_onset_age=44, maternal_aunt_onset_ages=[51], paternal_half_sister_onset_ages=[62])
+        self.assertEqual(CLAUS_TABLE_NAMES[provenance.table], 'MOTHER_MATERNAL_AUNT')
+        self.assertEqual(provenance[1:], (3, 3, 2, 3, 0, 4))
+        self.assertEqual(calculate_risk_with_provenance(25, mother_onset_age=44)[-2:], (5, 6))
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_batch_matches_scalar(self):
+        cases = random_cases(1, 3000)
+        columns = dict((field, [relatives.get(field) for _, relatives in cases]) for field in RELATIVE_FIELDS)
+        mother_onset_ages = [relatives.get(MOTHER_FIELD) for _, relatives in cases]
+        risks, provenance = calculate_risk_batch(
+            [patient_age for patient_age, _ in cases],
+            mother_onset_ages=[np.nan if age is None else age for age in mother_onset_ages],
+            provenance=True,
+            **columns)
+
+        self.assertEqual(provenance.dtype, PROVENANCE_DTYPE)
+        self.assertEqual(provenance.itemsize, len(PROVENANCE_FIELDS))
+        for (patient_age, relatives), risk, packed in zip(cases, risks, provenance):
+            expected = calculate_risk_with_provenance(patient_age, **relatives)
+            self.assertEqual(None if np.isnan(risk) else risk, expected.risk)
+            self.assertEqual(tuple(int(value) for value in packed),
+                             tuple(MISSING if value is None else value for value in expected[1:]))
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_batch_without_provenance(self):
+        risks = calculate_risk_batch([40, 50], mother_onset_ages=[44, np.nan])
+        self.assertEqual(risks[0], calculate_risk(40, mother_onset_age=44))
+        self.assertTrue(np.isnan(risks[1]))
@@ -0,0 +1,82 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.result_cache import PersistentRiskCache
+
+
+def random_records(size, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(size):
+        record = {'patient_age': rng.randint(20, 79)}
+        if rng.random() < 0.5:
+            record['mother_onset_age'] = rng.randint(10, 95)
+        for field in ('full_sister_onset_ages', 'maternal_aunt_onset_ages', 'paternal_half_sister_onset_ages'):
+            if rng.random() < 0.5:
+                record[field] = [rng.randint(10, 95) for _ in range(rng.randint(0, 3))]
+        records.append(record)
+    return records
+
+
+class PersistentRiskCacheTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_persists_across_runs(self):
+        records = random_records(500)
+        expected = [calculate_risk(**record) for record in records]
+        with PersistentRiskCache(self.path) as cache:
+            self.assertEqual(cache.score_records(records), expected)
+            self.assertEqual(cache.cache_info().hits + cache.cache_info().misses, len(records))
+
+        scored = []
+        with PersistentRiskCache(self.path, score_batch=lambda batch: scored.extend(batch) or [0.0] * len(batch)) as cache:
+            self.assertEqual(cache.score_records(records), expected)
+            self.assertEqual(cache.score_records(random_records(1, seed=1)), [0.0])
+            self.assertEqual(cache.cache_info().hits, len(records))
+        self.assertEqual(scored, random_records(1, seed=1))
+
+    def test_normalized_inputs_share_entries(self):
+        with PersistentRiskCache(self.path) as cache:
+            cache.calculate_risk(45, mother_onset_age=44, maternal_aunt_onset_ages=[61, 33])
+            self.assertEqual(cache.calculate_risk(45, mother_onset_age=44, maternal_aunt_onset_ages=[33, 90, 61],
+                                                  daughter_onset_ages=[]),
+                             calculate_risk(45, mother_onset_age=44, maternal_aunt_onset_ages=[61, 33]))
+            self.assertEqual(cache.cache_info().hits, 1)
+            cache.calculate_risk(46, mother_onset_age=44, maternal_aunt_onset_ages=[61, 33])
+            self.assertEqual(cache.cache_info().misses, 2)
+
+    def test_table_change_invalidates(self):
+        with PersistentRiskCache(self.path) as cache:
+            cache.score_records(random_records(20))
+            self.assertEqual(cache.cache_info().currsize, 20)
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute("UPDATE meta SET value = 'old tables' WHERE name = 'fingerprint'")
+        connection.close()
+
+        with PersistentRiskCache(self.path) as cache:
+            self.assertEqual(cache.cache_info().currsize, 0)
+
+    def test_evicts_least_recently_used(self):
+        with PersistentRiskCache(self.path, max_entries=10) as cache:
+            first = {'patient_age': 20}
+            cache.score_records([first])
+            for patient_age in range(21, 40):
+                cache.score_records([first, {'patient_age': patient_age}])
+            self.assertEqual(cache.cache_info().currsize, 10)
+            misses = cache.cache_info().misses
+            cache.score_records([first, {'patient_age': 39}])
+            self.assertEqual(cache.cache_info().misses, misses)
+            cache.score_records([{'patient_age': 21}])
+            self.assertEqual(cache.cache_info().misses, misses + 1)
@@ -0,0 +1,55 @@
+import sys
+from functools import partial
+from unittest import TestCase, skipIf
+
+from risk_models.claus.claus import calculate_risk
+
+if sys.version_info[0] >= 3:
+    import asyncio
+
+    from risk_models.claus.service import ServiceMetrics
+    from risk_models.claus.tests.service_helpers import error_responses, run_service, score_concurrently
+
+requires_python3 = skipIf(sys.version_info[0] < 3, 'the scoring service requires Python 3')
+
+
+@requires_python3
+class ScoringServiceTest(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_service(self, test, **batcher_options):
+        return self.loop.run_until_complete(run_service(test, **batcher_options))
+
+    def test_concurrent_requests_are_batched(self):
+        records = [{'patient_age': 20 + i % 60, 'mother_onset_age': 25 + i % 50} for i in range(40)]
+
+        responses, (status, metrics) = self.run_service(
+            partial(score_concurrently, records=records), max_batch_size=16, max_wait=0.05)
+        self.assertEqual(responses, [(200, {'risk': calculate_risk(**record)}) for record in records])
+        self.assertEqual(status, 200)
+        self.assertEqual(metrics['requests'], 40)
+        self.assertLess(metrics['batches'], 40)
+        self.assertTrue(all(int(size) <= 16 for size in metrics['batch_sizes']))
+        self.assertEqual(sorted(metrics['latency_seconds']), ['p50', 'p90', 'p99', 'p99.9'])
+
+    def test_errors(self):
+        statuses = [status for status, _ in self.run_service(error_responses)]
+        self.assertEqual(statuses, [400, 405, 404])
+
+
+@requires_python3
+class ServiceMetricsTest(TestCase):
+
+    def test_percentiles(self):
+        metrics = ServiceMetrics()
+        self.assertEqual(metrics.latency_percentiles(), {})
+        metrics.record_batch([i / 100 for i in range(1, 101)])
+        metrics.record_batch([0.5])
+        self.assertEqual(metrics.latency_percentiles((50, 99)), {50: 0.5, 99: 0.99})
+        self.assertEqual(metrics.batch_sizes, {100: 1, 1: 1})
+        self.assertEqual(metrics.requests, 101)
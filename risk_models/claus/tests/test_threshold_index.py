@@ -0,0 +1,78 @@
+import random
+from unittest import TestCase
+
+from risk_models.claus.claus import calculate_risk, collect_family_indices, get_lifetime_risk
+from risk_models.claus.claus_tables import CLAUS_TABLE_NAMES, CLAUS_TABLE_RELATIVES, CLAUS_TABLES
+from risk_models.claus.differential import random_case
+from risk_models.claus.family_history import FamilyHistory
+from risk_models.claus.threshold_index import ThresholdIndex, crosses_threshold, threshold_ages, threshold_index
+
+
+def valid_case(rng):
+    # FamilyHistory rejects the negative onset ages random_case generates.
+    patient_age, relatives = random_case(rng)
+    for field, value in relatives.items():
+        if isinstance(value, list):
+            relatives[field] = [age for age in value if age > 0]
+        elif value is not None and value <= 0:
+            relatives[field] = None
+    return patient_age, relatives
+
+
+class ThresholdIndexTest(TestCase):
+
+    def test_matches_calculate_risk(self):
+        rng = random.Random(0)
+        for threshold in (0.1, 0.2, 0.3):
+            for _ in range(300):
+                _, relatives = valid_case(rng)
+                history = FamilyHistory(**relatives)
+                risks = dict((age, calculate_risk(age, **relatives)) for age in range(20, 80))
+                expected = [age for age, risk in sorted(risks.items()) if risk is not None and risk >= threshold]
+                self.assertEqual(threshold_ages(history, threshold), expected)
+                self.assertEqual(crosses_threshold(history, threshold), bool(expected))
+                for patient_age in (20, 29, 45, 79):
+                    self.assertEqual(crosses_threshold(history, threshold, patient_age), patient_age in expected)
+
+    def test_combinations(self):
+        index = threshold_index(0.2)
+        self.assertIs(index, threshold_index(0.2))
+        for patient_age in (20, 35, 79):
+            expected = set()
+            for name, table, relatives in zip(CLAUS_TABLE_NAMES, CLAUS_TABLES, CLAUS_TABLE_RELATIVES):
+                pairs = [(r1, None) for r1 in range(6)] if relatives == 1 else [
+                    (r1, r2) for r1 in range(6) for r2 in range(6)]
+                for r1, r2 in pairs:
+                    if get_lifetime_risk(table, patient_age, r1, r2) >= 0.2:
+                        expected.add((name, r1, r2))
+            combinations = index.combinations(patient_age)
+            self.assertEqual(set(combination[:3] for combination in combinations), expected)
+            for combination in combinations:
+                self.assertTrue(combination.first_age <= patient_age <= combination.last_age)
+
+    def test_ages_form_one_interval(self):
+        for threshold in (0.05, 0.15, 0.25, 0.35, 0.45):
+            index = ThresholdIndex(threshold)
+            for patient_age in range(20, 80):
+                for combination in index.combinations(patient_age):
+                    for age in range(combination.first_age, combination.last_age + 1):
+                        self.assertIn(combination, index.combinations(age))
+
+    def test_select(self):
+        rng = random.Random(1)
+        records = [dict(relatives, patient_age=patient_age)
+                   for patient_age, relatives in (random_case(rng) for _ in range(2000))]
+        selected = list(threshold_index(0.2).select(records))
+        self.assertEqual(selected, [record for record in records if (calculate_risk(**record) or 0) >= 0.2])
+        self.assertTrue(selected)
+
+    def test_select_ignores_other_fields(self):
+        records = [
+            {'id': 'p1', 'risk': 0.5, 'patient_age': 40, 'mother_onset_age': 35, 'full_sister_onset_ages': [38]},
+            {'id': 'p2', 'risk': 0.5, 'patient_age': 40},
+        ]
+        self.assertEqual(list(threshold_index(0.2).select(records)), records[:1])
+
+    def test_invalid_patient_age(self):
+        with self.assertRaises(ValueError):
+            threshold_index(0.2).at_or_above(80, collect_family_indices(mother_onset_age=44))
@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+from risk_models.claus.claus import calculate_risk, get_lifetime_risk
+from risk_models.claus.claus_tables import MOTHER_MATERNAL_AUNT, ONE_SECOND_DEG_TABLE, TWO_SEC_DEG_SAME_SIDE_TABLE
+from risk_models.claus.family_history import FamilyHistory
+from risk_models.claus.trajectory import risk_trajectory
+
+
+class RiskTrajectoryTest(TestCase):
+
+    def test_matches_calculate_risk_at_every_age(self):
+        relatives = dict(
+            mother_onset_age=55,
+            maternal_aunt_onset_ages=[66, 44],
+            paternal_aunt_onset_ages=[22],
+            paternal_grandmother_onset_ages=[88, 34],
+        )
+        trajectory = risk_trajectory(FamilyHistory(**relatives))
+        self.assertEqual(trajectory.patient_ages, list(range(20, 80)))
+        self.assertEqual(trajectory.risks, [calculate_risk(age, **relatives) for age in range(20, 80)])
+
+    def test_winning_tables(self):
+        history = FamilyHistory(maternal_half_sister_onset_ages=[55], maternal_grandmother_onset_ages=[77])
+        trajectory = risk_trajectory(history, [20, 45])
+        self.assertEqual(trajectory.risks, [get_lifetime_risk(TWO_SEC_DEG_SAME_SIDE_TABLE, 20, 3, 5),
+                                            get_lifetime_risk(TWO_SEC_DEG_SAME_SIDE_TABLE, 45, 3, 5)])
+        self.assertEqual(trajectory.tables, ['TWO_SEC_DEG_SAME_SIDE_TABLE'] * 2)
+
+        history = FamilyHistory(mother_onset_age=55, maternal_aunt_onset_ages=[66])
+        self.assertEqual(risk_trajectory(history, [20]).tables, ['MOTHER_MATERNAL_AUNT'])
+        self.assertEqual(risk_trajectory(history, [20]).risks, [get_lifetime_risk(MOTHER_MATERNAL_AUNT, 20, 3, 4)])
+
+        history = FamilyHistory(paternal_aunt_onset_ages=[54])
+        self.assertEqual(risk_trajectory(history, [33]).risks, [get_lifetime_risk(ONE_SECOND_DEG_TABLE, 33, 3)])
+
+    def test_no_applicable_table(self):
+        trajectory = risk_trajectory(FamilyHistory(daughter_onset_ages=[12]), [20, 79])
+        self.assertEqual(trajectory.risks, [None, None])
+        self.assertEqual(trajectory.tables, [None, None])
+
+    def test_invalid_age(self):
+        with self.assertRaises(ValueError):
+            risk_trajectory(FamilyHistory(), [19])
@@ -0,0 +1,100 @@
+import math
+from itertools import product
+from unittest import TestCase, skipIf
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from risk_models.claus import uncertainty
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.uncertainty import UNKNOWN, AgeDistribution, AgeInterval, uncertain_risk
+
+
+class UncertaintyTest(TestCase):
+
+    def test_exact_ages_match_calculate_risk(self):
+        relatives = {'mother_onset_age': 44, 'maternal_aunt_onset_ages': [51, 90], 'daughter_onset_ages': [33]}
+        result = uncertain_risk(45, **relatives)
+        risk = calculate_risk(45, **relatives)
+        self.assertTrue(result.exact)
+        self.assertEqual(result.mean, risk)
+        self.assertEqual(result.quantiles, {0.05: risk, 0.5: risk, 0.95: risk})
+        self.assertEqual(uncertain_risk(45).no_risk_probability, 1.0)
+
+    def test_enumeration_matches_brute_force(self):
+        mother_ages = range(25, 45)
+        aunt_ages = range(15, 35)
+        half_sister_ages = (30, 85, 85)
+        result = uncertain_risk(
+            60,
+            mother_onset_age=AgeInterval(25, 44),
+            maternal_aunt_onset_ages=[AgeInterval(15, 34)],
+            paternal_half_sister_onset_ages=[AgeDistribution({30: 1, 85: 2})],
+            quantiles=(0, 0.25, 0.5, 0.9, 1),
+        )
+
+        risks = sorted(
+            calculate_risk(60, mother_onset_age=mother, maternal_aunt_onset_ages=[aunt],
+                           paternal_half_sister_onset_ages=[half_sister]) or 0.0
+            for mother, aunt, half_sister in product(mother_ages, aunt_ages, half_sister_ages)
+        )
+        self.assertTrue(result.exact)
+        self.assertAlmostEqual(result.mean, sum(risks) / len(risks))
+        self.assertEqual(result.no_risk_probability, 0.0)
+        for quantile, risk in result.quantiles.items():
+            self.assertEqual(risk, risks[max(0, int(math.ceil(quantile * len(risks))) - 1)])
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_sampling_approximates_enumeration(self):
+        relatives = {
+            'full_sister_onset_ages': [UNKNOWN, UNKNOWN],
+            'maternal_aunt_onset_ages': [UNKNOWN, UNKNOWN],
+            'paternal_half_sister_onset_ages': [UNKNOWN, UNKNOWN],
+        }
+        max_enumerated_outcomes = uncertainty.MAX_ENUMERATED_OUTCOMES
+        uncertainty.MAX_ENUMERATED_OUTCOMES = 20000
+        try:
+            exact = uncertain_risk(50, samples=20000, **relatives)
+        finally:
+            uncertainty.MAX_ENUMERATED_OUTCOMES = max_enumerated_outcomes
+        sampled = uncertain_risk(50, samples=5000, seed=0, **relatives)
+        self.assertTrue(exact.exact)
+        self.assertFalse(sampled.exact)
+        self.assertAlmostEqual(sampled.mean, exact.mean, delta=0.005)
+        self.assertEqual(sampled, uncertain_risk(50, samples=5000, seed=0, **relatives))
+        # 9261 outcomes are sampled even though the default sample count could cover them.
+        self.assertFalse(uncertain_risk(50, **relatives).exact)
+
+    def test_sampling_without_numpy(self):
+        relatives = {
+            'full_sister_onset_ages': [UNKNOWN, UNKNOWN],
+            'maternal_aunt_onset_ages': [UNKNOWN, UNKNOWN],
+            'paternal_half_sister_onset_ages': [UNKNOWN, UNKNOWN],
+        }
+        numpy_available = uncertainty._numpy_available
+        uncertainty._numpy_available = lambda: False
+        try:
+            exact = uncertain_risk(50, samples=20000, **relatives)
+            sampled = uncertain_risk(50, samples=5000, seed=0, **relatives)
+            self.assertEqual(sampled, uncertain_risk(50, samples=5000, seed=0, **relatives))
+        finally:
+            uncertainty._numpy_available = numpy_available
+        self.assertTrue(exact.exact)
+        self.assertFalse(sampled.exact)
+        self.assertAlmostEqual(sampled.mean, exact.mean, delta=0.005)
+        self.assertAlmostEqual(sampled.no_risk_probability, exact.no_risk_probability, delta=0.02)
+
+    def test_invalid_arguments(self):
+        for kwargs in (
+                {'mother_onset_age': AgeInterval(50, 40)},
+                {'mother_onset_age': 44.5},
+                {'daughter_onset_ages': [AgeDistribution({30: 0})]},
+                {'daughter_onset_ages': [AgeDistribution({30: -1, 40: 2})]},
+                {'quantiles': (1.5,)},
+                {'samples': 0}):
+            with self.assertRaises(ValueError):
+                uncertain_risk(45, **kwargs)
+        with self.assertRaises(ValueError):
+            uncertain_risk(19)
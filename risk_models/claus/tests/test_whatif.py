@@ -0,0 +1,65 @@
+import random
+from unittest import TestCase
+
+from risk_models.claus.claus import calculate_risk
+from risk_models.claus.family_history import FamilyHistory
+from risk_models.claus.tests.test_family_history import random_relatives
+from risk_models.claus.whatif import (
+    AddRelative,
+    MoveSide,
+    RemoveRelative,
+    ShiftOnset,
+    apply_perturbation,
+    format_delta_table,
+    perturbed_family_indices,
+    sensitivity_perturbations,
+    what_if,
+)
+
+
+class WhatIfTest(TestCase):
+
+    def test_matches_calculate_risk_on_perturbed_history(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            history = FamilyHistory(**random_relatives(rng))
+            patient_age = rng.randint(20, 79)
+            perturbations = sensitivity_perturbations(history, rng.randint(1, 15), rng.randint(20, 79))
+            for result in what_if(history, patient_age, perturbations):
+                perturbed = apply_perturbation(history, result.perturbation)
+                self.assertEqual(perturbed_family_indices(history, result.perturbation), perturbed.family_indices)
+                self.assertEqual(result.risk, calculate_risk(patient_age, **perturbed.as_kwargs()))
+
+    def test_ranked_by_absolute_delta(self):
+        history = FamilyHistory(mother_onset_age=52, maternal_aunt_onset_ages=[45], paternal_half_sister_onset_ages=[61])
+        results = what_if(history, 40, sensitivity_perturbations(history, added_onset_age=38))
+        deltas = [abs(result.delta) for result in results]
+        self.assertEqual(deltas, sorted(deltas, reverse=True))
+        self.assertEqual(results[0].perturbation, RemoveRelative('maternal_aunt', 0))
+        self.assertEqual(results[0].delta, -0.149)
+
+        table = format_delta_table(history, results)
+        self.assertIn('remove maternal aunt diagnosed at 45', table.splitlines()[1])
+
+    def test_perturbations(self):
+        history = FamilyHistory(mother_onset_age=52, maternal_aunt_onset_ages=[45, 60])
+        self.assertEqual(apply_perturbation(history, ShiftOnset('maternal_aunt', 1, -20)),
+                         FamilyHistory(mother_onset_age=52, maternal_aunt_onset_ages=[45, 40]))
+        self.assertEqual(apply_perturbation(history, MoveSide('maternal_aunt', 0)),
+                         FamilyHistory(mother_onset_age=52, maternal_aunt_onset_ages=[60], paternal_aunt_onset_ages=[45]))
+        self.assertEqual(apply_perturbation(history, RemoveRelative('mother', 0)),
+                         FamilyHistory(maternal_aunt_onset_ages=[45, 60]))
+        self.assertEqual(apply_perturbation(history, AddRelative('daughter', 30)),
+                         FamilyHistory(mother_onset_age=52, maternal_aunt_onset_ages=[45, 60], daughter_onset_ages=[30]))
+
+    def test_invalid_perturbations(self):
+        history = FamilyHistory(mother_onset_age=52, daughter_onset_ages=[45])
+        for perturbation in (
+                ShiftOnset('maternal_aunt', 0, 10),
+                RemoveRelative('daughter', 1),
+                MoveSide('daughter', 0),
+                AddRelative('mother', 40),
+                AddRelative('cousin', 40),
+                AddRelative('daughter', 40.5)):
+            with self.assertRaises(ValueError):
+                what_if(history, 40, [perturbation])
@@ -0,0 +1,166 @@
+"""
+Reverse index from a risk threshold to the family configurations that meet it at each patient age.
+
+The Claus tables are small and fixed, so for a threshold every table cell (a table and its relative bin indices)
+can be reduced to the set of patient ages at which its risk is at or above the threshold, stored as a bitmask over
+ages 20-79. A family's risk is the max over its applicable cells, so the ages at which it meets the threshold are
+the union of their masks: eligibility becomes a few integer ORs on the binned relatives instead of a risk
+evaluation.
+
+    index = threshold_index(0.2)
+    index.combinations(45)                 # cells at or above 20% for a 45 year old
+    crosses_threshold(history, 0.2, 45)    # is this patient at or above 20%?
+    threshold_ages(history, 0.2)           # every age at which the patient would be
+
+Risk rises with patient age from 20 to 29 (see `get_lifetime_risk`) and falls after, so the qualifying ages of a
+cell form one interval, reported as its first and last age.
+"""
+from collections import namedtuple
+
+from risk_models.claus.claus import (
+    PATIENT_AGE_COUNT,
+    TABLE_CRITERIA,
+    VALID_MIN_AGE,
+    VALID_MAX_AGE,
+    FamilyIndices,
+    _TABLE_IDS,
+    _iter_table_cells,
+    _lattice_offset,
+    collect_family_indices,
+    get_risk_lattice,
+)
+from risk_models.claus.claus_tables import CLAUS_TABLE_NAMES, TABLE_SIZE
+from risk_models.claus.records import MOTHER_FIELD, PATIENT_AGE_FIELD, RELATIVE_FIELDS
+
+# A table cell at or above the threshold: the table name, its relative bin indices (relative2_index is None for
+# single relative tables) and the youngest and oldest patient ages at which it is at or above the threshold.
+Combination = namedtuple('Combination', ['table', 'relative1_index', 'relative2_index', 'first_age', 'last_age'])
+
+# collect_family_indices arguments, in order.
+_RELATIVE_FIELDS = (MOTHER_FIELD,) + RELATIVE_FIELDS
+
+_indices = {}
+
+
+class ThresholdIndex(object):
+    """
+    Table cells whose risk is at or above `threshold`, by patient age.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        lattice = get_risk_lattice()
+        # Age masks by (table id, relative1 index, relative2 index), relative2 index None for single relative tables.
+        cell_masks = {}
+        combinations = []
+        for table_id, _, relative1_index, relative2_index in _iter_table_cells():
+            mask = 0
+            for patient_age in range(VALID_MIN_AGE, VALID_MAX_AGE + 1):
+                if lattice[_lattice_offset(table_id, patient_age, relative1_index, relative2_index)] >= threshold:
+                    mask |= 1 << (patient_age - VALID_MIN_AGE)
+            cell_masks[table_id, relative1_index, relative2_index] = mask
+            if mask:
+                combinations.append((mask, Combination(
+                    CLAUS_TABLE_NAMES[table_id], relative1_index, relative2_index,
+                    VALID_MIN_AGE + _lowest_bit(mask), VALID_MIN_AGE + mask.bit_length() - 1)))
+        self._combinations_by_age = tuple(
+            tuple(combination for mask, combination in combinations if mask >> age_offset & 1)
+            for age_offset in range(PATIENT_AGE_COUNT)
+        )
+        # For each criteria in TABLE_CRITERIA: its table's age masks indexed by relative1_index * TABLE_SIZE +
+        # relative2_index (or relative1_index alone), and the FamilyIndices positions of its relatives (the second
+        # None for single relative tables).
+        self._criteria = []
+        for table, fields in TABLE_CRITERIA:
+            table_id = _TABLE_IDS[id(table)]
+            positions = [FamilyIndices._fields.index(field) for field in fields]
+            if len(fields) == 1:
+                masks = [cell_masks[table_id, index, None] for index in range(TABLE_SIZE)]
+                positions.append(None)
+            else:
+                masks = [cell_masks[table_id, index // TABLE_SIZE, index % TABLE_SIZE]
+                         for index in range(TABLE_SIZE * TABLE_SIZE)]
+            self._criteria.append((masks,) + tuple(positions))
+
+    def combinations(self, patient_age):
+        """
+        Returns the Combinations at or above the threshold for a patient age.
+        """
+        return self._combinations_by_age[_age_offset(patient_age)]
+
+    def age_mask(self, family_indices):
+        """
+        Returns the bitmask of patient ages (bit 0 for age 20) at which binned relatives, as returned by
+        `collect_family_indices`, are at or above the threshold.
+        """
+        mask = 0
+        for masks, first, second in self._criteria:
+            relative1_index = family_indices[first]
+            if relative1_index is None:
+                continue
+            if second is None:
+                mask |= masks[relative1_index]
+            else:
+                relative2_index = family_indices[second]
+                if relative2_index is not None:
+                    mask |= masks[relative1_index * TABLE_SIZE + relative2_index]
+        return mask
+
+    def at_or_above(self, patient_age, family_indices):
+        return bool(self.age_mask(family_indices) >> _age_offset(patient_age) & 1)
+
+    def ages(self, family_indices):
+        """
+        Returns the sorted patient ages at which binned relatives are at or above the threshold.
+        """
+        mask = self.age_mask(family_indices)
+        return [VALID_MIN_AGE + offset for offset in range(PATIENT_AGE_COUNT) if mask >> offset & 1]
+
+    def select(self, records):
+        """
+        Yields the records at or above the threshold, unchanged. Records hold `calculate_risk` keyword arguments
+        (including patient_age) and may have other fields, such as an id, which are ignored.
+        """
+        for record in records:
+            family_indices = collect_family_indices(*[record.get(field) for field in _RELATIVE_FIELDS])
+            if self.at_or_above(record[PATIENT_AGE_FIELD], family_indices):
+                yield record
+
+
+def threshold_index(threshold):
+    """
+    Returns the ThresholdIndex for a threshold, building it on first use.
+    """
+    index = _indices.get(threshold)
+    if index is None:
+        index = _indices[threshold] = ThresholdIndex(threshold)
+    return index
+
+
+def crosses_threshold(history, threshold, patient_age=None):
+    """
+    Whether a FamilyHistory's risk is at or above `threshold` at `patient_age`, or at any valid age if
+    `patient_age` is None.
+    """
+    index = threshold_index(threshold)
+    if patient_age is None:
+        return bool(index.age_mask(history.family_indices))
+    return index.at_or_above(patient_age, history.family_indices)
+
+
+def threshold_ages(history, threshold):
+    """
+    Returns the sorted patient ages at which a FamilyHistory's risk is at or above `threshold`.
+    """
+    return threshold_index(threshold).ages(history.family_indices)
+
+
+def _age_offset(patient_age):
+    if not VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE:
+        raise ValueError('patient age must be between {} and {}, got {}'.format(
+            VALID_MIN_AGE, VALID_MAX_AGE, patient_age))
+    return patient_age - VALID_MIN_AGE
+
+
+def _lowest_bit(mask):
+    return (mask & -mask).bit_length() - 1
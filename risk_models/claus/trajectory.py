@@ -0,0 +1,53 @@
+from collections import namedtuple
+
+from risk_models.claus.claus import (
+    PATIENT_AGE_COUNT,
+    VALID_MIN_AGE,
+    VALID_MAX_AGE,
+    _lattice_offset,
+    applicable_tables,
+    get_risk_lattice,
+)
+from risk_models.claus.claus_tables import CLAUS_TABLES, CLAUS_TABLE_NAMES
+
+# Per patient age, the risk and the name of the table that gave it (None where no table applies).
+RiskTrajectory = namedtuple('RiskTrajectory', ['patient_ages', 'risks', 'tables'])
+
+
+def risk_trajectory(history, patient_ages=None):
+    """
+    Returns the claus risk of a FamilyHistory at each of `patient_ages` (default: every valid age).
+
+    The applicable tables are chosen once. Each contributes its precomputed risks across all ages, which the
+    lattice stores contiguously, and the maximum is taken per age.
+    """
+    if patient_ages is None:
+        patient_ages = range(VALID_MIN_AGE, VALID_MAX_AGE + 1)
+    patient_ages = list(patient_ages)
+    for patient_age in patient_ages:
+        if not VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE:
+            raise ValueError('patient ages must be between {} and {}, got {}'.format(
+                VALID_MIN_AGE, VALID_MAX_AGE, patient_age))
+
+    lattice = get_risk_lattice()
+    curves = []
+    for table, relative1_index, relative2_index in applicable_tables(history.family_indices):
+        table_id = CLAUS_TABLES.index(table)
+        start = _lattice_offset(table_id, VALID_MIN_AGE, relative1_index, relative2_index)
+        curves.append((CLAUS_TABLE_NAMES[table_id], lattice[start:start + PATIENT_AGE_COUNT]))
+
+    risks = []
+    tables = []
+    for patient_age in patient_ages:
+        age_offset = patient_age - VALID_MIN_AGE
+        risk = None
+        table_name = None
+        # Ties go to the first table consulted, as with max() in calculate_risk.
+        for name, curve in curves:
+            if risk is None or curve[age_offset] > risk:
+                risk = curve[age_offset]
+                table_name = name
+        risks.append(risk)
+        tables.append(table_name)
+
+    return RiskTrajectory(patient_ages, risks, tables)
@@ -0,0 +1,272 @@
+"""
+Claus risk for family histories with uncertain onset ages.
+
+Each onset age may be an exact integer, an AgeInterval (uniform over whole years, "in her 40s" is
+AgeInterval(40, 49)), an AgeDistribution over whole years, or UNKNOWN (uniform over the valid onset ages).
+
+    uncertain_risk(45, mother_onset_age=AgeInterval(40, 49), maternal_aunt_onset_ages=[UNKNOWN, 61])
+
+The risk only depends on each relative's decade bin, and only the two smallest bins of each relationship are
+ever consulted. So each relationship reduces to a small distribution over its two smallest bins, and when the
+product of those distributions has at most MAX_ENUMERATED_OUTCOMES outcomes (and no more than the requested sample
+count), the risk distribution is enumerated exactly. Otherwise relatives' bins are sampled and scored with the
+NumPy batch scorer. Without NumPy, up to `samples` outcomes are still enumerated, and larger outcome spaces are
+sampled in pure Python from the reduced distributions.
+"""
+from __future__ import division
+
+import math
+import numbers
+import random
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+from itertools import product
+
+from risk_models.claus.claus import VALID_MIN_AGE, VALID_MAX_AGE, _bin_age_to_index, score_family_indices
+from risk_models.claus.family_history import RELATIONSHIPS, combine_relative_indices
+
+DEFAULT_SAMPLES = 10000
+# Enumeration scores outcomes one by one in Python, so beyond this many outcomes sampling is faster.
+MAX_ENUMERATED_OUTCOMES = 1000
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+# Uniform over the whole years low..high, inclusive.
+AgeInterval = namedtuple('AgeInterval', ['low', 'high'])
+# Weighted whole years, as a dict of {onset age: weight}. Weights need not sum to 1.
+AgeDistribution = namedtuple('AgeDistribution', ['weights'])
+UNKNOWN = AgeInterval(VALID_MIN_AGE, VALID_MAX_AGE)
+
+# Mean and {quantile: risk} of the risk distribution, counting no applicable table as a risk of 0, the
+# probability that no table applies, and whether the distribution was enumerated exactly (else sampled).
+UncertainRisk = namedtuple('UncertainRisk', ['mean', 'quantiles', 'no_risk_probability', 'exact'])
+
+# Outcome of an onset age outside the valid range, which does not count towards the risk.
+DROPPED = None
+
+
+def uncertain_risk(
+        patient_age,
+        mother_onset_age=None,
+        daughter_onset_ages=None,
+        full_sister_onset_ages=None,
+        maternal_aunt_onset_ages=None,
+        paternal_aunt_onset_ages=None,
+        maternal_grandmother_onset_ages=None,
+        paternal_grandmother_onset_ages=None,
+        maternal_half_sister_onset_ages=None,
+        paternal_half_sister_onset_ages=None,
+        samples=DEFAULT_SAMPLES,
+        quantiles=DEFAULT_QUANTILES,
+        seed=None):
+    """
+    Returns the UncertainRisk of a patient whose relatives' onset ages are exact or uncertain.
+
+    Enumerates exactly when the reduced outcome space is no larger than `samples` and MAX_ENUMERATED_OUTCOMES,
+    and otherwise draws `samples` samples seeded by `seed`: with NumPy if it is installed, else in pure Python
+    (with a different sequence of draws).
+    """
+    if not VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE:
+        raise ValueError('patient age must be between {} and {}, got {}'.format(
+            VALID_MIN_AGE, VALID_MAX_AGE, patient_age))
+    if samples < 1:
+        raise ValueError('samples must be at least 1')
+    for quantile in quantiles:
+        if not 0 <= quantile <= 1:
+            raise ValueError('quantiles must be between 0 and 1, got {}'.format(quantile))
+
+    relatives = {'mother': [] if mother_onset_age is None else [_bin_probabilities(mother_onset_age, 'mother')]}
+    for relationship, onset_ages in zip(RELATIONSHIPS, (
+            daughter_onset_ages,
+            full_sister_onset_ages,
+            maternal_aunt_onset_ages,
+            paternal_aunt_onset_ages,
+            maternal_grandmother_onset_ages,
+            paternal_grandmother_onset_ages,
+            maternal_half_sister_onset_ages,
+            paternal_half_sister_onset_ages)):
+        relatives[relationship] = [_bin_probabilities(onset_age, relationship) for onset_age in onset_ages or ()]
+
+    relationship_distributions = dict(
+        (relationship, _smallest_bins_distribution(bin_probabilities))
+        for relationship, bin_probabilities in relatives.items()
+    )
+    outcomes = 1
+    for distribution in relationship_distributions.values():
+        outcomes *= len(distribution)
+
+    numpy_available = _numpy_available()
+    if outcomes <= samples and (outcomes <= MAX_ENUMERATED_OUTCOMES or not numpy_available):
+        return _summarize(_enumerate_risks(patient_age, relationship_distributions), quantiles)
+    if not numpy_available:
+        return _sample_risks_in_python(patient_age, relationship_distributions, samples, quantiles, seed)
+    return _sample_risks(patient_age, relatives, samples, quantiles, seed)
+
+
+def _bin_probabilities(onset_age, relationship):
+    """
+    Returns {bin index or DROPPED: probability} for one relative's onset age specification.
+    """
+    if isinstance(onset_age, AgeInterval):
+        low, high = onset_age
+        _validate_age(low, relationship)
+        _validate_age(high, relationship)
+        if low > high:
+            raise ValueError('{} onset age interval is empty: {}-{}'.format(relationship, low, high))
+        weights = dict((age, 1) for age in range(low, high + 1))
+    elif isinstance(onset_age, AgeDistribution):
+        weights = dict(onset_age.weights)
+        for age, weight in weights.items():
+            _validate_age(age, relationship)
+            if weight < 0:
+                raise ValueError('{} onset age weights must not be negative'.format(relationship))
+    else:
+        _validate_age(onset_age, relationship)
+        weights = {onset_age: 1}
+
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError('{} onset age distribution has no weight'.format(relationship))
+    probabilities = defaultdict(float)
+    for age, weight in weights.items():
+        if weight:
+            outcome = _bin_age_to_index(age) if VALID_MIN_AGE <= age <= VALID_MAX_AGE else DROPPED
+            probabilities[outcome] += weight / total
+    return dict(probabilities)
+
+
+def _smallest_bins_distribution(bin_probabilities):
+    """
+    Returns {sorted tuple of at most two smallest bins: probability} for independent relatives of one relationship.
+    """
+    distribution = {(): 1.0}
+    for probabilities in bin_probabilities:
+        combined = defaultdict(float)
+        for smallest_bins, probability in distribution.items():
+            for bin_index, bin_probability in probabilities.items():
+                if bin_index is DROPPED:
+                    combined[smallest_bins] += probability * bin_probability
+                else:
+                    combined[tuple(sorted(smallest_bins + (bin_index,))[:2])] += probability * bin_probability
+        distribution = dict(combined)
+    return distribution
+
+
+def _enumerate_risks(patient_age, relationship_distributions):
+    # Returns {risk or None: probability} over every combination of the relationships' smallest bins.
+    relationships = sorted(relationship_distributions)
+    risks = defaultdict(float)
+    scores = {}
+    for combination in product(*(relationship_distributions[relationship].items() for relationship in relationships)):
+        relative_indices = {}
+        probability = 1.0
+        for relationship, (smallest_bins, bins_probability) in zip(relationships, combination):
+            relative_indices[relationship] = smallest_bins
+            probability *= bins_probability
+        risks[_score_smallest_bins(patient_age, relative_indices, scores)] += probability
+    return risks
+
+
+def _sample_risks_in_python(patient_age, relationship_distributions, samples, quantiles, seed):
+    # Draws each relationship's smallest bins from its reduced distribution and summarizes the sample frequencies.
+    rng = random.Random(seed)
+    choices = []
+    for relationship, distribution in relationship_distributions.items():
+        outcomes = list(distribution)
+        cumulative = []
+        total = 0.0
+        for outcome in outcomes:
+            total += distribution[outcome]
+            cumulative.append(total)
+        choices.append((relationship, outcomes, cumulative))
+
+    counts = defaultdict(int)
+    scores = {}
+    for _ in range(samples):
+        relative_indices = {}
+        for relationship, outcomes, cumulative in choices:
+            drawn = bisect_right(cumulative, rng.random() * cumulative[-1])
+            relative_indices[relationship] = outcomes[min(drawn, len(outcomes) - 1)]
+        counts[_score_smallest_bins(patient_age, relative_indices, scores)] += 1
+    risks = dict((risk, count / samples) for risk, count in counts.items())
+    return _summarize(risks, quantiles)._replace(exact=False)
+
+
+def _score_smallest_bins(patient_age, relative_indices, scores):
+    # Scores {relationship: smallest bins}, caching risks by FamilyIndices in `scores`.
+    mother_bins = relative_indices.pop('mother')
+    family_indices = combine_relative_indices(mother_bins[0] if mother_bins else None, relative_indices)
+    if family_indices not in scores:
+        scores[family_indices] = score_family_indices(patient_age, family_indices)
+    return scores[family_indices]
+
+
+def _sample_risks(patient_age, relatives, samples, quantiles, seed):
+    import numpy as np
+
+    from risk_models.claus.batch import bin_relative_coordinates, score_bins
+
+    rng = np.random.RandomState(seed)
+    rows = np.arange(samples)
+    coordinates = {}
+    for relationship, bin_probabilities in relatives.items():
+        sampled_ages = []
+        for probabilities in bin_probabilities:
+            outcomes = list(probabilities)
+            cumulative = np.cumsum([probabilities[outcome] for outcome in outcomes])
+            drawn = np.minimum(np.searchsorted(cumulative, rng.random_sample(samples) * cumulative[-1], side='right'),
+                               len(outcomes) - 1)
+            # Each bin is represented by its first onset age; dropped ages become NaN.
+            ages = np.array([np.nan if outcome is DROPPED else VALID_MIN_AGE + 10 * outcome for outcome in outcomes])
+            sampled_ages.append(ages[drawn])
+        if sampled_ages:
+            coordinates[relationship] = (np.tile(rows, len(sampled_ages)), np.concatenate(sampled_ages))
+
+    bins = bin_relative_coordinates(samples, **coordinates)
+    sampled_risks = score_bins(np.full(samples, patient_age, dtype=np.int64), bins)
+    no_risk = np.isnan(sampled_risks)
+    sampled_risks[no_risk] = 0.0
+    sampled_risks.sort()
+    return UncertainRisk(
+        float(sampled_risks.mean()),
+        # The smallest sampled risk with at least `quantile` of the samples at or below it (np.quantile's
+        # inverted_cdf method, which needs NumPy 1.22+).
+        dict((quantile, float(sampled_risks[max(0, int(math.ceil(quantile * samples)) - 1)]))
+             for quantile in quantiles),
+        float(no_risk.mean()),
+        False,
+    )
+
+
+def _numpy_available():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _summarize(risks, quantiles):
+    no_risk_probability = risks.pop(None, 0.0)
+    distribution = sorted(risks.items())
+    if no_risk_probability:
+        distribution.insert(0, (0.0, no_risk_probability + risks.get(0.0, 0.0)))
+        if len(distribution) > 1 and distribution[1][0] == 0.0:
+            del distribution[1]
+    mean = sum(risk * probability for risk, probability in distribution)
+
+    quantile_risks = {}
+    for quantile in quantiles:
+        # The smallest risk whose cumulative probability reaches the quantile, allowing for rounding error.
+        cumulative = 0.0
+        for risk, probability in distribution:
+            cumulative += probability
+            if cumulative >= quantile - 1e-12:
+                break
+        quantile_risks[quantile] = risk
+    return UncertainRisk(mean, quantile_risks, no_risk_probability, True)
+
+
+def _validate_age(age, relationship):
+    if isinstance(age, bool) or not isinstance(age, numbers.Integral):
+        raise ValueError('{} onset age must be an integer, interval or distribution, got {!r}'.format(
+            relationship, age))
@@ -0,0 +1,212 @@
+"""
+What-if analysis: how the Claus risk of one family history responds to changes in the facts it is built from.
+
+    history = FamilyHistory(mother_onset_age=52, maternal_aunt_onset_ages=[45])
+    results = what_if(history, 40, [ShiftOnset('maternal_aunt', 0, -10), AddRelative('paternal_half_sister', 38)])
+    print(format_delta_table(history, results))
+
+A perturbation re-bins only the relationship it changes and reuses the bins of every other relationship from
+the base history. Perturbations that lead to the same FamilyIndices signature are scored once.
+"""
+from collections import namedtuple
+
+from risk_models.claus.claus import (
+    VALID_MIN_AGE,
+    VALID_MAX_AGE,
+    _bin_age_to_index,
+    map_ages_to_indices,
+    score_family_indices,
+)
+from risk_models.claus.family_history import (
+    FamilyHistory,
+    RELATIONSHIPS,
+    _validate_age,
+    calculate_risk_for,
+    combine_relative_indices,
+)
+
+MOTHER = 'mother'
+
+# Shift the onset age of the relative at `position` in the relationship's onset age list by `years` (which may
+# be negative). The mother is addressed as relationship 'mother', position 0.
+ShiftOnset = namedtuple('ShiftOnset', ['relationship', 'position', 'years'])
+# Add a diagnosed relative. Adding a 'mother' sets the mother's onset age.
+AddRelative = namedtuple('AddRelative', ['relationship', 'onset_age'])
+# Remove the relative at `position` in the relationship's onset age list.
+RemoveRelative = namedtuple('RemoveRelative', ['relationship', 'position'])
+# Move the relative at `position` to the same relationship on the other side of the family.
+MoveSide = namedtuple('MoveSide', ['relationship', 'position'])
+
+# A scored perturbation: the risk after applying it (None where no table applies) and its change from the base
+# risk, counting no risk as 0.
+WhatIf = namedtuple('WhatIf', ['perturbation', 'risk', 'delta'])
+
+OTHER_SIDE = {
+    'maternal_aunt': 'paternal_aunt',
+    'paternal_aunt': 'maternal_aunt',
+    'maternal_grandmother': 'paternal_grandmother',
+    'paternal_grandmother': 'maternal_grandmother',
+    'maternal_half_sister': 'paternal_half_sister',
+    'paternal_half_sister': 'maternal_half_sister',
+}
+
+
+def what_if(history, patient_age, perturbations):
+    """
+    Scores each perturbation of a FamilyHistory and returns WhatIf results ranked by the size of the change,
+    largest first. Ties keep the order of `perturbations`.
+    """
+    if not VALID_MIN_AGE <= patient_age <= VALID_MAX_AGE:
+        raise ValueError('patient age must be between {} and {}, got {}'.format(
+            VALID_MIN_AGE, VALID_MAX_AGE, patient_age))
+    base_risk = calculate_risk_for(history, patient_age)
+
+    risks = {history.family_indices: base_risk}
+    results = []
+    for perturbation in perturbations:
+        family_indices = perturbed_family_indices(history, perturbation)
+        if family_indices not in risks:
+            risks[family_indices] = score_family_indices(patient_age, family_indices)
+        risk = risks[family_indices]
+        results.append(WhatIf(perturbation, risk, round((risk or 0.0) - (base_risk or 0.0), 3)))
+
+    results.sort(key=lambda result: -abs(result.delta))
+    return results
+
+
+def perturbed_family_indices(history, perturbation):
+    """
+    Returns the FamilyIndices of `history` with `perturbation` applied, re-binning only the changed relationships.
+    """
+    changes = _changes(history, perturbation)
+    mother_index = history.mother_index
+    if MOTHER in changes:
+        mother_onset_age = changes.pop(MOTHER)
+        mother_index = None
+        if mother_onset_age and VALID_MIN_AGE <= mother_onset_age <= VALID_MAX_AGE:
+            mother_index = _bin_age_to_index(mother_onset_age)
+
+    relative_indices = history.relative_indices
+    if changes:
+        relative_indices = dict(relative_indices)
+        for relationship, onset_ages in changes.items():
+            relative_indices[relationship] = tuple(map_ages_to_indices(onset_ages))
+    return combine_relative_indices(mother_index, relative_indices)
+
+
+def apply_perturbation(history, perturbation):
+    """
+    Returns a new FamilyHistory with `perturbation` applied.
+    """
+    kwargs = history.as_kwargs()
+    for relationship, onset_ages in _changes(history, perturbation).items():
+        if relationship == MOTHER:
+            kwargs['mother_onset_age'] = onset_ages
+        else:
+            kwargs[relationship + '_onset_ages'] = list(onset_ages)
+    return FamilyHistory(**kwargs)
+
+
+def sensitivity_perturbations(history, years=10, added_onset_age=None):
+    """
+    Generates the usual questions about a family history: every diagnosed relative's onset `years` earlier and
+    later, removed, and moved to the other side where that applies. With `added_onset_age`, also one more
+    relative of each kind diagnosed at that age.
+    """
+    perturbations = []
+    relatives = [(MOTHER, 0)] if history.mother_onset_age is not None else []
+    relatives.extend((relationship, position) for relationship in RELATIONSHIPS
+                     for position in range(len(history.onset_ages[relationship])))
+    for relationship, position in relatives:
+        perturbations.append(ShiftOnset(relationship, position, -years))
+        perturbations.append(ShiftOnset(relationship, position, years))
+        perturbations.append(RemoveRelative(relationship, position))
+        if relationship in OTHER_SIDE:
+            perturbations.append(MoveSide(relationship, position))
+    if added_onset_age is not None:
+        if history.mother_onset_age is None:
+            perturbations.append(AddRelative(MOTHER, added_onset_age))
+        perturbations.extend(AddRelative(relationship, added_onset_age) for relationship in RELATIONSHIPS)
+    return perturbations
+
+
+def describe(history, perturbation):
+    """
+    Returns a short human-readable description of a perturbation of `history`.
+    """
+    if isinstance(perturbation, AddRelative):
+        return 'add {} diagnosed at {}'.format(_label(perturbation.relationship), perturbation.onset_age)
+    onset_age = _onset_ages(history, perturbation.relationship)[_position(history, perturbation)]
+    relative = '{} diagnosed at {}'.format(_label(perturbation.relationship), onset_age)
+    if isinstance(perturbation, ShiftOnset):
+        return '{} -> {}'.format(relative, onset_age + perturbation.years)
+    if isinstance(perturbation, RemoveRelative):
+        return 'remove {}'.format(relative)
+    return '{} -> {}'.format(relative, _label(OTHER_SIDE[perturbation.relationship]))
+
+
+def format_delta_table(history, results):
+    """
+    Renders ranked WhatIf results as a plain text table.
+    """
+    rows = [(describe(history, result.perturbation),
+             '-' if result.risk is None else '{:.3f}'.format(result.risk),
+             '{:+.3f}'.format(result.delta))
+            for result in results]
+    width = max([len('change')] + [len(row[0]) for row in rows])
+    lines = ['{:<{width}}  {:>6}  {:>6}'.format('change', 'risk', 'delta', width=width)]
+    lines.extend('{:<{width}}  {:>6}  {:>6}'.format(*row, width=width) for row in rows)
+    return '\n'.join(lines) + '\n'
+
+
+def _changes(history, perturbation):
+    """
+    Returns {relationship: new onset ages} for the relationships a perturbation changes. The mother's entry is a
+    single onset age or None.
+    """
+    relationship = perturbation.relationship
+    if relationship != MOTHER and relationship not in RELATIONSHIPS:
+        raise ValueError('unknown relationship {!r}'.format(relationship))
+
+    if isinstance(perturbation, AddRelative):
+        _validate_age(perturbation.onset_age, relationship)
+        if relationship == MOTHER:
+            if history.mother_onset_age is not None:
+                raise ValueError('the mother is already diagnosed')
+            return {MOTHER: perturbation.onset_age}
+        return {relationship: history.onset_ages[relationship] + (perturbation.onset_age,)}
+
+    position = _position(history, perturbation)
+    onset_ages = _onset_ages(history, relationship)
+    if isinstance(perturbation, ShiftOnset):
+        shifted = onset_ages[position] + perturbation.years
+        _validate_age(shifted, relationship)
+        changed = onset_ages[:position] + (shifted,) + onset_ages[position + 1:]
+        return {relationship: changed[0] if relationship == MOTHER else changed}
+
+    remaining = onset_ages[:position] + onset_ages[position + 1:]
+    if isinstance(perturbation, RemoveRelative):
+        return {relationship: None if relationship == MOTHER else remaining}
+    if isinstance(perturbation, MoveSide):
+        if relationship not in OTHER_SIDE:
+            raise ValueError('{} has no other side'.format(relationship))
+        other_side = OTHER_SIDE[relationship]
+        return {relationship: remaining, other_side: history.onset_ages[other_side] + (onset_ages[position],)}
+    raise ValueError('unknown perturbation {!r}'.format(perturbation))
+
+
+def _onset_ages(history, relationship):
+    if relationship == MOTHER:
+        return () if history.mother_onset_age is None else (history.mother_onset_age,)
+    return history.onset_ages[relationship]
+
+
+def _position(history, perturbation):
+    onset_ages = _onset_ages(history, perturbation.relationship)
+    if not 0 <= perturbation.position < len(onset_ages):
+        raise ValueError('no {} at position {}'.format(perturbation.relationship, perturbation.position))
+    return perturbation.position
+
+
+def _label(relationship):
+    return relationship.replace('_', ' ')
@@ -9,4 +9,11 @@ setup(name="clrriskmodels",
       url="https://github.com/ColorGenomics/risk-models",
       license="Apache-2.0",
       packages=find_packages(),
+      entry_points={
+          "console_scripts": ["claus-risk=risk_models.claus.cli:main"],
+      },
+      extras_require={
+          "batch": ["numpy"],
+          "arrow": ["numpy", "pyarrow"],
+      },
 )